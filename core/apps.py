@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    # Comandos e checagens do projeto (não de um app de negócio)
+    name = 'core'
+
+    def ready(self):
+        from . import estaticos  # noqa: F401  (registra a checagem dos arquivos compilados)
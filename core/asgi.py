@@ -5,6 +5,33 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
+
+Modo ASGI
+---------
+Os endpoints HTMX disparados a cada tecla (orcamentos:buscar_cliente e
+orcamentos:htmx_aproveitamento) são views assíncronas e funcionam nos dois
+modos. Sob ASGI um worker segura muitos requests abertos sem uma thread para
+cada, o que compensa quando a resposta espera I/O (banco em rede, clientes
+lentos). Com o SQLite local essas views são curtas e gastam CPU, e os
+middlewares do Django ainda trocam de thread a cada etapa: meça antes de trocar
+o modo de produção com `python manage.py bench_htmx`, que roda a mesma carga de
+digitação contra um worker WSGI e um ASGI.
+
+    pip install uvicorn
+    uvicorn core.asgi:application --host 0.0.0.0 --port 8000 --workers 2
+
+ou, com gunicorn gerenciando os processos:
+
+    gunicorn core.asgi:application -k uvicorn.workers.UvicornWorker -w 2
+
+- Importar este módulo define DJANGO_SERVIDOR=asgi; os settings então fecham a
+  conexão do banco a cada request (CONN_MAX_AGE=0), como o Django recomenda
+  para ASGI. No SQLite abrir conexão é barato (só os PRAGMAs de core/db).
+- Arquivos estáticos continuam com o servidor web na frente (collectstatic).
+- Cada worker tem seu processo: os histogramas de /admin/desempenho/ e os caches
+  em memória são por worker. O que precisa valer para todos (índices de preço,
+  KPIs, ConfiguracaoGlobal) é validado por tokens no cache 'versoes', que fica no
+  banco (core.versoes); um save num worker chega aos outros em até ~1 s.
 """
 
 import os
@@ -12,5 +39,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+os.environ.setdefault('DJANGO_SERVIDOR', 'asgi')
 
 application = get_asgi_application()
@@ -0,0 +1,38 @@
+"""
+Backend SQLite para produção: o sqlite3 do Django + PRAGMAs aplicados a cada conexão.
+
+Uso em settings.DATABASES:
+
+    'ENGINE': 'core.db',
+    'OPTIONS': {
+        'transaction_mode': 'IMMEDIATE',
+        'pragmas': {'cache_size': -64000},   # opcional: sobrescreve PRAGMAS_PADRAO
+    },
+
+WAL deixa leituras (admin, listas de orçamento) seguirem enquanto uma baixa de
+estoque grava; busy_timeout faz quem encontra o banco travado esperar em vez de
+falhar na hora. Use junto com CONN_MAX_AGE para não repetir isso a cada request.
+"""
+from django.db.backends.sqlite3 import base
+
+PRAGMAS_PADRAO = {
+    'busy_timeout': 5000,           # ms esperando o lock antes de "database is locked"
+    'journal_mode': 'wal',          # leitores não bloqueiam o escritor (e vice-versa)
+    'synchronous': 'normal',        # seguro com WAL; fsync só nos checkpoints
+    'cache_size': -20000,           # negativo = KiB (~20 MB de cache de páginas por conexão)
+    'mmap_size': 128 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.pragmas = {**PRAGMAS_PADRAO, **kwargs.pop('pragmas', {})}
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for nome, valor in self.pragmas.items():
+            conn.execute(f"PRAGMA {nome} = {valor}")
+        return conn
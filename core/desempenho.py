@@ -0,0 +1,289 @@
+"""
+Instrumentação de desempenho por request (admin Unfold e views de orcamentos).
+
+MetricasMiddleware mede, para cada request: tempo total, número e tempo das
+consultas SQL, tempo de renderização de templates e o nome da view. Com isso:
+
+- requests acima de DESEMPENHO['LIMITE_LENTO_MS'] vão para o logger
+  'core.desempenho' como uma linha JSON;
+- cada resposta leva um cabeçalho Server-Timing (aparece no DevTools, útil
+  para chamadas HTMX);
+- histogramas por view ficam em memória do processo e são expostos em JSON
+  para a equipe (staff) em /admin/desempenho/.
+
+As consultas são medidas por um execute_wrapper instalado em cada conexão
+(signal connection_created) que só registra quando há um request medido no
+contextvar atual — assim funciona igual em views síncronas e assíncronas.
+
+O tempo de template exige trocar Template.render do backend do Django no
+processo inteiro, então só é ligado com DESEMPENHO['MEDIR_TEMPLATES'] (perfilagem);
+desligado, o Server-Timing e o log saem sem a parte de templates.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+from django.template.backends.django import Template as TemplateDjango
+
+logger = logging.getLogger('core.desempenho')
+
+# Limites superiores (ms) das faixas do histograma; a última faixa é "acima de 5000"
+FAIXAS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_metricas_atual = ContextVar('metricas_request', default=None)
+
+
+def _config(chave, padrao):
+    return getattr(settings, 'DESEMPENHO', {}).get(chave, padrao)
+
+
+class MetricasRequest:
+    __slots__ = ('inicio', 'consultas', 'sql_ms', 'template_ms')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+
+
+# ------------------------------------------------------------------
+# PONTOS DE MEDIÇÃO (SQL e templates)
+# ------------------------------------------------------------------
+def _medir_sql(execute, sql, params, many, context):
+    metricas = _metricas_atual.get()
+    if metricas is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metricas.consultas += 1
+        metricas.sql_ms += (time.perf_counter() - inicio) * 1000
+
+
+def _instalar_em_conexao(sender=None, connection=None, **kwargs):
+    # O wrapper (objeto de conexão) sobrevive a reconexões: não empilhar duas vezes
+    if _medir_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_medir_sql)
+
+
+_render_original = TemplateDjango.render
+
+
+def _render_medido(self, context=None, request=None):
+    metricas = _metricas_atual.get()
+    if metricas is None:
+        return _render_original(self, context, request)
+    inicio = time.perf_counter()
+    try:
+        return _render_original(self, context, request)
+    finally:
+        metricas.template_ms += (time.perf_counter() - inicio) * 1000
+
+
+_instalado = False
+_templates_medidos = False
+_lock_instalacao = threading.Lock()
+
+
+def instalar(medir_templates=False):
+    """Liga os pontos de medição (uma vez por processo); templates só se pedido."""
+    global _instalado, _templates_medidos
+    with _lock_instalacao:
+        if not _instalado:
+            connection_created.connect(_instalar_em_conexao, dispatch_uid='core.desempenho')
+            for conexao in connections.all(initialized_only=True):
+                _instalar_em_conexao(connection=conexao)
+            _instalado = True
+        if medir_templates and not _templates_medidos:
+            # Só o render de nível mais alto (render/TemplateResponse); includes ficam dentro dele
+            TemplateDjango.render = _render_medido
+            _templates_medidos = True
+
+
+# ------------------------------------------------------------------
+# HISTOGRAMAS POR VIEW
+# ------------------------------------------------------------------
+class Histogramas:
+    """Contadores por view, em memória do processo (cada worker tem os seus)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def registrar(self, view, total_ms, metricas, status):
+        with self._lock:
+            item = self._views.get(view)
+            if item is None:
+                item = self._views[view] = {
+                    'requests': 0, 'erros': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'sql_consultas': 0, 'sql_ms': 0.0, 'template_ms': 0.0,
+                    'faixas': [0] * (len(FAIXAS_MS) + 1),
+                }
+            item['requests'] += 1
+            item['erros'] += status >= 500
+            item['total_ms'] += total_ms
+            item['max_ms'] = max(item['max_ms'], total_ms)
+            item['sql_consultas'] += metricas.consultas
+            item['sql_ms'] += metricas.sql_ms
+            item['template_ms'] += metricas.template_ms
+            item['faixas'][bisect_left(FAIXAS_MS, total_ms)] += 1
+
+    @staticmethod
+    def _percentil(faixas, total, p):
+        # Limite superior da faixa onde cai o percentil (estimativa do histograma)
+        alvo = total * p
+        acumulado = 0
+        for limite, quantidade in zip(FAIXAS_MS + (None,), faixas):
+            acumulado += quantidade
+            if acumulado >= alvo:
+                return limite
+        return None
+
+    def resumo(self):
+        with self._lock:
+            views = {nome: dict(item, faixas=list(item['faixas'])) for nome, item in self._views.items()}
+        resultado = {}
+        for nome, item in sorted(views.items(), key=lambda par: -par[1]['total_ms']):
+            n = item['requests']
+            resultado[nome] = {
+                'requests': n,
+                'erros': item['erros'],
+                'media_ms': round(item['total_ms'] / n, 2),
+                'max_ms': round(item['max_ms'], 2),
+                'p50_ms_ate': self._percentil(item['faixas'], n, 0.50),
+                'p95_ms_ate': self._percentil(item['faixas'], n, 0.95),
+                'sql_consultas_media': round(item['sql_consultas'] / n, 2),
+                'sql_ms_media': round(item['sql_ms'] / n, 2),
+                'template_ms_media': round(item['template_ms'] / n, 2),
+                'histograma': {
+                    (f'<={limite}ms' if limite else f'>{FAIXAS_MS[-1]}ms'): quantidade
+                    for limite, quantidade in zip(FAIXAS_MS + (None,), item['faixas'])
+                },
+            }
+        return resultado
+
+    def zerar(self):
+        with self._lock:
+            self._views.clear()
+
+
+histogramas = Histogramas()
+
+
+# ------------------------------------------------------------------
+# MIDDLEWARE
+# ------------------------------------------------------------------
+class MetricasMiddleware:
+    """Deve ser o primeiro de MIDDLEWARE para medir também os demais middlewares."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.ativo = _config('ATIVO', True)
+        self.limite_lento_ms = _config('LIMITE_LENTO_MS', 500)
+        # Arquivos estáticos/mídia não interessam; prefixo '/' (MEDIA_URL padrão) pegaria tudo
+        self.ignorar = tuple(
+            p for p in (settings.STATIC_URL, getattr(settings, 'MEDIA_URL', None)) if p and p != '/'
+        )
+        self.medir_templates = self.ativo and _config('MEDIR_TEMPLATES', False)
+        if self.ativo:
+            instalar(self.medir_templates)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._medir(request):
+            return self.get_response(request)
+        metricas = MetricasRequest()
+        token = _metricas_atual.set(metricas)
+        try:
+            response = self.get_response(request)
+        finally:
+            _metricas_atual.reset(token)
+        usuario = None
+        if self._lento(metricas):
+            usuario = getattr(getattr(request, 'user', None), 'pk', None)
+        return self._finalizar(request, response, metricas, usuario)
+
+    async def __acall__(self, request):
+        if not self._medir(request):
+            return await self.get_response(request)
+        metricas = MetricasRequest()
+        token = _metricas_atual.set(metricas)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _metricas_atual.reset(token)
+        usuario = None
+        # request.user é lazy e síncrono (sessão no banco): no loop só pela API assíncrona,
+        # e só quando o request vai para o log
+        if self._lento(metricas) and hasattr(request, 'auser'):
+            usuario = getattr(await request.auser(), 'pk', None)
+        return self._finalizar(request, response, metricas, usuario)
+
+    def _medir(self, request):
+        return self.ativo and not (self.ignorar and request.path.startswith(self.ignorar))
+
+    def _lento(self, metricas):
+        return (time.perf_counter() - metricas.inicio) * 1000 >= self.limite_lento_ms
+
+    def _finalizar(self, request, response, metricas, usuario=None):
+        total_ms = (time.perf_counter() - metricas.inicio) * 1000
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else '<sem rota>'
+        histogramas.registrar(view, total_ms, metricas, response.status_code)
+
+        tempos = [f'sql;dur={metricas.sql_ms:.1f};desc="{metricas.consultas} consultas"']
+        if self.medir_templates:
+            tempos.append(f'tpl;dur={metricas.template_ms:.1f}')
+        tempos.append(f'total;dur={total_ms:.1f}')
+        response['Server-Timing'] = ', '.join(tempos)
+        if total_ms >= self.limite_lento_ms:
+            linha = {
+                'evento': 'request_lento',
+                'view': view,
+                'metodo': request.method,
+                'caminho': request.path,
+                'status': response.status_code,
+                'total_ms': round(total_ms, 1),
+                'sql_consultas': metricas.consultas,
+                'sql_ms': round(metricas.sql_ms, 1),
+                'usuario': usuario,
+                'htmx': request.headers.get('HX-Request') == 'true',
+            }
+            if self.medir_templates:
+                linha['template_ms'] = round(metricas.template_ms, 1)
+            logger.warning(json.dumps(linha, ensure_ascii=False))
+        return response
+
+
+@staff_member_required
+@require_http_methods(['GET', 'POST'])
+def painel_desempenho(request):
+    """Histogramas por view deste processo, em JSON (POST devolve os contadores e os zera)."""
+    resposta = JsonResponse({
+        'processo': os.getpid(),
+        'faixas_ms': FAIXAS_MS,
+        'templates_medidos': _templates_medidos,
+        'views': histogramas.resumo(),
+    }, json_dumps_params={'ensure_ascii': False, 'indent': 2})
+    if request.method == 'POST':
+        histogramas.zerar()
+    return resposta
@@ -0,0 +1,122 @@
+"""
+Arquivos estáticos de produção: nomes com hash (manifest) + cópias pré-comprimidas.
+
+ArmazenamentoEstatico é o ManifestStaticFilesStorage do Django (app.css vira
+app.3f2a9c1b.css, e url() dentro do CSS é reescrita) que, no collectstatic,
+grava ao lado de cada arquivo texto uma versão .gz e, se o pacote `brotli`
+estiver instalado, uma .br. O servidor web entrega a versão comprimida pronta,
+sem gastar CPU por request.
+
+Como o nome muda a cada alteração de conteúdo, os arquivos com hash podem ser
+cacheados "para sempre". Exemplo para o nginx na frente do Django
+(ngx_brotli opcional):
+
+    location /static/ {
+        alias /caminho/do/projeto/staticfiles/;
+        gzip_static on;
+        brotli_static on;
+        # Arquivos com hash no nome: nunca mudam
+        location ~ "\\.[0-9a-f]{12}\\.\\w+$" {
+            expires max;
+            add_header Cache-Control "public, max-age=31536000, immutable";
+        }
+    }
+
+Com DEBUG=True (runserver) os settings usam o storage simples do Django, sem
+manifest: não é preciso rodar o collectstatic para desenvolver.
+
+Build: o CSS e as bibliotecas JS de base_orcamento.html (core/static/dist/,
+fora do git) só existem depois de
+
+    python manage.py compilar_estaticos
+
+que precisa do Node.js/npm e instala as versões travadas no package-lock.json
+(npm ci). Sem esses arquivos a página abre sem estilo e sem htmx; a checagem
+core.W001 avisa no runserver/migrate e vira erro (core.E001) em check --deploy.
+"""
+import gzip
+from pathlib import Path
+
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core import checks
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele só há .gz
+    brotli = None
+
+# O que base_orcamento.html carrega e só existe depois do build
+ARQUIVOS_COMPILADOS = (
+    'dist/app.css',
+    'dist/vendor/htmx.min.js',
+    'dist/vendor/vanilla-masker.min.js',
+    'dist/vendor/alpine.min.js',
+)
+
+EXTENSOES_COMPRIMIVEIS = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.map', '.xml'}
+# Abaixo disso o cabeçalho da compressão come o ganho
+TAMANHO_MINIMO = 512
+
+
+def comprimir_arquivo(caminho):
+    """Grava caminho.gz (e caminho.br) se compensar. Retorna os caminhos gravados."""
+    caminho = Path(caminho)
+    conteudo = caminho.read_bytes()
+    if len(conteudo) < TAMANHO_MINIMO:
+        return []
+    gravados = []
+    # mtime=0: mesma entrada gera o mesmo .gz (builds reproduzíveis)
+    versoes = [('.gz', gzip.compress(conteudo, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        versoes.append(('.br', brotli.compress(conteudo, quality=11)))
+    for sufixo, comprimido in versoes:
+        if len(comprimido) < len(conteudo) * 0.95:
+            destino = caminho.with_name(caminho.name + sufixo)
+            destino.write_bytes(comprimido)
+            gravados.append(destino)
+    return gravados
+
+
+class ArmazenamentoEstatico(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        processados = set()
+        for original, processado, alterado in super().post_process(paths, dry_run=dry_run, **options):
+            if not dry_run and processado and not isinstance(alterado, Exception):
+                processados.add(processado)
+            yield original, processado, alterado
+        if dry_run:
+            return
+        # Comprime o nome com hash e o original (quem referencia sem {% static %} também ganha)
+        for nome in processados | set(paths):
+            if Path(nome).suffix.lower() in EXTENSOES_COMPRIMIVEIS and self.exists(nome):
+                comprimir_arquivo(self.path(nome))
+
+
+def _faltando():
+    return [nome for nome in ARQUIVOS_COMPILADOS if not finders.find(nome)]
+
+
+@checks.register(checks.Tags.staticfiles)
+def verificar_estaticos_compilados(app_configs, **kwargs):
+    faltando = _faltando()
+    if not faltando:
+        return []
+    return [checks.Warning(
+        f"Estáticos não compilados: {', '.join(faltando)}.",
+        hint="Rode 'python manage.py compilar_estaticos' (precisa do Node.js/npm).",
+        id='core.W001',
+    )]
+
+
+@checks.register(checks.Tags.staticfiles, deploy=True)
+def exigir_estaticos_compilados(app_configs, **kwargs):
+    faltando = _faltando()
+    if not faltando:
+        return []
+    return [checks.Error(
+        f"Estáticos não compilados: {', '.join(faltando)}.",
+        hint="Rode 'python manage.py compilar_estaticos' antes do deploy.",
+        id='core.E001',
+    )]
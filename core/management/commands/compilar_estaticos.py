@@ -0,0 +1,94 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.management.commands.collectstatic import Command as CollectStatic
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from core.estaticos import ARQUIVOS_COMPILADOS, ArmazenamentoEstatico, brotli
+
+# Destino em core/static/dist/vendor -> arquivo dentro de node_modules (versões fixas no package.json)
+VENDOR = {
+    'htmx.min.js': 'htmx.org/dist/htmx.min.js',
+    'alpine.min.js': 'alpinejs/dist/cdn.min.js',
+    'vanilla-masker.min.js': 'vanilla-masker/build/vanilla-masker.min.js',
+}
+
+# O que base_orcamento.html carrega antes da primeira pintura
+ARQUIVOS_DA_PAGINA = [*ARQUIVOS_COMPILADOS, 'unfold/fonts/inter/Inter-Regular.woff2']
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera o CSS do Tailwind (só as classes usadas), copia htmx/Alpine/vanilla-masker de "
+        "node_modules para core/static/dist e roda o collectstatic com nomes com hash e "
+        "versões .gz/.br. No fim mostra os bytes que a página de orçamento baixa (só tamanho, "
+        "não é medição de tempo de primeira pintura)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sem-npm', action='store_true', help="Não roda npm (usa o dist/ já gerado).")
+        parser.add_argument('--sem-collectstatic', action='store_true')
+
+    def handle(self, *args, **options):
+        base = Path(settings.BASE_DIR)
+        dist = base / 'core' / 'static' / 'dist'
+
+        if not options['sem_npm']:
+            self._npm(base)
+            (dist / 'vendor').mkdir(parents=True, exist_ok=True)
+            for destino, origem in VENDOR.items():
+                arquivo = base / 'node_modules' / origem
+                if not arquivo.exists():
+                    raise CommandError(f"{arquivo} não encontrado: rode 'npm install' e tente de novo.")
+                shutil.copyfile(arquivo, dist / 'vendor' / destino)
+            self.stdout.write(f"CSS e bibliotecas em {dist}")
+
+        if options['sem_collectstatic']:
+            return
+
+        # Sempre o storage de produção, mesmo rodando com DEBUG=True
+        coletor = CollectStatic(stdout=self.stdout, stderr=self.stderr)
+        coletor.storage = ArmazenamentoEstatico()
+        call_command(coletor, interactive=False, clear=True, verbosity=options['verbosity'])
+        self._relatorio_tamanhos(coletor.storage)
+
+    def _npm(self, base):
+        npm = shutil.which('npm')
+        if npm is None:
+            raise CommandError("npm não encontrado: instale o Node.js (só é preciso na máquina de build).")
+        if not (base / 'node_modules').exists():
+            if (base / 'package-lock.json').exists():
+                subprocess.run([npm, 'ci'], cwd=base, check=True)
+            else:
+                # Primeiro build: o npm resolve as versões e grava o lock, que deve ir para o git
+                subprocess.run([npm, 'install'], cwd=base, check=True)
+                self.stderr.write(self.style.WARNING(
+                    "package-lock.json gerado: faça commit dele para que os próximos builds usem npm ci."
+                ))
+        subprocess.run([npm, 'run', 'build:css'], cwd=base, check=True)
+
+    def _relatorio_tamanhos(self, storage):
+        # Tamanho em disco de cada variante: o navegador baixa a menor que aceitar.
+        # Tempo de primeira pintura depende de rede e terminal; meça no DevTools/Lighthouse
+        self.stdout.write("\nTamanho dos estáticos da página de orçamento (bytes transferidos, não tempo):")
+        self.stdout.write(f"{'arquivo':<44} {'bytes':>9} {'gzip':>9} {'brotli':>9}")
+        totais = [0, 0, 0]
+        for nome in ARQUIVOS_DA_PAGINA:
+            caminho = Path(storage.path(storage.stored_name(nome)))
+            tamanhos = [caminho.stat().st_size]
+            for sufixo in ('.gz', '.br'):
+                comprimido = caminho.with_name(caminho.name + sufixo)
+                # Sem versão comprimida (fonte woff2, brotli ausente) vai o arquivo como está
+                tamanhos.append(comprimido.stat().st_size if comprimido.exists() else tamanhos[0])
+            totais = [t + n for t, n in zip(totais, tamanhos)]
+            self._linha(caminho.name, tamanhos)
+        self._linha('total (1 origem, 0 CDN)', totais)
+        if brotli is None:
+            self.stdout.write("(pacote brotli não instalado: só versões .gz)")
+
+    def _linha(self, nome, tamanhos):
+        bruto, gz, br = tamanhos
+        self.stdout.write(f"{nome:<44} {bruto:>9} {gz:>9} {br if brotli else '-':>9}")
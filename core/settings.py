@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
+
 from django.urls import reverse_lazy
 from pathlib import Path
 
@@ -41,11 +43,14 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     "django.contrib.humanize",
+    "core",
     "materiais",
     "orcamentos",
 ]
 
 MIDDLEWARE = [
+    # Primeiro da lista: mede o request inteiro (ver core/desempenho.py)
+    'core.desempenho.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,17 +81,76 @@ TEMPLATES = [
 WSGI_APPLICATION = 'core.wsgi.application'
 
 
+# Modo de execução: core/asgi.py define DJANGO_SERVIDOR=asgi antes de carregar os settings
+SERVIDOR_ASGI = os.environ.get('DJANGO_SERVIDOR') == 'asgi'
+
+
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # sqlite3 do Django + PRAGMAs de produção (WAL, busy_timeout, cache): ver core/db/base.py
+        'ENGINE': 'core.db',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Reaproveita a conexão entre requests (os PRAGMAs rodam só ao conectar).
+        # Sob ASGI o ORM de cada request roda numa thread própria, que morre no fim do
+        # request: conexão persistente ficaria órfã, então lá ela fecha a cada request.
+        'CONN_MAX_AGE': 0 if SERVIDOR_ASGI else 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # BEGIN IMMEDIATE: a transação pega o lock de escrita no início e espera
+            # o busy_timeout, em vez de falhar ao tentar promover um lock de leitura
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# 'default' é por processo (resultados recalculáveis: imposição, KPIs por versão).
+# 'versoes' guarda só os tokens de versão (core.versoes) e precisa ser compartilhado
+# entre os workers: fica no banco, que todos já enxergam. Com Redis, aponte os dois para ele.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'versoes': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'cache_versoes',
+    },
+}
+
+# Métricas por request (core.desempenho): requests acima do limite vão para o log 'core.desempenho'
+DESEMPENHO = {
+    'ATIVO': True,
+    'LIMITE_LENTO_MS': 500,
+    # Tempo de templates: troca Template.render no processo todo, ligue só para perfilar
+    'MEDIR_TEMPLATES': False,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.desempenho': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
+# Cache de imposição (orcamentos.utils.CacheImposicao)
+# ALIAS: qual cache do Django usar como camada compartilhada (None = só memória do processo)
+IMPOSICAO_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': 60 * 60 * 24,
+    'MAX_ITENS': 2048,
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -127,9 +191,19 @@ THOUSAND_SEPARATOR = '.'
 
 STATIC_URL = 'static/'
 
-STATICFILES_DIRS = [
-    BASE_DIR / "core/static",
-]
+# Destino do collectstatic (servido pelo nginx; ver core/estaticos.py)
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Em produção: nomes com hash + .gz/.br gerados no collectstatic (python manage.py compilar_estaticos)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'core.estaticos.ArmazenamentoEstatico'
+        ),
+    },
+}
 
 UNFOLD = {
     "SITE_TITLE": "Print IA | Sistema Gráfico",
@@ -242,6 +316,16 @@ UNFOLD = {
                         "icon": "speed", 
                         "link": reverse_lazy("admin:materiais_leituraimpressora_changelist"),
                     },
+                    {
+                        "title": "Produção Mensal",
+                        "icon": "bar_chart",
+                        "link": reverse_lazy("admin:materiais_producaoimpressorames_changelist"),
+                    },
+                    {
+                        "title": "Produção Diária",
+                        "icon": "calendar_month",
+                        "link": reverse_lazy("admin:materiais_producaoimpressoradia_changelist"),
+                    },
                 ],
             },
             {
@@ -0,0 +1,56 @@
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.template.backends.django import Template as TemplateDjango
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from .desempenho import _render_original, histogramas
+from .estaticos import exigir_estaticos_compilados, verificar_estaticos_compilados
+
+
+class EstaticosCompiladosTests(SimpleTestCase):
+
+    def test_avisa_quando_dist_nao_existe(self):
+        with mock.patch('core.estaticos.finders.find', return_value=None):
+            self.assertEqual([e.id for e in verificar_estaticos_compilados(None)], ['core.W001'])
+            self.assertEqual([e.id for e in exigir_estaticos_compilados(None)], ['core.E001'])
+
+    def test_sem_aviso_depois_do_build(self):
+        with mock.patch('core.estaticos.finders.find', return_value='/tmp/arquivo'):
+            self.assertEqual(verificar_estaticos_compilados(None), [])
+            self.assertEqual(exigir_estaticos_compilados(None), [])
+
+
+class DesempenhoTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('staff', password='senha', is_staff=True))
+        self.addCleanup(histogramas.zerar)
+
+    def test_templates_nao_sao_medidos_por_padrao(self):
+        resposta = self.client.get(reverse('painel_desempenho'))
+        self.assertIs(TemplateDjango.render, _render_original)
+        self.assertNotIn('tpl;', resposta['Server-Timing'])
+        self.assertFalse(resposta.json()['templates_medidos'])
+
+    def test_zerar_so_por_post(self):
+        url = reverse('painel_desempenho')
+        self.client.get(url, {'zerar': 1})
+        self.client.get(url, {'zerar': 1})
+        # Cada request entra no histograma depois de responder: a terceira leitura vê as duas anteriores
+        self.assertEqual(self.client.get(url).json()['views']['painel_desempenho']['requests'], 2)
+
+        self.client.post(url)
+        self.assertEqual(self.client.get(url).json()['views']['painel_desempenho']['requests'], 1)
+
+    @override_settings(DESEMPENHO={'ATIVO': True, 'LIMITE_LENTO_MS': 0})
+    async def test_request_lento_assincrono_registra_usuario(self):
+        usuario = await User.objects.acreate(username='vendedor')
+        await self.async_client.aforce_login(usuario)
+        with self.assertLogs('core.desempenho', 'WARNING') as logs:
+            resposta = await self.async_client.get(reverse('orcamentos:buscar_cliente'), {'q': 'maria'})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(json.loads(logs.records[-1].getMessage())['usuario'], usuario.pk)
+
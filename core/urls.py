@@ -17,7 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from core.desempenho import painel_desempenho
+
 urlpatterns = [
+    # Antes do admin: senão cai no catch-all do admin.site.urls
+    path('admin/desempenho/', painel_desempenho, name='painel_desempenho'),
     path('admin/', admin.site.urls),
     path('orcamentos/', include('orcamentos.urls')),
 ]
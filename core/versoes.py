@@ -0,0 +1,12 @@
+"""
+Cache dos tokens de versão (settings.CACHES['versoes']).
+
+Índices em memória (materiais.precos), KPIs do admin (materiais.kpi) e a
+ConfiguracaoGlobal guardam dados por processo e conferem aqui se alguém mudou
+algo. Por isso o backend precisa ser visto por todos os workers: por padrão é
+uma tabela no próprio banco (criada pela migração materiais 0007).
+"""
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+cache_versoes = ConnectionProxy(caches, 'versoes')
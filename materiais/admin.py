@@ -7,7 +7,9 @@ from unfold.contrib.filters.admin import (
     DropdownFilter
 )
 from django.utils.formats import number_format
-from django.db.models import Sum, F, DecimalField # <--- Importante para os cálculos dos Cards
+from django.db.models import Sum, Count, Avg, Q, F, DecimalField # <--- Importante para os cálculos dos Cards
+from django.core.cache import cache
+import hashlib
 
 # CORREÇÃO: Removido TabelaPrecoInsumo das importações pois não existe mais
 from .models import (
@@ -15,8 +17,24 @@ from .models import (
     Insumo, CompraInsumo, CategoriaInsumo,
     Acabamento, TabelaPrecoAcabamento, CategoriaAcabamento,
     Impressora, ComponenteImpressora, TrocaSuprimento, LeituraImpressora,
+    ProducaoImpressoraDia, ProducaoImpressoraMes,
     GuilhotinaConfig
 )  
+from .precos import faixas_papel, faixas_acabamento
+from .kpi import versao_kpi
+from .exportacao import LAYOUT_POR_MODEL, resposta_exportacao
+
+# --- EXPORTAÇÃO (streaming; ver materiais.exportacao) ---
+# Com "selecionar todos" a action recebe o changelist filtrado inteiro, não só a página
+@admin.action(description="Exportar selecionados (CSV)", permissions=['view'])
+def exportar_csv(modeladmin, request, queryset):
+    return resposta_exportacao(LAYOUT_POR_MODEL[modeladmin.model], 'csv', queryset=queryset)
+
+
+@admin.action(description="Exportar selecionados (Excel)", permissions=['view'])
+def exportar_xlsx(modeladmin, request, queryset):
+    return resposta_exportacao(LAYOUT_POR_MODEL[modeladmin.model], 'xlsx', queryset=queryset)
+
 
 @admin.register(GuilhotinaConfig)
 class GuilhotinaConfigAdmin(ModelAdmin):
@@ -54,10 +72,55 @@ class TabelaPrecoAcabamentoInline(TabularInline):
     verbose_name = "Faixa de Preço"
     verbose_name_plural = "Tabela de Venda (Serviço)"
 
+# --- CARDS DE KPI NOS CHANGELISTS ---
+class KpiChangelistMixin:
+    """
+    Calcula os cards de KPI do changelist com um único aggregate() sobre o queryset
+    filtrado e guarda o resultado no cache por filtro (querystring).
+    O cache é invalidado pelos signals de materiais.signals (ver materiais.kpi).
+    """
+    kpi_grupo = None
+    kpi_agregados = {}
+    kpi_timeout = 60 * 10
+    # Parâmetros que não mudam o conjunto filtrado (página e ordenação)
+    kpi_ignorar_params = ('p', 'o')
+
+    def chave_kpi(self, request):
+        params = sorted(
+            (k, v) for k, valores in request.GET.lists() if k not in self.kpi_ignorar_params for v in valores
+        )
+        filtro = hashlib.md5(repr(params).encode()).hexdigest()
+        return f'kpi:{self.kpi_grupo}:{versao_kpi(self.kpi_grupo)}:{filtro}'
+
+    def calcular_kpi(self, request, qs):
+        chave = self.chave_kpi(request)
+        kpi = cache.get(chave)
+        if kpi is None:
+            kpi = qs.order_by().aggregate(**self.kpi_agregados)
+            cache.set(chave, kpi, self.kpi_timeout)
+        return kpi
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        try:
+            qs = response.context_data['cl'].queryset
+        except (AttributeError, KeyError):
+            return response
+
+        response.context_data['kpi'] = self.calcular_kpi(request, qs)
+        return response
+
+
 # ADMINS
 @admin.register(Papel)
-class PapelAdmin(ModelAdmin):
+class PapelAdmin(KpiChangelistMixin, ModelAdmin):
     change_list_template = "admin/materiais/papel/change_list.html"
+    kpi_grupo = 'papel'
+    kpi_agregados = {
+        'total_papeis': Count('id'),
+        'total_pacotes': Sum('estoque_atual'),
+        'valor_estoque': Sum(F('estoque_atual') * F('ultimo_valor_pacote'), output_field=DecimalField()),
+    }
 
     list_display = ['nome', 'gramatura', 'formato_legivel', 'estoque_atual', 'exibir_valor_pacote', 'exibir_preco_atual', 'exibir_faixas_preco']
     search_fields = ['nome', 'gramatura']
@@ -73,29 +136,13 @@ class PapelAdmin(ModelAdmin):
     )
 
     def exibir_faixas_preco(self, obj):
-        precos = obj.tabela_precos.all()[:3] 
+        # Índice em memória: nenhuma consulta por linha
+        precos = faixas_papel.faixas(obj.pk)[1][:3]
         if not precos:
             return "-"
-        return f"De R$ {number_format(precos[0].valor_venda, 2)} a R$ {number_format(precos[len(precos)-1].valor_venda, 2)}"
+        return f"De R$ {number_format(precos[0], 2)} a R$ {number_format(precos[-1], 2)}"
     exibir_faixas_preco.short_description = "Escala de Venda"
 
-    def changelist_view(self, request, extra_context=None):
-        response = super().changelist_view(request, extra_context)
-        try:
-            qs = response.context_data['cl'].queryset
-        except (AttributeError, KeyError):
-            return response
-            
-        metrics = {
-            'total_papeis': qs.count(),
-            'total_pacotes': qs.aggregate(Sum('estoque_atual'))['estoque_atual__sum'] or 0,
-            'valor_estoque': qs.aggregate(
-                total=Sum(F('estoque_atual') * F('ultimo_valor_pacote'), output_field=DecimalField())
-            )['total'] or 0
-        }
-        response.context_data['kpi'] = metrics
-        return response
-
     def exibir_preco_atual(self, obj):
         valor = number_format(obj.ultimo_preco_unitario, decimal_pos=4)
         return f"R$ {valor}"
@@ -114,6 +161,7 @@ class CompraPapelAdmin(ModelAdmin):
         ('papel', MultipleRelatedDropdownFilter), 
         ('fornecedor', MultipleRelatedDropdownFilter),
     ]
+    actions = [exportar_csv, exportar_xlsx]
     autocomplete_fields = ['papel', 'fornecedor']
     
     def exibir_unitario(self, obj):
@@ -133,6 +181,7 @@ class SaidaEstoqueAdmin(ModelAdmin):
         ('papel', MultipleRelatedDropdownFilter), 
         ('usuario', MultipleRelatedDropdownFilter),
     ]
+    actions = [exportar_csv, exportar_xlsx]
     autocomplete_fields = ['papel']
     fields = ['papel', 'qtd_pacotes_baixa', 'observacao']
     
@@ -179,8 +228,16 @@ class CategoriaAcabamentoAdmin(ModelAdmin):
     visualizacao_cor.short_description = "Visualização"
 
 @admin.register(Insumo)
-class InsumoAdmin(ModelAdmin):
+class InsumoAdmin(KpiChangelistMixin, ModelAdmin):
+    change_list_template = "admin/materiais/insumo/change_list.html"
+    kpi_grupo = 'insumo'
+    kpi_agregados = {
+        'total_insumos': Count('id'),
+        'sem_estoque': Count('id', filter=Q(estoque_atual__lte=0)),
+        'valor_estoque': Sum(F('estoque_atual') * F('ultimo_preco_custo'), output_field=DecimalField()),
+    }
     list_display = ['nome', 'exibir_tag', 'unidade_medida', 'exibir_custo']
+    list_select_related = ['categoria']
     search_fields = ['nome']
     list_filter = [('categoria', MultipleRelatedDropdownFilter)]
     
@@ -209,6 +266,7 @@ class CompraInsumoAdmin(ModelAdmin):
         ('insumo', MultipleRelatedDropdownFilter),
         ('fornecedor', MultipleRelatedDropdownFilter),
     ]
+    actions = [exportar_csv, exportar_xlsx]
     autocomplete_fields = ['insumo', 'fornecedor']
 
     def exibir_total(self, obj):
@@ -222,6 +280,7 @@ class CompraInsumoAdmin(ModelAdmin):
 @admin.register(Acabamento)
 class AcabamentoAdmin(ModelAdmin):
     list_display = ['nome', 'exibir_tag', 'exibir_faixas']
+    list_select_related = ['categoria']
     search_fields = ['nome']
     list_filter = [('categoria', MultipleRelatedDropdownFilter)]
     
@@ -234,9 +293,9 @@ class AcabamentoAdmin(ModelAdmin):
     exibir_tag.short_description = "Categoria"
 
     def exibir_faixas(self, obj):
-        precos = obj.tabela_precos.all()
+        precos = faixas_acabamento.faixas(obj.pk)[1]
         if not precos: return "-"
-        return f"Inicia em R$ {number_format(precos[0].valor_venda, 2)}"
+        return f"Inicia em R$ {number_format(precos[0], 2)}"
     exibir_faixas.short_description = "Preço Base"
 
 # ==========================================
@@ -253,7 +312,14 @@ class ComponenteInline(TabularInline):
     verbose_name_plural = "Componentes Instalados"
 
 @admin.register(Impressora)
-class ImpressoraAdmin(ModelAdmin):
+class ImpressoraAdmin(KpiChangelistMixin, ModelAdmin):
+    change_list_template = "admin/materiais/impressora/change_list.html"
+    kpi_grupo = 'impressora'
+    kpi_agregados = {
+        'total_impressoras': Count('id'),
+        'contador_total': Sum('contador_total_atual'),
+        'click_medio_color': Avg('custo_click_color'),
+    }
     list_display = ['nome', 'modelo', 'contador_total_atual', 'exibir_click_mono', 'exibir_click_color']
     inlines = [ComponenteInline]
     
@@ -276,6 +342,7 @@ class ImpressoraAdmin(ModelAdmin):
 @admin.register(ComponenteImpressora)
 class ComponenteImpressoraAdmin(ModelAdmin):
     list_display = ['nome', 'impressora', 'cor', 'exibir_custo_medio']
+    list_select_related = ['impressora']
     list_filter = ['impressora', 'tipo', 'cor']
     search_fields = ['nome']
     
@@ -287,12 +354,14 @@ class ComponenteImpressoraAdmin(ModelAdmin):
 @admin.register(TrocaSuprimento)
 class TrocaSuprimentoAdmin(ModelAdmin):
     list_display = ['data_formatada', 'componente_nome', 'contador_no_momento', 'valor_compra', 'rendimento_anterior']
+    list_select_related = ['componente__impressora']
     list_filter = [
         ('data_troca', RangeDateFilter),
         'componente__impressora',
         'componente',
     ]
     autocomplete_fields = ['componente', 'fornecedor']
+    actions = [exportar_csv, exportar_xlsx]
     search_fields = ['componente__nome']
 
     def componente_nome(self, obj):
@@ -313,4 +382,34 @@ class TrocaSuprimentoAdmin(ModelAdmin):
 @admin.register(LeituraImpressora)
 class LeituraImpressoraAdmin(ModelAdmin):
     list_display = ['impressora', 'data_leitura', 'contador_total']
-    list_filter = ['impressora', ('data_leitura', RangeDateFilter)]
\ No newline at end of file
+    list_filter = ['impressora', ('data_leitura', RangeDateFilter)]
+    list_select_related = ['impressora']
+
+
+class ProducaoAdminMixin:
+    """Tabelas de produção são mantidas por materiais.leituras: só leitura no admin."""
+    list_select_related = ['impressora']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ProducaoImpressoraDia)
+class ProducaoImpressoraDiaAdmin(ProducaoAdminMixin, ModelAdmin):
+    list_display = ['impressora', 'data', 'paginas', 'leituras', 'contador_final']
+    list_filter = ['impressora', ('data', RangeDateFilter)]
+    date_hierarchy = 'data'
+
+
+@admin.register(ProducaoImpressoraMes)
+class ProducaoImpressoraMesAdmin(ProducaoAdminMixin, ModelAdmin):
+    list_display = ['impressora', 'mes_formatado', 'paginas', 'leituras', 'contador_final']
+    list_filter = ['impressora', ('mes', RangeDateFilter)]
+
+    def mes_formatado(self, obj):
+        return obj.mes.strftime('%m/%Y')
+    mes_formatado.short_description = "Mês"
+    mes_formatado.admin_order_field = 'mes'
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class MateriaisConfig(AppConfig):
     name = 'materiais'
+
+    def ready(self):
+        from . import signals  # noqa: F401
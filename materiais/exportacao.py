@@ -0,0 +1,295 @@
+"""
+Exportação em streaming do histórico de movimentos (CSV ou XLSX).
+
+A contabilidade puxa anos de CompraPapel, SaidaEstoque, CompraInsumo e
+TrocaSuprimento. Cada exportação é um gerador: as linhas vêm do banco em
+blocos (iterator(chunk_size=...)), com os nomes das chaves estrangeiras no
+mesmo SELECT, e cada bloco vira bytes e é entregue antes de ler o próximo.
+A memória não cresce com o número de linhas.
+
+O XLSX é montado com zipfile (planilha com textos inline e um estilo de data):
+o zip é escrito num buffer esvaziado a cada bloco, então também sai em
+streaming, sem openpyxl. Acima de ~1 milhão de linhas o Excel não abre: use CSV.
+
+O filtro de período compara a coluna de data direto (sem __date), para usar o
+índice de data de cada modelo.
+"""
+import csv
+import re
+import zipfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import CompraPapel, SaidaEstoque, CompraInsumo, TrocaSuprimento
+
+TAMANHO_BLOCO = 2000
+
+# Colunas: (cabeçalho, campo de values_list); chaves estrangeiras por lookup (JOIN no mesmo SELECT)
+LAYOUTS = {
+    'compras_papel': {
+        'model': CompraPapel,
+        'data': 'data_compra',
+        'colunas': [
+            ('ID', 'pk'),
+            ('Data', 'data_compra'),
+            ('Papel', 'papel__nome'),
+            ('Gramatura', 'papel__gramatura'),
+            ('Fornecedor', 'fornecedor__nome_empresa'),
+            ('Pacotes', 'qtd_pacotes_compra'),
+            ('Folhas por pacote', 'qtd_embalagem'),
+            ('Valor pacote', 'valor_pacote'),
+            ('Custo folha', 'valor_unitario'),
+        ],
+    },
+    'saidas_estoque': {
+        'model': SaidaEstoque,
+        'data': 'data_movimento',
+        'colunas': [
+            ('ID', 'pk'),
+            ('Data/Hora', 'data_movimento'),
+            ('Papel', 'papel__nome'),
+            ('Gramatura', 'papel__gramatura'),
+            ('Pacotes', 'qtd_pacotes_baixa'),
+            ('Usuário', 'usuario__username'),
+            ('Observação', 'observacao'),
+        ],
+    },
+    'compras_insumo': {
+        'model': CompraInsumo,
+        'data': 'data_compra',
+        'colunas': [
+            ('ID', 'pk'),
+            ('Data', 'data_compra'),
+            ('Insumo', 'insumo__nome'),
+            ('Fornecedor', 'fornecedor__nome_empresa'),
+            ('Quantidade', 'qtd_compra'),
+            ('Valor nota', 'valor_total_nota'),
+            ('Custo unitário', 'valor_unitario'),
+        ],
+    },
+    'trocas_suprimento': {
+        'model': TrocaSuprimento,
+        'data': 'data_troca',
+        'colunas': [
+            ('ID', 'pk'),
+            ('Data', 'data_troca'),
+            ('Impressora', 'componente__impressora__nome'),
+            ('Componente', 'componente__nome'),
+            ('Cor', 'componente__cor'),
+            ('Fornecedor', 'fornecedor__nome_empresa'),
+            ('Contador', 'contador_no_momento'),
+            ('Valor', 'valor_compra'),
+            ('Rendimento real (pág)', 'rendimento_real'),
+        ],
+    },
+}
+
+LAYOUT_POR_MODEL = {layout['model']: nome for nome, layout in LAYOUTS.items()}
+
+
+def linhas(nome, inicio=None, fim=None, queryset=None):
+    """
+    Gera as tuplas do layout em ordem de data, lidas em blocos.
+    'inicio'/'fim' (date, inclusivos) filtram pelo índice da coluna de data;
+    'queryset' (ex: seleção de uma action do admin) restringe as linhas.
+    """
+    layout = LAYOUTS[nome]
+    model = layout['model']
+    campo = layout['data']
+    qs = queryset if queryset is not None else model.objects.all()
+
+    if model._meta.get_field(campo).get_internal_type() == 'DateTimeField':
+        # Coluna datetime: intervalo [início 00:00, dia seguinte ao fim 00:00) no fuso local
+        if inicio:
+            qs = qs.filter(**{f'{campo}__gte': timezone.make_aware(datetime.combine(inicio, time.min))})
+        if fim:
+            qs = qs.filter(**{f'{campo}__lt': timezone.make_aware(datetime.combine(fim + timedelta(days=1), time.min))})
+    else:
+        if inicio:
+            qs = qs.filter(**{f'{campo}__gte': inicio})
+        if fim:
+            qs = qs.filter(**{f'{campo}__lte': fim})
+
+    campos = [campo_valor for _, campo_valor in layout['colunas']]
+    return qs.order_by(campo, 'pk').values_list(*campos).iterator(chunk_size=TAMANHO_BLOCO)
+
+
+# ------------------------------------------------------------------
+# CSV (Excel pt-BR: ';', vírgula decimal, datas dd/mm/aaaa)
+# ------------------------------------------------------------------
+class _Eco:
+    """'Arquivo' que devolve o que recebe: csv.writer.writerow() passa a retornar a linha."""
+
+    def write(self, valor):
+        return valor
+
+
+def _valor_csv(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        if timezone.is_aware(valor):
+            valor = timezone.localtime(valor)
+        return valor.strftime('%d/%m/%Y %H:%M')
+    if isinstance(valor, date):
+        return valor.strftime('%d/%m/%Y')
+    if isinstance(valor, (Decimal, float)):
+        return str(valor).replace('.', ',')
+    return valor
+
+
+def gerar_csv(nome, linhas_iter):
+    """Bytes UTF-8 (com BOM, para o Excel) em blocos de TAMANHO_BLOCO linhas."""
+    escritor = csv.writer(_Eco(), delimiter=';')
+    yield ('\ufeff' + escritor.writerow([titulo for titulo, _ in LAYOUTS[nome]['colunas']])).encode()
+    bloco = []
+    for linha in linhas_iter:
+        bloco.append(escritor.writerow([_valor_csv(v) for v in linha]))
+        if len(bloco) >= TAMANHO_BLOCO:
+            yield ''.join(bloco).encode()
+            bloco.clear()
+    if bloco:
+        yield ''.join(bloco).encode()
+
+
+# ------------------------------------------------------------------
+# XLSX mínimo em streaming
+# ------------------------------------------------------------------
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{nome}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+# Estilos: 0 = padrão, 1 = data (formato 14), 2 = data e hora (formato 22)
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '</styleSheet>'
+)
+_EPOCA_EXCEL = datetime(1899, 12, 30)
+# Caracteres de controle não são permitidos em XML
+_INVALIDOS_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class _BufferZip:
+    """Destino do zipfile sem seek: acumula o que foi escrito até ser esvaziado."""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def esvaziar(self):
+        dados = b''.join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+def _celula_xlsx(valor):
+    if valor is None:
+        return '<c/>'
+    if isinstance(valor, bool):
+        valor = int(valor)
+    if isinstance(valor, datetime):
+        if timezone.is_aware(valor):
+            valor = timezone.make_naive(valor)
+        serial = (valor - _EPOCA_EXCEL).total_seconds() / 86400
+        return f'<c s="2"><v>{serial:.6f}</v></c>'
+    if isinstance(valor, date):
+        return f'<c s="1"><v>{(valor - _EPOCA_EXCEL.date()).days}</v></c>'
+    if isinstance(valor, (int, float, Decimal)):
+        return f'<c><v>{valor}</v></c>'
+    texto = escape(_INVALIDOS_XML.sub('', str(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _linha_xlsx(valores):
+    return '<row>' + ''.join(_celula_xlsx(v) for v in valores) + '</row>'
+
+
+def gerar_xlsx(nome, linhas_iter):
+    """Bytes do .xlsx em blocos de TAMANHO_BLOCO linhas."""
+    buffer = _BufferZip()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as arquivo:
+        arquivo.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        arquivo.writestr('_rels/.rels', _RELS)
+        arquivo.writestr('xl/workbook.xml', _WORKBOOK.format(nome=escape(nome[:31])))
+        arquivo.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        arquivo.writestr('xl/styles.xml', _STYLES)
+        with arquivo.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as planilha:
+            planilha.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            planilha.write(_linha_xlsx(titulo for titulo, _ in LAYOUTS[nome]['colunas']).encode())
+            bloco = []
+            for linha in linhas_iter:
+                bloco.append(_linha_xlsx(linha))
+                if len(bloco) >= TAMANHO_BLOCO:
+                    planilha.write(''.join(bloco).encode())
+                    bloco.clear()
+                    yield buffer.esvaziar()
+            planilha.write(''.join(bloco).encode())
+            planilha.write(b'</sheetData></worksheet>')
+    yield buffer.esvaziar()
+
+
+FORMATOS = {
+    'csv': (gerar_csv, 'text/csv; charset=utf-8'),
+    'xlsx': (gerar_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+def gerar(nome, formato='csv', inicio=None, fim=None, queryset=None):
+    """Gerador de bytes do arquivo exportado."""
+    gerador, _ = FORMATOS[formato]
+    return gerador(nome, linhas(nome, inicio, fim, queryset))
+
+
+def resposta_exportacao(nome, formato='csv', inicio=None, fim=None, queryset=None):
+    """StreamingHttpResponse com o arquivo (download)."""
+    _, content_type = FORMATOS[formato]
+    resposta = StreamingHttpResponse(gerar(nome, formato, inicio, fim, queryset), content_type=content_type)
+    arquivo = f"{nome}_{timezone.localdate():%Y%m%d}.{formato}"
+    resposta['Content-Disposition'] = f'attachment; filename="{arquivo}"'
+    return resposta
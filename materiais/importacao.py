@@ -0,0 +1,242 @@
+"""
+Importação em lote de notas de fornecedores (CompraPapel / CompraInsumo).
+
+As linhas são lidas em streaming (CSV ou JSONL), validadas em blocos e gravadas
+com bulk_create dentro de uma única transação. O estoque e o último preço de
+cada Papel/Insumo afetado são atualizados uma vez só, no final.
+
+Valores decimais em texto (CSV) seguem o formato brasileiro: vírgula decimal e
+ponto só como separador de milhar ("1.234,56", "1234,56", "1.234" = mil duzentos
+e trinta e quatro). "12.50" é recusado em vez de virar 1250 ou 12,5 por palpite.
+Números do JSONL (12.5) são números, sem essa ambiguidade.
+
+O fornecedor precisa atender o limit_choices_to da FK do modelo (segmento
+PAPEL para compras de papel, INSUMO para insumos), como no admin.
+"""
+import csv
+import io
+import json
+import re
+import time
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import BooleanField, Case, F, Q, Value, When
+
+from .models import Papel, Insumo, Fornecedor, CompraPapel, CompraInsumo
+from .kpi import invalidar_kpi
+from .precos import catalogo
+
+# Colunas esperadas por tipo de importação
+LAYOUTS = {
+    'papel': {
+        'model': CompraPapel,
+        'produto': ('papel', Papel),
+        'inteiros': ['qtd_pacotes_compra', 'qtd_embalagem'],
+        'decimais': ['valor_pacote'],
+    },
+    'insumo': {
+        'model': CompraInsumo,
+        'produto': ('insumo', Insumo),
+        'inteiros': [],
+        'decimais': ['qtd_compra', 'valor_total_nota'],
+    },
+}
+
+
+class ErroImportacao(Exception):
+    """Levantada para desfazer a transação quando alguma linha é inválida."""
+
+
+def ler_linhas(arquivo, formato='csv'):
+    """Gera um dict por linha do arquivo (CSV com cabeçalho ou JSON Lines)."""
+    if isinstance(arquivo, (bytes, bytearray)):
+        arquivo = io.StringIO(arquivo.decode('utf-8-sig'))
+    elif isinstance(arquivo, str):
+        arquivo = io.StringIO(arquivo)
+
+    if formato == 'jsonl':
+        for linha in arquivo:
+            linha = linha.strip()
+            if linha:
+                yield json.loads(linha, parse_float=Decimal)
+    else:
+        amostra = arquivo.read(2048)
+        arquivo.seek(0)
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=',;\t') if amostra else csv.excel
+        yield from csv.DictReader(arquivo, dialect=dialeto)
+
+
+# Texto em formato brasileiro: milhar com ponto (em grupos de 3) e decimais com vírgula
+DECIMAL_BR = re.compile(r'-?(\d{1,3}(\.\d{3})+|\d+)(,\d+)?')
+
+
+def converter_decimal(valor):
+    """Número (JSON) ou texto pt-BR ('1.234,56') -> Decimal; ValueError se o texto for ambíguo."""
+    if isinstance(valor, (int, Decimal)) and not isinstance(valor, bool):
+        return Decimal(valor)
+    if isinstance(valor, float):
+        return Decimal(str(valor))
+    texto = str(valor).strip()
+    if not DECIMAL_BR.fullmatch(texto):
+        raise ValueError(f"valor inválido '{texto}' (use o formato 1.234,56)")
+    return Decimal(texto.replace('.', '').replace(',', '.'))
+
+
+def converter_data(valor):
+    """date, 'AAAA-MM-DD' ou 'DD/MM/AAAA' -> date; ValueError se não for nenhum deles."""
+    if isinstance(valor, date):
+        return valor
+    valor = str(valor).strip()
+    for formato in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(valor, formato).date()
+        except ValueError:
+            continue
+    raise ValueError(f"data inválida '{valor}'")
+
+
+def _validar_bloco(bloco, layout, inicio):
+    """
+    Valida um bloco de linhas com duas consultas (produtos e fornecedores do bloco).
+    Retorna (objetos válidos, erros).
+    """
+    campo_produto, model_produto = layout['produto']
+    model = layout['model']
+
+    ids_produto = {str(l.get(campo_produto, '')).strip() for l in bloco}
+    ids_fornecedor = {str(l.get('fornecedor', '')).strip() for l in bloco}
+    produtos = set(
+        model_produto.objects.filter(pk__in=[i for i in ids_produto if i.isdigit()])
+        .values_list('pk', flat=True)
+    )
+    # Mesma restrição de segmento do admin (limit_choices_to da FK)
+    limite = model._meta.get_field('fornecedor').get_limit_choices_to()
+    limite = Q(**limite) if isinstance(limite, dict) else limite
+    fornecedores = dict(
+        Fornecedor.objects.filter(pk__in=[i for i in ids_fornecedor if i.isdigit()])
+        .annotate(permitido=Case(When(limite, then=Value(True)), default=Value(False), output_field=BooleanField()))
+        .values_list('pk', 'permitido')
+    )
+
+    objetos, erros = [], []
+    for numero, linha in enumerate(bloco, start=inicio):
+        try:
+            produto_id = int(linha.get(campo_produto))
+            fornecedor_id = int(linha.get('fornecedor'))
+            if produto_id not in produtos:
+                raise ValueError(f"{campo_produto} {produto_id} não existe")
+            if fornecedor_id not in fornecedores:
+                raise ValueError(f"fornecedor {fornecedor_id} não existe")
+            if not fornecedores[fornecedor_id]:
+                raise ValueError(f"fornecedor {fornecedor_id} não é do segmento de {campo_produto}")
+
+            dados = {
+                f'{campo_produto}_id': produto_id,
+                'fornecedor_id': fornecedor_id,
+                'data_compra': converter_data(linha.get('data_compra')),
+            }
+            for campo in layout['inteiros']:
+                dados[campo] = int(linha.get(campo))
+            for campo in layout['decimais']:
+                dados[campo] = converter_decimal(linha.get(campo))
+        except (TypeError, ValueError, InvalidOperation) as e:
+            erros.append((numero, str(e)))
+            continue
+
+        obj = model(**dados)
+        # bulk_create não chama save(): calcula o custo unitário aqui
+        if model is CompraPapel:
+            if obj.qtd_embalagem <= 0 or obj.valor_pacote <= 0:
+                erros.append((numero, "quantidade e valor devem ser positivos"))
+                continue
+            obj.valor_unitario = obj.valor_pacote / obj.qtd_embalagem
+        else:
+            if obj.qtd_compra <= 0 or obj.valor_total_nota <= 0:
+                erros.append((numero, "quantidade e valor devem ser positivos"))
+                continue
+            obj.valor_unitario = obj.valor_total_nota / obj.qtd_compra
+        objetos.append(obj)
+
+    return objetos, erros
+
+
+def _atualizar_produtos(tipo, resumo):
+    """Uma atualização por produto afetado: soma do lote + último preço da nota."""
+    for produto_id, (quantidade, ultima) in resumo.items():
+        if tipo == 'papel':
+            Papel.objects.filter(pk=produto_id).update(
+                estoque_atual=F('estoque_atual') + quantidade,
+                ultimo_preco_unitario=ultima.valor_unitario,
+                ultimo_valor_pacote=ultima.valor_pacote,
+            )
+        else:
+            Insumo.objects.filter(pk=produto_id).update(
+                estoque_atual=F('estoque_atual') + quantidade,
+                ultimo_preco_custo=ultima.valor_unitario,
+            )
+
+
+def importar_compras(linhas, tipo='papel', tamanho_bloco=500, dry_run=False):
+    """
+    Importa um iterável de dicts (ver ler_linhas) como compras de papel ou insumo.
+
+    Tudo acontece em uma transação: se qualquer linha for inválida nada é gravado
+    e os erros são devolvidos com o número da linha. Retorna um dict com o resumo.
+    """
+    layout = LAYOUTS[tipo]
+    campo_produto = layout['produto'][0]
+    campo_qtd = 'qtd_pacotes_compra' if tipo == 'papel' else 'qtd_compra'
+
+    inicio = time.perf_counter()
+    total_linhas = 0
+    validas = 0
+    importadas = 0
+    erros = []
+    resumo = {}  # produto_id -> [quantidade acumulada, última compra]
+
+    linhas = iter(linhas)
+    try:
+        with transaction.atomic():
+            while True:
+                bloco = list(islice(linhas, tamanho_bloco))
+                if not bloco:
+                    break
+                objetos, erros_bloco = _validar_bloco(bloco, layout, total_linhas + 1)
+                total_linhas += len(bloco)
+                validas += len(objetos)
+                erros.extend(erros_bloco)
+                if erros:
+                    # Continua validando para relatar todos os erros, mas não grava mais nada
+                    continue
+
+                layout['model'].objects.bulk_create(objetos, batch_size=tamanho_bloco)
+                importadas += len(objetos)
+                for obj in objetos:
+                    item = resumo.setdefault(getattr(obj, f'{campo_produto}_id'), [0, None])
+                    item[0] += getattr(obj, campo_qtd)
+                    item[1] = obj
+
+            if erros or dry_run:
+                raise ErroImportacao
+            _atualizar_produtos(tipo, resumo)
+            # bulk_create/update não disparam signals
+            transaction.on_commit(lambda: invalidar_kpi(tipo))
+            if tipo == 'papel':
+                # Último preço da folha mudou: ranking de papéis e combinações leem o catálogo em memória
+                transaction.on_commit(catalogo.invalidar)
+    except ErroImportacao:
+        importadas = 0
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'linhas': total_linhas,
+        'validas': validas,
+        'importadas': importadas,
+        'produtos_afetados': len(resumo),
+        'erros': erros,
+        'segundos': segundos,
+        'linhas_por_segundo': total_linhas / segundos if segundos else 0,
+    }
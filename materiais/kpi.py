@@ -0,0 +1,34 @@
+"""
+Versões de cache dos KPIs dos changelists do admin.
+
+Cada grupo (papel, insumo, impressora) tem um número de versão no cache;
+o grupo 'cliente' versiona as contagens da lista de clientes (orcamentos.paginacao);
+os KPIs ficam guardados por filtro sob essa versão. Qualquer movimentação
+que altere os números troca a versão e invalida todos os filtros de uma vez.
+
+A versão fica no cache compartilhado (core.versoes), para todos os workers
+verem a troca; os valores, no cache de cada processo. A troca deve acontecer
+depois do commit: antes dele um leitor concorrente ainda vê os números antigos
+e os guardaria sob a versão nova.
+"""
+import time
+
+from core.versoes import cache_versoes
+
+
+def _chave(grupo):
+    return f'kpi:{grupo}:versao'
+
+
+def versao_kpi(grupo):
+    versao = cache_versoes.get(_chave(grupo))
+    if versao is None:
+        versao = time.time_ns()
+        cache_versoes.add(_chave(grupo), versao, None)
+        versao = cache_versoes.get(_chave(grupo), versao)
+    return versao
+
+
+def invalidar_kpi(*grupos):
+    for grupo in grupos:
+        cache_versoes.set(_chave(grupo), time.time_ns(), None)
@@ -0,0 +1,203 @@
+"""
+Ingestão de leituras de contador (LeituraImpressora) e produção pré-agregada.
+
+As páginas impressas entre duas leituras consecutivas da mesma impressora são
+somadas no dia e no mês da leitura mais nova (ProducaoImpressoraDia /
+ProducaoImpressoraMes). Relatórios leem essas tabelas em vez de percorrer e
+diferenciar o histórico bruto.
+
+registrar_leituras() é o caminho rápido para cargas em lote: valida que os
+contadores só crescem, grava com bulk_create e soma os deltas nas agregações
+(uma leitura + um bulk por tabela). Edições avulsas (admin) recalculam a
+impressora a partir do mês da leitura alterada com recalcular_producao();
+o histórico inteiro é refeito com: python manage.py importar_leituras --recalcular
+"""
+import time
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Max, OuterRef, Subquery
+
+from .importacao import converter_data
+from .models import Impressora, LeituraImpressora, ProducaoImpressoraDia, ProducaoImpressoraMes
+
+
+def _mes(data):
+    return data.replace(day=1)
+
+
+def _acumular(agregados, impressora_id, data, paginas, contador):
+    # agregados[(impressora, período)] = [páginas, leituras, contador final]
+    for chave, periodo in (('dia', data), ('mes', _mes(data))):
+        item = agregados[chave].setdefault((impressora_id, periodo), [0, 0, 0])
+        item[0] += paginas
+        item[1] += 1
+        item[2] = max(item[2], contador)
+
+
+def _somar_producao(model, campo_periodo, totais):
+    """Soma os totais novos às linhas existentes; cria as que faltam. Uma leitura + dois bulks."""
+    if not totais:
+        return
+    impressoras = {impressora_id for impressora_id, _ in totais}
+    periodos = {periodo for _, periodo in totais}
+    existentes = {
+        (linha.impressora_id, getattr(linha, campo_periodo)): linha
+        for linha in model.objects.select_for_update().filter(
+            impressora_id__in=impressoras, **{f'{campo_periodo}__in': periodos}
+        )
+    }
+    novas, alteradas = [], []
+    for (impressora_id, periodo), (paginas, leituras, contador) in totais.items():
+        linha = existentes.get((impressora_id, periodo))
+        if linha is None:
+            novas.append(model(
+                impressora_id=impressora_id, paginas=paginas, leituras=leituras,
+                contador_final=contador, **{campo_periodo: periodo},
+            ))
+        else:
+            linha.paginas += paginas
+            linha.leituras += leituras
+            linha.contador_final = max(linha.contador_final, contador)
+            alteradas.append(linha)
+    model.objects.bulk_create(novas, batch_size=500)
+    model.objects.bulk_update(alteradas, ['paginas', 'leituras', 'contador_final'], batch_size=500)
+
+
+def _validar(linhas):
+    """Converte e confere os tipos. Retorna ([(número, impressora_id, data, contador)], erros)."""
+    validas, erros = [], []
+    for numero, linha in enumerate(linhas, start=1):
+        try:
+            impressora_id = int(linha.get('impressora'))
+            data = converter_data(linha.get('data_leitura'))
+            contador = int(linha.get('contador_total'))
+            if contador < 0:
+                raise ValueError("contador negativo")
+        except (TypeError, ValueError) as e:
+            erros.append((numero, str(e)))
+            continue
+        validas.append((numero, impressora_id, data, contador))
+    return validas, erros
+
+
+def registrar_leituras(linhas, dry_run=False):
+    """
+    Registra um iterável de dicts {impressora, data_leitura, contador_total}.
+
+    Cada leitura precisa ser posterior (ou do mesmo dia) à última já gravada da
+    impressora e com contador maior ou igual. Tudo ou nada: com qualquer erro
+    nada é gravado e os erros voltam com o número da linha.
+    """
+    inicio = time.perf_counter()
+    linhas = list(linhas)
+    leituras, erros = _validar(linhas)
+
+    importadas = 0
+    with transaction.atomic():
+        ids = {impressora_id for _, impressora_id, _, _ in leituras}
+        # Trava as impressoras do lote: duas cargas simultâneas não leem a mesma "última leitura"
+        existentes = set(Impressora.objects.select_for_update().filter(pk__in=ids).values_list('pk', flat=True))
+        # Última leitura de cada impressora: com contador monotônico, o maior contador é o da última data
+        ultimas = {
+            linha['impressora_id']: (linha['data'], linha['contador'])
+            for linha in LeituraImpressora.objects.filter(impressora_id__in=existentes)
+            .values('impressora_id').annotate(data=Max('data_leitura'), contador=Max('contador_total'))
+        }
+
+        objetos = []
+        agregados = {'dia': {}, 'mes': {}}
+        leituras.sort(key=lambda l: (l[1], l[2], l[3]))
+        for impressora_id, grupo in groupby(leituras, key=lambda l: l[1]):
+            if impressora_id not in existentes:
+                erros.extend((numero, f"impressora {impressora_id} não existe") for numero, *_ in grupo)
+                continue
+            data_anterior, contador_anterior = ultimas.get(impressora_id, (None, None))
+            for numero, _, data, contador in grupo:
+                if data_anterior is not None and data < data_anterior:
+                    erros.append((numero, f"data anterior à última leitura ({data_anterior:%d/%m/%Y})"))
+                    continue
+                if contador_anterior is not None and contador < contador_anterior:
+                    erros.append((numero, f"contador {contador} menor que o anterior ({contador_anterior})"))
+                    continue
+                # A primeira leitura de uma impressora é só a base: não conta páginas
+                paginas = contador - contador_anterior if contador_anterior is not None else 0
+                _acumular(agregados, impressora_id, data, paginas, contador)
+                objetos.append(LeituraImpressora(impressora_id=impressora_id, data_leitura=data, contador_total=contador))
+                data_anterior, contador_anterior = data, contador
+
+        erros.sort()
+        if not erros and not dry_run:
+            LeituraImpressora.objects.bulk_create(objetos, batch_size=500)
+            _somar_producao(ProducaoImpressoraDia, 'data', agregados['dia'])
+            _somar_producao(ProducaoImpressoraMes, 'mes', agregados['mes'])
+            importadas = len(objetos)
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'linhas': len(linhas),
+        'validas': len(objetos),
+        'importadas': importadas,
+        'impressoras_afetadas': len({obj.impressora_id for obj in objetos}),
+        'erros': erros,
+        'segundos': segundos,
+        'linhas_por_segundo': len(linhas) / segundos if segundos else 0,
+    }
+
+
+@transaction.atomic
+def recalcular_producao(impressora_ids=None, desde=None):
+    """
+    Refaz as agregações a partir do histórico bruto (todas as impressoras ou só as informadas).
+
+    Com 'desde', só a partir do mês dessa data: o mês inteiro é refeito (o total mensal
+    depende dele todo) e a última leitura anterior serve de base para as páginas.
+    Usado após edição/exclusão de leituras e por importar_leituras --recalcular.
+    """
+    leituras = LeituraImpressora.objects.order_by('impressora_id', 'data_leitura', 'contador_total')
+    diarias = ProducaoImpressoraDia.objects.all()
+    mensais = ProducaoImpressoraMes.objects.all()
+    if impressora_ids is not None:
+        leituras = leituras.filter(impressora_id__in=impressora_ids)
+        diarias = diarias.filter(impressora_id__in=impressora_ids)
+        mensais = mensais.filter(impressora_id__in=impressora_ids)
+    anterior = {}
+    if desde is not None:
+        inicio = _mes(desde)
+        leituras = leituras.filter(data_leitura__gte=inicio)
+        diarias = diarias.filter(data__gte=inicio)
+        mensais = mensais.filter(mes__gte=inicio)
+        impressoras = Impressora.objects.all()
+        if impressora_ids is not None:
+            impressoras = impressoras.filter(pk__in=impressora_ids)
+        ultima = LeituraImpressora.objects.filter(
+            impressora_id=OuterRef('pk'), data_leitura__lt=inicio,
+        ).order_by('-data_leitura', '-contador_total').values('contador_total')[:1]
+        anterior = {
+            impressora_id: contador
+            for impressora_id, contador in impressoras.annotate(base=Subquery(ultima)).values_list('pk', 'base')
+            if contador is not None
+        }
+    diarias.delete()
+    mensais.delete()
+
+    agregados = {'dia': {}, 'mes': {}}
+    for impressora_id, data, contador in leituras.values_list(
+        'impressora_id', 'data_leitura', 'contador_total'
+    ).iterator(chunk_size=5000):
+        contador_anterior = anterior.get(impressora_id)
+        # Contador que voltou (troca de placa, erro antigo) não gera páginas negativas
+        paginas = max(contador - contador_anterior, 0) if contador_anterior is not None else 0
+        _acumular(agregados, impressora_id, data, paginas, contador)
+        anterior[impressora_id] = contador
+
+    ProducaoImpressoraDia.objects.bulk_create(
+        [ProducaoImpressoraDia(impressora_id=i, data=d, paginas=p, leituras=n, contador_final=c)
+         for (i, d), (p, n, c) in agregados['dia'].items()],
+        batch_size=1000,
+    )
+    ProducaoImpressoraMes.objects.bulk_create(
+        [ProducaoImpressoraMes(impressora_id=i, mes=m, paginas=p, leituras=n, contador_final=c)
+         for (i, m), (p, n, c) in agregados['mes'].items()],
+        batch_size=1000,
+    )
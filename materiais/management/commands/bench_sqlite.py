@@ -0,0 +1,158 @@
+import os
+import statistics
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction, OperationalError
+from django.db.models import F
+
+from materiais.models import Papel, SaidaEstoque
+from orcamentos.models import Cliente, Orcamento
+
+# Perfil "padrao" = settings originais (sqlite3 puro, conexão por request);
+# "producao" = core.db com PRAGMAs + conexão persistente + BEGIN IMMEDIATE
+PERFIS = {
+    'padrao': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {},
+    },
+    'producao': {
+        'ENGINE': 'core.db',
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+    },
+}
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(int(len(valores) * p), len(valores) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de concorrência do SQLite: baixas de estoque (escrita) e listas de "
+        "orçamento (leitura) em paralelo, no perfil padrão e no perfil de produção (core.db)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escritores', type=int, default=4)
+        parser.add_argument('--leitores', type=int, default=8)
+        parser.add_argument('--segundos', type=float, default=5.0)
+        parser.add_argument('--perfis', nargs='+', choices=sorted(PERFIS), default=['padrao', 'producao'])
+
+    def handle(self, *args, **options):
+        resultados = {}
+        with tempfile.TemporaryDirectory() as pasta:
+            for nome in options['perfis']:
+                alias = f'bench_{nome}'
+                self._registrar_banco(alias, os.path.join(pasta, f'{nome}.sqlite3'), PERFIS[nome])
+                try:
+                    call_command('migrate', database=alias, verbosity=0)
+                    self._popular(alias)
+                    resultados[nome] = self._rodar(alias, options)
+                finally:
+                    connections[alias].close()
+                    connections.settings.pop(alias, None)
+
+        for nome, r in resultados.items():
+            self.stdout.write(
+                f"{nome:<9} escrita {r['escritas'] / r['segundos']:8.0f} op/s "
+                f"(p95 {r['p95_escrita']:6.1f} ms)  leitura {r['leituras'] / r['segundos']:8.0f} op/s "
+                f"(p95 {r['p95_leitura']:6.1f} ms)  erros de lock {r['erros']}"
+            )
+        if {'padrao', 'producao'} <= resultados.keys():
+            base, prod = resultados['padrao'], resultados['producao']
+            total_base = (base['escritas'] + base['leituras']) / base['segundos']
+            total_prod = (prod['escritas'] + prod['leituras']) / prod['segundos']
+            self.stdout.write(self.style.SUCCESS(f"Vazão total: {total_prod / total_base:.1f}x o perfil padrão"))
+
+    def _registrar_banco(self, alias, caminho, perfil):
+        # Banco temporário com o mesmo schema, registrado como um alias extra
+        config = {**perfil, 'NAME': caminho, 'OPTIONS': dict(perfil['OPTIONS'])}
+        connections.settings[alias] = connections.configure_settings({'default': {}, alias: config})[alias]
+
+    def _popular(self, alias):
+        Papel.objects.using(alias).bulk_create([
+            Papel(nome=f"Papel {i}", gramatura="90g", gramatura_g=90, largura_mm=330, altura_mm=480,
+                  estoque_atual=10_000, ultimo_preco_unitario=Decimal('0.50'))
+            for i in range(50)
+        ])
+        clientes = Cliente.objects.using(alias).bulk_create([
+            Cliente(nome=f"Cliente {i}", telefone="0", documento_normalizado=str(10**10 + i)) for i in range(500)
+        ])
+        Orcamento.objects.using(alias).bulk_create([
+            Orcamento(cliente=clientes[i % len(clientes)]) for i in range(5000)
+        ])
+        connections[alias].close()
+
+    def _rodar(self, alias, options):
+        papeis = list(Papel.objects.using(alias).values_list('pk', flat=True))
+        parar = threading.Event()
+        lock = threading.Lock()
+        tempos = {'escrita': [], 'leitura': []}
+        erros = [0]
+
+        def baixa_estoque(i):
+            # Mesmo padrão de SaidaEstoque.save(): grava o movimento e aplica o delta no papel
+            papel_id = papeis[i % len(papeis)]
+            with transaction.atomic(using=alias):
+                SaidaEstoque.objects.using(alias).bulk_create([
+                    SaidaEstoque(papel_id=papel_id, qtd_pacotes_baixa=1, observacao="bench")
+                ])
+                Papel.objects.using(alias).filter(pk=papel_id).update(estoque_atual=F('estoque_atual') - 1)
+
+        def lista_orcamentos(i):
+            list(Orcamento.objects.using(alias).select_related('cliente').order_by('-id')[:20])
+            list(Papel.objects.using(alias).only('nome', 'estoque_atual')[:50])
+
+        def trabalhador(operacao, tipo):
+            i = 0
+            locais = []
+            while not parar.is_set():
+                inicio = time.perf_counter()
+                try:
+                    operacao(i)
+                    locais.append((time.perf_counter() - inicio) * 1000)
+                except OperationalError:
+                    with lock:
+                        erros[0] += 1
+                # Fim do "request": fecha ou reaproveita a conexão conforme CONN_MAX_AGE
+                connections[alias].close_if_unusable_or_obsolete()
+                i += 1
+            connections[alias].close()
+            with lock:
+                tempos[tipo].extend(locais)
+
+        threads = [
+            threading.Thread(target=trabalhador, args=(baixa_estoque, 'escrita'))
+            for _ in range(options['escritores'])
+        ] + [
+            threading.Thread(target=trabalhador, args=(lista_orcamentos, 'leitura'))
+            for _ in range(options['leitores'])
+        ]
+        inicio = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(options['segundos'])
+        parar.set()
+        for t in threads:
+            t.join()
+        segundos = time.perf_counter() - inicio
+
+        return {
+            'segundos': segundos,
+            'escritas': len(tempos['escrita']),
+            'leituras': len(tempos['leitura']),
+            'p95_escrita': _percentil(tempos['escrita'], 0.95),
+            'p95_leitura': _percentil(tempos['leitura'], 0.95),
+            'mediana_escrita': statistics.median(tempos['escrita']) if tempos['escrita'] else 0.0,
+            'erros': erros[0],
+        }
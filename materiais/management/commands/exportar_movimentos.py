@@ -0,0 +1,55 @@
+import argparse
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from materiais.exportacao import FORMATOS, LAYOUTS, gerar
+
+
+def _data(texto):
+    try:
+        return date.fromisoformat(texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"data inválida: {texto} (use AAAA-MM-DD)")
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta o histórico de compras de papel, baixas, compras de insumo ou trocas de "
+        "suprimento em CSV ou XLSX, em streaming (memória constante para qualquer volume)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=sorted(LAYOUTS))
+        parser.add_argument('--inicio', type=_data, help="Data inicial (AAAA-MM-DD, inclusiva).")
+        parser.add_argument('--fim', type=_data, help="Data final (AAAA-MM-DD, inclusiva).")
+        parser.add_argument('--formato', choices=sorted(FORMATOS), help="Padrão: deduzido pela extensão da saída.")
+        parser.add_argument('--saida', default='-', help="Arquivo de saída ('-' = stdout).")
+
+    def handle(self, *args, **options):
+        saida = options['saida']
+        formato = options['formato'] or ('xlsx' if saida.endswith('.xlsx') else 'csv')
+        if saida == '-' and formato == 'xlsx' and sys.stdout.isatty():
+            raise CommandError("XLSX é binário: informe --saida arquivo.xlsx")
+
+        inicio = time.perf_counter()
+        total = 0
+        partes = gerar(options['tipo'], formato, options['inicio'], options['fim'])
+        if saida == '-':
+            destino = sys.stdout.buffer
+            for parte in partes:
+                destino.write(parte)
+                total += len(parte)
+            destino.flush()
+            return
+
+        with Path(saida).open('wb') as destino:
+            for parte in partes:
+                destino.write(parte)
+                total += len(parte)
+        self.stderr.write(self.style.SUCCESS(
+            f"{saida}: {total / 1024:.0f} KB em {time.perf_counter() - inicio:.1f}s."
+        ))
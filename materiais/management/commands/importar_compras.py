@@ -0,0 +1,52 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from materiais.importacao import LAYOUTS, ler_linhas, importar_compras
+
+
+class Command(BaseCommand):
+    help = "Importa compras de papel ou insumo em lote a partir de um arquivo CSV ou JSONL."
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help="Caminho do arquivo (.csv ou .jsonl)")
+        parser.add_argument('--tipo', choices=sorted(LAYOUTS), default='papel')
+        parser.add_argument(
+            '--formato', choices=['csv', 'jsonl'],
+            help="Formato do arquivo (padrão: deduzido pela extensão).",
+        )
+        parser.add_argument('--bloco', type=int, default=500, help="Linhas validadas/gravadas por bloco.")
+        parser.add_argument('--dry-run', action='store_true', help="Valida tudo sem gravar.")
+
+    def handle(self, *args, **options):
+        caminho = Path(options['arquivo'])
+        if not caminho.exists():
+            raise CommandError(f"Arquivo não encontrado: {caminho}")
+        formato = options['formato'] or ('jsonl' if caminho.suffix in ('.jsonl', '.ndjson') else 'csv')
+
+        with caminho.open(encoding='utf-8-sig', newline='') as arquivo:
+            resultado = importar_compras(
+                ler_linhas(arquivo, formato),
+                tipo=options['tipo'],
+                tamanho_bloco=options['bloco'],
+                dry_run=options['dry_run'],
+            )
+
+        for numero, mensagem in resultado['erros'][:50]:
+            self.stderr.write(f"Linha {numero}: {mensagem}")
+        if len(resultado['erros']) > 50:
+            self.stderr.write(f"... e mais {len(resultado['erros']) - 50} erro(s).")
+
+        resumo = (
+            f"{resultado['linhas']} linha(s) em {resultado['segundos']:.2f}s "
+            f"({resultado['linhas_por_segundo']:.0f} linhas/s)"
+        )
+        if resultado['erros']:
+            raise CommandError(f"Importação cancelada: {len(resultado['erros'])} erro(s). {resumo}")
+        if options['dry_run']:
+            self.stdout.write(f"Validação OK, nada gravado. {resumo}")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"{resultado['importadas']} compra(s) importada(s) para "
+                f"{resultado['produtos_afetados']} produto(s). {resumo}"
+            ))
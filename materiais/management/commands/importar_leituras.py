@@ -0,0 +1,61 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from materiais.importacao import ler_linhas
+from materiais.leituras import registrar_leituras, recalcular_producao
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa leituras de contador (impressora, data_leitura, contador_total) de um CSV/JSONL "
+        "e atualiza a produção diária/mensal. Com --recalcular, refaz as agregações a partir do histórico."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', nargs='?', help="Caminho do arquivo (.csv ou .jsonl)")
+        parser.add_argument(
+            '--formato', choices=['csv', 'jsonl'],
+            help="Formato do arquivo (padrão: deduzido pela extensão).",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Valida tudo sem gravar.")
+        parser.add_argument(
+            '--recalcular', action='store_true',
+            help="Recalcula a produção de todas as impressoras a partir das leituras gravadas.",
+        )
+
+    def handle(self, *args, **options):
+        if options['recalcular']:
+            recalcular_producao()
+            self.stdout.write(self.style.SUCCESS("Produção diária/mensal recalculada."))
+            if not options['arquivo']:
+                return
+        if not options['arquivo']:
+            raise CommandError("Informe o arquivo de leituras (ou use --recalcular).")
+
+        caminho = Path(options['arquivo'])
+        if not caminho.exists():
+            raise CommandError(f"Arquivo não encontrado: {caminho}")
+        formato = options['formato'] or ('jsonl' if caminho.suffix in ('.jsonl', '.ndjson') else 'csv')
+
+        with caminho.open(encoding='utf-8-sig', newline='') as arquivo:
+            resultado = registrar_leituras(ler_linhas(arquivo, formato), dry_run=options['dry_run'])
+
+        for numero, mensagem in resultado['erros'][:50]:
+            self.stderr.write(f"Linha {numero}: {mensagem}")
+        if len(resultado['erros']) > 50:
+            self.stderr.write(f"... e mais {len(resultado['erros']) - 50} erro(s).")
+
+        resumo = (
+            f"{resultado['linhas']} linha(s) em {resultado['segundos']:.2f}s "
+            f"({resultado['linhas_por_segundo']:.0f} linhas/s)"
+        )
+        if resultado['erros']:
+            raise CommandError(f"Importação cancelada: {len(resultado['erros'])} erro(s). {resumo}")
+        if options['dry_run']:
+            self.stdout.write(f"Validação OK, nada gravado. {resumo}")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"{resultado['importadas']} leitura(s) importada(s) para "
+                f"{resultado['impressoras_afetadas']} impressora(s). {resumo}"
+            ))
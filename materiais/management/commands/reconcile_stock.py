@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum, IntegerField
+from django.db.models.functions import Coalesce
+
+from materiais.kpi import invalidar_kpi
+from materiais.models import Papel, CompraPapel, SaidaEstoque
+
+
+def _soma_por_papel(model, campo):
+    # Subquery correlacionada: SUM(campo) agrupado pelo papel da linha externa
+    return Subquery(
+        model.objects.filter(papel=OuterRef('pk'))
+        .order_by()
+        .values('papel')
+        .annotate(total=Sum(campo))
+        .values('total'),
+        output_field=IntegerField(),
+    )
+
+
+class Command(BaseCommand):
+    help = "Recalcula o estoque de todos os papéis a partir do histórico e corrige divergências."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Apenas relata as divergências, sem gravar nada.",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        with transaction.atomic():
+            # Uma única consulta traz o saldo gravado e o saldo calculado de cada papel
+            papeis = Papel.objects.annotate(
+                estoque_calculado=(
+                    Coalesce(_soma_por_papel(CompraPapel, 'qtd_pacotes_compra'), 0)
+                    - Coalesce(_soma_por_papel(SaidaEstoque, 'qtd_pacotes_baixa'), 0)
+                )
+            )
+
+            divergentes = []
+            for papel in papeis:
+                if papel.estoque_atual != papel.estoque_calculado:
+                    self.stdout.write(self.style.WARNING(
+                        f"{papel}: gravado {papel.estoque_atual} pct, "
+                        f"histórico {papel.estoque_calculado} pct "
+                        f"(diferença {papel.estoque_calculado - papel.estoque_atual:+d})"
+                    ))
+                    papel.estoque_atual = papel.estoque_calculado
+                    divergentes.append(papel)
+
+            if divergentes and not dry_run:
+                Papel.objects.bulk_update(divergentes, ['estoque_atual'], batch_size=500)
+                transaction.on_commit(lambda: invalidar_kpi('papel'))
+
+        if not divergentes:
+            self.stdout.write(self.style.SUCCESS("Estoque consistente: nenhuma divergência encontrada."))
+        elif dry_run:
+            self.stdout.write(f"{len(divergentes)} papel(is) com divergência (nada foi gravado).")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(divergentes)} papel(is) corrigido(s)."))
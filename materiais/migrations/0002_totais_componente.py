@@ -0,0 +1,45 @@
+# Generated by Django 5.2 on 2026-10-18 12:35
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def preencher_totais(apps, schema_editor):
+    ComponenteImpressora = apps.get_model('materiais', 'ComponenteImpressora')
+    TrocaSuprimento = apps.get_model('materiais', 'TrocaSuprimento')
+    db = schema_editor.connection.alias
+
+    totais = (
+        TrocaSuprimento.objects.using(db).order_by()
+        .values('componente_id')
+        .annotate(gasto=Sum('valor_compra'), paginas=Sum('rendimento_real'))
+    )
+    componentes = []
+    for linha in totais:
+        componentes.append(ComponenteImpressora(
+            pk=linha['componente_id'],
+            total_gasto=linha['gasto'] or 0,
+            total_paginas=linha['paginas'] or 0,
+        ))
+    ComponenteImpressora.objects.using(db).bulk_update(componentes, ['total_gasto', 'total_paginas'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materiais', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='componenteimpressora',
+            name='total_gasto',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='componenteimpressora',
+            name='total_paginas',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(preencher_totais, migrations.RunPython.noop),
+    ]
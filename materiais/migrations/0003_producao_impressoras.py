@@ -0,0 +1,95 @@
+# Generated by Django 5.2 on 2026-10-18 16:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def preencher_producao(apps, schema_editor):
+    # Agregações iniciais a partir das leituras já gravadas (mesma regra de materiais.leituras)
+    LeituraImpressora = apps.get_model('materiais', 'LeituraImpressora')
+    ProducaoImpressoraDia = apps.get_model('materiais', 'ProducaoImpressoraDia')
+    ProducaoImpressoraMes = apps.get_model('materiais', 'ProducaoImpressoraMes')
+    db = schema_editor.connection.alias
+
+    dias, meses, anterior = {}, {}, {}
+    leituras = LeituraImpressora.objects.using(db).order_by('impressora_id', 'data_leitura', 'contador_total')
+    for impressora_id, data, contador in leituras.values_list('impressora_id', 'data_leitura', 'contador_total'):
+        paginas = max(contador - anterior[impressora_id], 0) if impressora_id in anterior else 0
+        anterior[impressora_id] = contador
+        for totais, periodo in ((dias, data), (meses, data.replace(day=1))):
+            item = totais.setdefault((impressora_id, periodo), [0, 0, 0])
+            item[0] += paginas
+            item[1] += 1
+            item[2] = max(item[2], contador)
+
+    ProducaoImpressoraDia.objects.using(db).bulk_create([
+        ProducaoImpressoraDia(impressora_id=i, data=d, paginas=p, leituras=n, contador_final=c)
+        for (i, d), (p, n, c) in dias.items()
+    ], batch_size=1000)
+    ProducaoImpressoraMes.objects.using(db).bulk_create([
+        ProducaoImpressoraMes(impressora_id=i, mes=m, paginas=p, leituras=n, contador_final=c)
+        for (i, m), (p, n, c) in meses.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materiais', '0002_totais_componente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProducaoImpressoraDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('paginas', models.BigIntegerField(default=0, verbose_name='Páginas Impressas')),
+                ('leituras', models.IntegerField(default=0)),
+                ('contador_final', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Relatório: Produção Diária',
+                'verbose_name_plural': 'Relatório: Produção Diária',
+                'ordering': ['-data'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProducaoImpressoraMes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primeiro dia do mês')),
+                ('paginas', models.BigIntegerField(default=0, verbose_name='Páginas Impressas')),
+                ('leituras', models.IntegerField(default=0)),
+                ('contador_final', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Relatório: Produção Mensal',
+                'verbose_name_plural': 'Relatório: Produção Mensal',
+                'ordering': ['-mes'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='leituraimpressora',
+            index=models.Index(fields=['impressora', 'data_leitura'], name='materiais_l_impress_ea8ef0_idx'),
+        ),
+        migrations.AddField(
+            model_name='producaoimpressoradia',
+            name='impressora',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='producao_diaria', to='materiais.impressora'),
+        ),
+        migrations.AddField(
+            model_name='producaoimpressorames',
+            name='impressora',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='producao_mensal', to='materiais.impressora'),
+        ),
+        migrations.AddConstraint(
+            model_name='producaoimpressoradia',
+            constraint=models.UniqueConstraint(fields=('impressora', 'data'), name='producao_dia_unica'),
+        ),
+        migrations.AddConstraint(
+            model_name='producaoimpressorames',
+            constraint=models.UniqueConstraint(fields=('impressora', 'mes'), name='producao_mes_unica'),
+        ),
+        migrations.RunPython(preencher_producao, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+from materiais.models import parse_gramatura
+
+
+def preencher_gramatura(apps, schema_editor):
+    Papel = apps.get_model('materiais', 'Papel')
+    db = schema_editor.connection.alias
+
+    papeis = []
+    for papel in Papel.objects.using(db).only('gramatura').iterator(chunk_size=2000):
+        papel.gramatura_g = parse_gramatura(papel.gramatura)
+        if papel.gramatura_g is not None:
+            papeis.append(papel)
+    Papel.objects.using(db).bulk_update(papeis, ['gramatura_g'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materiais', '0003_producao_impressoras'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='papel',
+            name='gramatura_g',
+            field=models.PositiveIntegerField(blank=True, db_index=True, editable=False, null=True, verbose_name='Gramatura (g/m²)'),
+        ),
+        migrations.RunPython(preencher_gramatura, migrations.RunPython.noop),
+    ]
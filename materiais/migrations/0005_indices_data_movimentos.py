@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-18 17:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materiais', '0004_papel_gramatura_g'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comprainsumo',
+            index=models.Index(fields=['data_compra'], name='materiais_c_data_co_02e000_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comprapapel',
+            index=models.Index(fields=['data_compra'], name='materiais_c_data_co_051294_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saidaestoque',
+            index=models.Index(fields=['data_movimento'], name='materiais_s_data_mo_234e8e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trocasuprimento',
+            index=models.Index(fields=['data_troca'], name='materiais_t_data_tr_39e6fe_idx'),
+        ),
+    ]
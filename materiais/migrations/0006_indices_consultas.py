@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-18 17:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materiais', '0005_indices_data_movimentos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comprapapel',
+            index=models.Index(fields=['papel', 'data_compra'], name='materiais_c_papel_i_8f86b5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='saidaestoque',
+            index=models.Index(fields=['papel', 'data_movimento'], name='materiais_s_papel_i_2e1381_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trocasuprimento',
+            index=models.Index(fields=['componente', 'contador_no_momento'], name='materiais_t_compone_9a3ff3_idx'),
+        ),
+    ]
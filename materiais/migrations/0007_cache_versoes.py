@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-18 19:10
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def criar_tabela(apps, schema_editor):
+    # Tabela do cache 'versoes' (settings.CACHES): criada no migrate para não depender de createcachetable
+    call_command('createcachetable', 'cache_versoes', database=schema_editor.connection.alias, verbosity=0)
+
+
+def remover_tabela(apps, schema_editor):
+    schema_editor.execute('DROP TABLE IF EXISTS cache_versoes')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materiais', '0006_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_tabela, remover_tabela),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materiais', '0007_cache_versoes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='acabamento',
+            name='custo_unitario',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=10, verbose_name='Custo do Serviço (unid.)'),
+        ),
+    ]
@@ -1,6 +1,10 @@
-from django.db import models
-from django.db.models import Sum
+import re
+
+from django.db import models, transaction
+from django.db.models import Sum, Count, Q, F
+from decimal import Decimal
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 
 # --- UTILS: Cores para as Tags (Padrão Tailwind do Unfold) ---
 COLORS = [
@@ -41,9 +45,19 @@ class Fornecedor(models.Model):
 
 
 # --- 2. CATÁLOGO DE PAPÉIS ---
+def parse_gramatura(texto):
+    """'90g' -> 90, '150 g/m²' -> 150. None se não houver número."""
+    encontrado = re.search(r'\d+', texto or '')
+    return int(encontrado.group()) if encontrado else None
+
+
 class Papel(models.Model):
     nome = models.CharField(max_length=100, help_text="Ex: Couchê, Offset, Adesivo")
     gramatura = models.CharField(max_length=20, help_text="Ex: 90g, 150g")
+    # Número extraído de 'gramatura' no save(): filtros e faixas de guilhotina sem parse de texto
+    gramatura_g = models.PositiveIntegerField(
+        null=True, blank=True, editable=False, db_index=True, verbose_name="Gramatura (g/m²)"
+    )
     tipo = models.CharField(max_length=50, blank=True, null=True, help_text="Ex: Fosco, Brilho")
     
     largura_mm = models.IntegerField(verbose_name="Largura (mm)", help_text="Ex: 330")
@@ -66,7 +80,25 @@ class Papel(models.Model):
         verbose_name_plural = "Catálogo: Papéis"
         ordering = ['nome', 'gramatura']
 
+    def save(self, *args, **kwargs):
+        self.gramatura_g = parse_gramatura(self.gramatura)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'gramatura' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'gramatura_g'}
+        super().save(*args, **kwargs)
+
+    def movimentar_estoque(self, delta, **campos):
+        """
+        Aplica uma variação no estoque (+ entrada / - saída) direto no banco com F(),
+        sem reagregar todo o histórico. Campos extras (ex: último preço) vão no mesmo UPDATE.
+        """
+        Papel.objects.filter(pk=self.pk).update(estoque_atual=F('estoque_atual') + delta, **campos)
+        for campo, valor in campos.items():
+            setattr(self, campo, valor)
+        self.refresh_from_db(fields=['estoque_atual'])
+
     def atualizar_estoque(self):
+        # Recalculo completo a partir do histórico (usado pelo comando reconcile_stock)
         total_entradas = self.compras.aggregate(total=Sum('qtd_pacotes_compra'))['total'] or 0
         total_saidas = self.saidas.aggregate(total=Sum('qtd_pacotes_baixa'))['total'] or 0
         self.estoque_atual = total_entradas - total_saidas
@@ -80,8 +112,62 @@ class Papel(models.Model):
         return f"{self.nome} {self.gramatura} ({self.largura_mm}x{self.altura_mm})"
 
 
+class MovimentoEstoqueMixin:
+    """
+    Base das movimentações de papel (entradas e saídas).
+    Guarda o papel/quantidade como vieram do banco para que o save() aplique
+    apenas a diferença no estoque, em vez de somar o histórico inteiro.
+    """
+    campo_quantidade = None
+    sinal = 1  # +1 entrada, -1 saída
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Carregado com .only()/.defer() sem papel ou quantidade: relido com lock ao salvar/excluir
+        if 'papel_id' in instance.__dict__ and cls.campo_quantidade in instance.__dict__:
+            instance._movimento_original = (
+                instance.papel_id,
+                getattr(instance, cls.campo_quantidade) or 0,
+            )
+        return instance
+
+    def carregar_movimento_original(self):
+        """Papel e quantidade gravados no banco (antes do save/delete)."""
+        if not hasattr(self, '_movimento_original'):
+            gravado = None
+            if self.pk is not None and not self._state.adding:
+                gravado = (
+                    type(self).objects.select_for_update()
+                    .filter(pk=self.pk).values_list('papel_id', self.campo_quantidade).first()
+                )
+            self._movimento_original = (gravado[0], gravado[1] or 0) if gravado else (None, 0)
+        return self._movimento_original
+
+    def registrar_movimento(self, **campos_papel):
+        papel_anterior, qtd_anterior = getattr(self, '_movimento_original', (None, 0))
+        qtd_atual = getattr(self, self.campo_quantidade) or 0
+
+        # Se trocou o papel na edição, devolve a quantidade antiga ao papel anterior
+        if papel_anterior and papel_anterior != self.papel_id:
+            Papel.objects.filter(pk=papel_anterior).update(
+                estoque_atual=F('estoque_atual') - self.sinal * qtd_anterior
+            )
+            qtd_anterior = 0
+
+        self.papel.movimentar_estoque(self.sinal * (qtd_atual - qtd_anterior), **campos_papel)
+        self._movimento_original = (self.papel_id, qtd_atual)
+
+    def estornar_movimento(self):
+        """Desfaz o efeito do movimento no estoque (exclusão; roda na transação do delete)."""
+        papel_id, qtd = self.carregar_movimento_original()
+        if papel_id:
+            Papel.objects.filter(pk=papel_id).update(estoque_atual=F('estoque_atual') - self.sinal * qtd)
+        self._movimento_original = (None, 0)
+
+
 # --- 3. HISTÓRICO DE COMPRAS (ENTRADAS) ---
-class CompraPapel(models.Model):
+class CompraPapel(MovimentoEstoqueMixin, models.Model):
     papel = models.ForeignKey(Papel, on_delete=models.CASCADE, related_name='compras')
     data_compra = models.DateField()
     
@@ -101,18 +187,29 @@ class CompraPapel(models.Model):
         verbose_name = "Movimento: Compra de Papel"
         verbose_name_plural = "Movimento: Compras de Papel"
         ordering = ['-data_compra']
+        # Filtro de período (admin e exportação) e a ordenação padrão; papel + período no admin
+        indexes = [
+            models.Index(fields=['data_compra']),
+            models.Index(fields=['papel', 'data_compra']),
+        ]
+
+    campo_quantidade = 'qtd_pacotes_compra'
+    sinal = 1
 
     def save(self, *args, **kwargs):
         if self.qtd_embalagem and self.valor_pacote:
             self.valor_unitario = self.valor_pacote / self.qtd_embalagem
-        super().save(*args, **kwargs)
-        self.papel.ultimo_preco_unitario = self.valor_unitario
-        self.papel.ultimo_valor_pacote = self.valor_pacote
-        self.papel.atualizar_estoque()
+        with transaction.atomic():
+            self.carregar_movimento_original()
+            super().save(*args, **kwargs)
+            self.registrar_movimento(
+                ultimo_preco_unitario=self.valor_unitario,
+                ultimo_valor_pacote=self.valor_pacote,
+            )
 
 
 # --- 4. BAIXAS (SAÍDAS) ---
-class SaidaEstoque(models.Model):
+class SaidaEstoque(MovimentoEstoqueMixin, models.Model):
     papel = models.ForeignKey(Papel, on_delete=models.CASCADE, related_name='saidas')
     data_movimento = models.DateTimeField(auto_now_add=True, verbose_name="Data/Hora")
     qtd_pacotes_baixa = models.IntegerField(verbose_name="Qtd. Pacotes Usados")
@@ -123,10 +220,19 @@ class SaidaEstoque(models.Model):
         verbose_name = "Movimento: Baixa"
         verbose_name_plural = "Movimento: Baixas / Uso Interno"
         ordering = ['-data_movimento']
+        indexes = [
+            models.Index(fields=['data_movimento']),
+            models.Index(fields=['papel', 'data_movimento']),
+        ]
+
+    campo_quantidade = 'qtd_pacotes_baixa'
+    sinal = -1
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        self.papel.atualizar_estoque()
+        with transaction.atomic():
+            self.carregar_movimento_original()
+            super().save(*args, **kwargs)
+            self.registrar_movimento()
 
 class TabelaPrecoPapel(models.Model):
     papel = models.ForeignKey(Papel, on_delete=models.CASCADE, related_name='tabela_precos')
@@ -198,6 +304,7 @@ class CompraInsumo(models.Model):
         verbose_name = "Movimento: Compra de Insumo"
         verbose_name_plural = "Movimento: Compras de Insumo"
         ordering = ['-data_compra']
+        indexes = [models.Index(fields=['data_compra'])]
 
     def save(self, *args, **kwargs):
         if self.qtd_compra and self.valor_total_nota:
@@ -223,6 +330,10 @@ class Acabamento(models.Model):
     nome = models.CharField(max_length=100, help_text="Ex: Encadernação Wire-o A4, Refile, Vinco")
     categoria = models.ForeignKey(CategoriaAcabamento, on_delete=models.SET_NULL, null=True, verbose_name="Tag / Categoria")
     descricao = models.TextField(blank=True, help_text="Detalhes técnicos do serviço")
+    # Custo interno por unidade (a venda vem da tabela de preços): entra no custo de produção do orçamento
+    custo_unitario = models.DecimalField(
+        max_digits=10, decimal_places=4, default=0, verbose_name="Custo do Serviço (unid.)"
+    )
 
     class Meta:
         verbose_name = "Serviço: Acabamento"
@@ -275,29 +386,31 @@ class Impressora(models.Model):
     def __str__(self):
         return f"{self.nome} ({self.modelo})"
     
-    def recalcular_custos(self):
+    def recalcular_custos(self, **campos):
         """
         Soma o custo médio de todos os componentes ativos desta impressora.
         Separa o que é custo P&B (K) do que é Color (C, M, Y).
+        Um único aggregate em Decimal; campos extras vão no mesmo UPDATE.
         """
-        componentes = self.componentes.all()
-        custo_k = 0
-        custo_cmy = 0
-        
-        for comp in componentes:
-            if comp.cor == 'K':
-                custo_k += float(comp.custo_medio_por_pagina)
-            elif comp.cor in ['C', 'M', 'Y']:
-                custo_cmy += float(comp.custo_medio_por_pagina)
-            else:
-                # Peças gerais (Fusor/Belt) entram no custo de ambas ou rateado?
-                # Por simplicidade, vamos somar peças gerais no custo base P&B e Color
-                custo_k += float(comp.custo_medio_por_pagina)
-                custo_cmy += float(comp.custo_medio_por_pagina)
-        
+        somas = self.componentes.aggregate(
+            k=Sum('custo_medio_por_pagina', filter=Q(cor='K')),
+            cmy=Sum('custo_medio_por_pagina', filter=Q(cor__in=['C', 'M', 'Y'])),
+            # Peças gerais (Fusor/Belt): por simplicidade entram no custo base P&B e Color
+            geral=Sum('custo_medio_por_pagina', filter=~Q(cor__in=['K', 'C', 'M', 'Y'])),
+        )
+        zero = Decimal(0)
+        custo_k = (somas['k'] or zero) + (somas['geral'] or zero)
+        custo_cmy = (somas['cmy'] or zero) + (somas['geral'] or zero)
+
         self.custo_click_mono = custo_k
         self.custo_click_color = custo_k + custo_cmy # Click Color geralmente inclui o K
-        self.save()
+        for campo, valor in campos.items():
+            setattr(self, campo, valor)
+        Impressora.objects.filter(pk=self.pk).update(
+            custo_click_mono=self.custo_click_mono,
+            custo_click_color=self.custo_click_color,
+            **campos,
+        )
 
 
 class ComponenteImpressora(models.Model):
@@ -319,6 +432,10 @@ class ComponenteImpressora(models.Model):
     
     # DADOS REAIS (MÉDIA HISTÓRICA)
     custo_medio_por_pagina = models.DecimalField(max_digits=12, decimal_places=5, default=0, editable=False)
+
+    # Totais acumulados de todas as trocas (atualizados por delta a cada troca)
+    total_gasto = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    total_paginas = models.BigIntegerField(default=0, editable=False)
     
     class Meta:
         verbose_name = "Suprimento / Componente"
@@ -327,35 +444,61 @@ class ComponenteImpressora(models.Model):
     def __str__(self):
         return f"{self.nome} ({self.get_cor_display()})"
 
-    def atualizar_media_custo(self):
+    def _calcular_media(self, valor_ultima_compra):
+        # Se for a primeira troca e não tivermos rendimento anterior calculado ainda
+        # O sistema vai usar a estimativa padrão para a primeira divisão se total_paginas for 0
+        if self.total_paginas > 0:
+            self.custo_medio_por_pagina = self.total_gasto / self.total_paginas
+        elif valor_ultima_compra is not None and self.rendimento_estimado > 0:
+            # Fallback para primeira inserção: Custo da 1ª compra / Rendimento Estimado
+            self.custo_medio_por_pagina = valor_ultima_compra / self.rendimento_estimado
+
+    def registrar_troca(self, delta_gasto, delta_paginas, valor_ultima_compra):
+        """
+        Caminho incremental usado por TrocaSuprimento.save(): soma os deltas aos
+        totais (com a linha travada), recalcula a média e o click da impressora.
+        Número constante de consultas, independente do tamanho do histórico.
+        """
+        atual = ComponenteImpressora.objects.select_for_update().only(
+            'total_gasto', 'total_paginas', 'rendimento_estimado', 'custo_medio_por_pagina'
+        ).get(pk=self.pk)
+        self.total_gasto = atual.total_gasto + delta_gasto
+        self.total_paginas = atual.total_paginas + delta_paginas
+        self.rendimento_estimado = atual.rendimento_estimado
+        self.custo_medio_por_pagina = atual.custo_medio_por_pagina
+        self._calcular_media(valor_ultima_compra)
+        ComponenteImpressora.objects.filter(pk=self.pk).update(
+            total_gasto=self.total_gasto,
+            total_paginas=self.total_paginas,
+            custo_medio_por_pagina=self.custo_medio_por_pagina,
+        )
+
+    def atualizar_media_custo(self, recalcular_impressora=True):
         """
         A LÓGICA PEDIDA: Média de TODAS as trocas realizadas.
         Custo = Total Gasto Historicamente / Total Páginas Produzidas Historicamente
+        Recalcula os totais do zero a partir do histórico (usado em edições de trocas).
         """
-        trocas = self.trocas.all().order_by('data_troca')
-        
-        if not trocas.exists():
-            # Sem histórico? Usa estimativa base.
-            # Precisamos de um valor de referência. Se não houver troca, assumimos R$ 0,00 ou esperamos a primeira compra?
-            # Para não quebrar, vamos deixar 0 até a primeira compra.
-            return
-
-        total_gasto = trocas.aggregate(Sum('valor_compra'))['valor_compra__sum'] or 0
-        total_paginas = trocas.aggregate(Sum('rendimento_real'))['rendimento_real__sum'] or 0
-        
-        # Se for a primeira troca e não tivermos rendimento anterior calculado ainda
-        # O sistema vai usar a estimativa padrão para a primeira divisão se total_paginas for 0
-        if total_paginas > 0:
-            self.custo_medio_por_pagina = total_gasto / total_paginas
+        totais = self.trocas.aggregate(
+            gasto=Sum('valor_compra'), paginas=Sum('rendimento_real'), quantidade=Count('id')
+        )
+        if totais['quantidade']:
+            self.total_gasto = totais['gasto'] or 0
+            self.total_paginas = totais['paginas'] or 0
+            ultima = self.trocas.order_by('data_troca', 'id').values_list('valor_compra', flat=True).last()
+            self._calcular_media(ultima)
         else:
-            # Fallback para primeira inserção: Custo da 1ª compra / Rendimento Estimado
-            ultima = trocas.last()
-            if ultima and self.rendimento_estimado > 0:
-                self.custo_medio_por_pagina = ultima.valor_compra / self.rendimento_estimado
-                
-        self.save()
-        # Avisa a impressora para somar tudo de novo
-        self.impressora.recalcular_custos()
+            # Sem histórico (ex: a única troca foi excluída): volta a 0 até a próxima compra.
+            self.total_gasto = self.custo_medio_por_pagina = Decimal(0)
+            self.total_paginas = 0
+        ComponenteImpressora.objects.filter(pk=self.pk).update(
+            total_gasto=self.total_gasto,
+            total_paginas=self.total_paginas,
+            custo_medio_por_pagina=self.custo_medio_por_pagina,
+        )
+        if recalcular_impressora:
+            # Avisa a impressora para somar tudo de novo
+            self.impressora.recalcular_custos()
 
 
 class TrocaSuprimento(models.Model):
@@ -373,42 +516,71 @@ class TrocaSuprimento(models.Model):
         verbose_name = "Movimento: Troca/Compra"
         verbose_name_plural = "Movimento: Trocas de Suprimentos"
         ordering = ['-data_troca']
+        # (componente, contador): busca da troca anterior no save()
+        indexes = [
+            models.Index(fields=['data_troca']),
+            models.Index(fields=['componente', 'contador_no_momento']),
+        ]
 
     def save(self, *args, **kwargs):
-        # 1. Tentar encontrar a troca anterior para calcular o rendimento
-        # Buscamos a última troca deste componente com contador MENOR que o atual
-        ultima_troca = TrocaSuprimento.objects.filter(
-            componente=self.componente,
-            contador_no_momento__lt=self.contador_no_momento
-        ).order_by('-contador_no_momento').first()
-
-        if ultima_troca:
-            # A diferença é quanto o suprimento ANTERIOR durou
-            rendimento = self.contador_no_momento - ultima_troca.contador_no_momento
-            # Atualizamos o registro ANTERIOR com o rendimento real dele
-            # (Porque só sabemos quanto durou o Toner 1 quando colocamos o Toner 2)
-            ultima_troca.rendimento_real = rendimento
-            ultima_troca.save(update_fields=['rendimento_real'])
-            
+        nova = self._state.adding
+        with transaction.atomic():
+            # 1. Tentar encontrar a troca anterior para calcular o rendimento
+            # Buscamos a última troca deste componente com contador MENOR que o atual
+            ultima_troca = TrocaSuprimento.objects.filter(
+                componente_id=self.componente_id,
+                contador_no_momento__lt=self.contador_no_momento
+            ).order_by('-contador_no_momento').values('pk', 'contador_no_momento', 'rendimento_real').first()
+
+            delta_paginas = 0
+            if ultima_troca:
+                # A diferença é quanto o suprimento ANTERIOR durou
+                rendimento = self.contador_no_momento - ultima_troca['contador_no_momento']
+                # Atualizamos o registro ANTERIOR com o rendimento real dele
+                # (Porque só sabemos quanto durou o Toner 1 quando colocamos o Toner 2)
+                TrocaSuprimento.objects.filter(pk=ultima_troca['pk']).update(rendimento_real=rendimento)
+                delta_paginas = rendimento - ultima_troca['rendimento_real']
+
             # Para o registro ATUAL, o rendimento é 0 (pois acabou de entrar)
-            # ou podemos usar o estimado provisoriamente
-            self.rendimento_real = 0 
-        else:
-            # É o primeiro registro da história.
-            # Não temos como calcular rendimento real ainda.
+            # É também o caso do primeiro registro da história.
             self.rendimento_real = 0
 
-        super().save(*args, **kwargs)
-        
-        # 2. Atualiza o contador geral da impressora
-        self.componente.impressora.contador_total_atual = self.contador_no_momento
-        self.componente.impressora.save()
-        
-        # 3. Recalcula a média global do componente
-        self.componente.atualizar_media_custo()
+            super().save(*args, **kwargs)
+
+            # 2. Atualiza a média do componente: por delta numa troca nova,
+            # recalculando do histórico quando uma troca existente é editada
+            componente = self.componente
+            if nova:
+                componente.registrar_troca(self.valor_compra, delta_paginas, self.valor_compra)
+            else:
+                componente.atualizar_media_custo(recalcular_impressora=False)
+
+            # 3. Atualiza o contador geral da impressora junto com o click
+            componente.impressora.recalcular_custos(contador_total_atual=self.contador_no_momento)
+
+    def estornar(self):
+        """
+        Desfaz a troca no componente após a exclusão (post_delete, na transação do delete):
+        a troca anterior passa a durar até a seguinte e os totais são recalculados.
+        """
+        vizinhas = TrocaSuprimento.objects.filter(componente_id=self.componente_id)
+        anterior = vizinhas.filter(
+            contador_no_momento__lt=self.contador_no_momento
+        ).order_by('-contador_no_momento').values('pk', 'contador_no_momento').first()
+        if anterior:
+            seguinte = vizinhas.filter(
+                contador_no_momento__gt=self.contador_no_momento
+            ).order_by('contador_no_momento').values_list('contador_no_momento', flat=True).first()
+            rendimento = seguinte - anterior['contador_no_momento'] if seguinte is not None else 0
+            vizinhas.filter(pk=anterior['pk']).update(rendimento_real=rendimento)
+
+        componente = ComponenteImpressora.objects.select_related('impressora').filter(pk=self.componente_id).first()
+        if componente is not None:
+            componente.atualizar_media_custo()
 
 
 # Leitura Mensal Simples (apenas para registro)
+# Leituras em lote entram por materiais.leituras.registrar_leituras, que mantém as tabelas de produção abaixo
 class LeituraImpressora(models.Model):
     impressora = models.ForeignKey(Impressora, on_delete=models.CASCADE)
     data_leitura = models.DateField()
@@ -418,6 +590,73 @@ class LeituraImpressora(models.Model):
         verbose_name = "Relatório: Leitura Mensal"
         verbose_name_plural = "Relatório: Leituras Mensais"
         ordering = ['-data_leitura']
+        indexes = [models.Index(fields=['impressora', 'data_leitura'])]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Se a leitura mudar de impressora ou de data, a produção é refeita a partir da data antiga também
+        instance._impressora_original = instance.__dict__.get('impressora_id')
+        instance._data_original = instance.__dict__.get('data_leitura')
+        return instance
+
+    def clean(self):
+        # O contador só anda para frente: confere com as leituras vizinhas da mesma impressora
+        if not self.impressora_id or self.data_leitura is None or self.contador_total is None:
+            return
+        outras = LeituraImpressora.objects.filter(impressora_id=self.impressora_id).exclude(pk=self.pk)
+        anterior = outras.filter(data_leitura__lte=self.data_leitura).order_by('-data_leitura', '-contador_total').first()
+        seguinte = outras.filter(data_leitura__gte=self.data_leitura).order_by('data_leitura', 'contador_total').first()
+        if anterior and self.contador_total < anterior.contador_total:
+            raise ValidationError({'contador_total': (
+                f"Menor que a leitura de {anterior.data_leitura:%d/%m/%Y} ({anterior.contador_total})."
+            )})
+        if seguinte and self.contador_total > seguinte.contador_total:
+            raise ValidationError({'contador_total': (
+                f"Maior que a leitura de {seguinte.data_leitura:%d/%m/%Y} ({seguinte.contador_total})."
+            )})
+
+    def __str__(self):
+        return f"{self.impressora} em {self.data_leitura:%d/%m/%Y}: {self.contador_total}"
+
+
+# Produção pré-agregada (páginas impressas = diferença entre leituras consecutivas)
+class ProducaoImpressoraDia(models.Model):
+    impressora = models.ForeignKey(Impressora, on_delete=models.CASCADE, related_name='producao_diaria')
+    data = models.DateField()
+    paginas = models.BigIntegerField(default=0, verbose_name="Páginas Impressas")
+    leituras = models.IntegerField(default=0)
+    contador_final = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Relatório: Produção Diária"
+        verbose_name_plural = "Relatório: Produção Diária"
+        ordering = ['-data']
+        constraints = [
+            models.UniqueConstraint(fields=['impressora', 'data'], name='producao_dia_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.impressora} {self.data:%d/%m/%Y}: {self.paginas} págs"
+
+
+class ProducaoImpressoraMes(models.Model):
+    impressora = models.ForeignKey(Impressora, on_delete=models.CASCADE, related_name='producao_mensal')
+    mes = models.DateField(help_text="Primeiro dia do mês")
+    paginas = models.BigIntegerField(default=0, verbose_name="Páginas Impressas")
+    leituras = models.IntegerField(default=0)
+    contador_final = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Relatório: Produção Mensal"
+        verbose_name_plural = "Relatório: Produção Mensal"
+        ordering = ['-mes']
+        constraints = [
+            models.UniqueConstraint(fields=['impressora', 'mes'], name='producao_mes_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.impressora} {self.mes:%m/%Y}: {self.paginas} págs"
 
 class GuilhotinaConfig(models.Model):
     gramatura_min = models.IntegerField(default=0, verbose_name="Gramatura Mínima")
@@ -0,0 +1,187 @@
+"""
+Índices em memória de tabelas pequenas e muito lidas na precificação.
+
+- IndiceFaixas: faixas de preço (TabelaPrecoPapel / TabelaPrecoAcabamento).
+  Cada produto vira duas listas ordenadas (qtd_minima e valor_venda) e o preço
+  de uma quantidade sai por bisect.
+- IndiceGuilhotina: faixas de gramatura de GuilhotinaConfig, quebradas em
+  intervalos disjuntos; folhas por batida de uma gramatura sai por bisect.
+- IndiceCatalogo: papéis e impressoras só com o que a escolha de material usa
+  (formatos, preço da folha, formato máximo e click), em tuplas de float.
+
+A tabela inteira é lida uma vez por processo; os signals de materiais.signals
+marcam uma nova versão no cache compartilhado (core.versoes), e cada worker
+recarrega ao perceber a troca. A versão é conferida no máximo uma vez por
+'intervalo' segundos, então um worker vê a mudança de outro com esse atraso;
+no próprio processo a invalidação é imediata.
+"""
+import math
+import threading
+import time
+from bisect import bisect_right
+from collections import namedtuple
+
+from core.versoes import cache_versoes
+
+from .models import TabelaPrecoPapel, TabelaPrecoAcabamento, GuilhotinaConfig, Papel, Impressora
+
+
+class IndiceVersionado:
+    """Base: dados carregados por _carregar(), recarregados quando a versão no cache muda."""
+
+    intervalo = 1.0  # segundos entre duas conferências da versão compartilhada
+
+    def __init__(self, chave_versao):
+        self.chave_versao = chave_versao
+        self._dados = None
+        self._versao = None
+        self._conferido = 0.0
+        self._lock = threading.Lock()
+
+    def _carregar(self):
+        raise NotImplementedError
+
+    def _atual(self):
+        dados = self._dados
+        agora = time.monotonic()
+        if dados is not None and agora - self._conferido < self.intervalo:
+            return dados
+
+        versao = cache_versoes.get(self.chave_versao)
+        with self._lock:
+            dados = self._dados
+            if dados is None or versao != self._versao:
+                dados = self._carregar()
+                self._dados = dados
+                self._versao = versao
+            self._conferido = agora
+        # O valor lido sob o lock: um invalidar() concorrente pode zerar self._dados
+        return dados
+
+    def invalidar(self):
+        # Nova versão no cache compartilhado: todos os processos recarregam na próxima conferência
+        cache_versoes.set(self.chave_versao, time.time_ns(), None)
+        with self._lock:
+            self._dados = None
+
+
+class IndiceFaixas(IndiceVersionado):
+    def __init__(self, model, campo_produto):
+        super().__init__(f'faixas:{model._meta.label_lower}:versao')
+        self.model = model
+        self.campo_produto = campo_produto
+
+    def _carregar(self):
+        faixas = {}
+        linhas = self.model.objects.order_by(self.campo_produto, 'qtd_minima').values_list(
+            f'{self.campo_produto}_id', 'qtd_minima', 'valor_venda'
+        )
+        for produto_id, qtd_minima, valor in linhas:
+            minimos, valores = faixas.setdefault(produto_id, ([], []))
+            minimos.append(qtd_minima)
+            valores.append(valor)
+        return faixas
+
+    def faixas(self, produto_id):
+        """(lista de qtd_minima, lista de valor_venda) do produto, em ordem crescente."""
+        return self._atual().get(produto_id, ([], []))
+
+    def preco(self, produto_id, quantidade):
+        """
+        Valor da maior faixa com qtd_minima <= quantidade.
+        Abaixo da primeira faixa vale a primeira; sem faixas, None.
+        """
+        minimos, valores = self.faixas(produto_id)
+        if not minimos:
+            return None
+        return valores[max(bisect_right(minimos, quantidade) - 1, 0)]
+
+
+class IndiceGuilhotina(IndiceVersionado):
+    """
+    Folhas por batida de guilhotina por gramatura.
+
+    As faixas cadastradas podem se sobrepor ou deixar buracos; na carga elas viram
+    intervalos disjuntos [início, próximo início), cada um com a capacidade da
+    faixa de menor gramatura_min que o cobre.
+    """
+
+    def __init__(self):
+        super().__init__('guilhotina:versao')
+
+    def _carregar(self):
+        faixas = list(GuilhotinaConfig.objects.order_by('gramatura_min', 'pk').values_list(
+            'gramatura_min', 'gramatura_max', 'folhas_por_corte'
+        ))
+        inicios, capacidades = [], []
+        pontos = sorted({g for minimo, maximo, _ in faixas for g in (minimo, maximo + 1)})
+        for ponto in pontos:
+            capacidade = next(
+                (folhas for minimo, maximo, folhas in faixas if minimo <= ponto <= maximo), None
+            )
+            # Intervalos vizinhos com a mesma capacidade viram um só
+            if not capacidades or capacidades[-1] != capacidade:
+                inicios.append(ponto)
+                capacidades.append(capacidade)
+        return inicios, capacidades
+
+    def folhas_por_corte(self, gramatura):
+        """Folhas por batida para a gramatura (g/m²); None se nenhuma faixa cobre."""
+        if gramatura is None:
+            return None
+        inicios, capacidades = self._atual()
+        posicao = bisect_right(inicios, gramatura) - 1
+        return capacidades[posicao] if posicao >= 0 else None
+
+    def batidas(self, gramatura, folhas):
+        """Batidas para refilar 'folhas' folhas da gramatura (None sem faixa ou sem folhas)."""
+        capacidade = self.folhas_por_corte(gramatura)
+        if not capacidade or not folhas:
+            return None
+        return math.ceil(folhas / capacidade)
+
+
+PapelCatalogo = namedtuple('PapelCatalogo', 'pk nome gramatura gramatura_g largura_mm altura_mm preco_folha')
+ImpressoraCatalogo = namedtuple(
+    'ImpressoraCatalogo', 'pk nome largura_max_mm altura_max_mm click_mono click_color'
+)
+
+
+class IndiceCatalogo(IndiceVersionado):
+    """
+    Papéis e impressoras para comparar combinações sem consultar o banco.
+
+    Preço da folha e custo de click são gravados por update() (compras, trocas
+    de suprimento, importação em lote), então a invalidação vem dos signals
+    desses movimentos e do fim da importação.
+    """
+
+    def __init__(self):
+        super().__init__('catalogo:versao')
+
+    def _carregar(self):
+        papeis = [
+            PapelCatalogo(pk, nome, gramatura, gramatura_g, largura, altura, float(preco))
+            for pk, nome, gramatura, gramatura_g, largura, altura, preco in Papel.objects.values_list(
+                'pk', 'nome', 'gramatura', 'gramatura_g', 'largura_mm', 'altura_mm', 'ultimo_preco_unitario'
+            )
+        ]
+        impressoras = [
+            ImpressoraCatalogo(pk, nome, largura, altura, float(mono), float(color))
+            for pk, nome, largura, altura, mono, color in Impressora.objects.values_list(
+                'pk', 'nome', 'largura_max_mm', 'altura_max_mm', 'custo_click_mono', 'custo_click_color'
+            )
+        ]
+        return papeis, impressoras
+
+    def papeis(self):
+        return self._atual()[0]
+
+    def impressoras(self):
+        return self._atual()[1]
+
+
+faixas_papel = IndiceFaixas(TabelaPrecoPapel, 'papel')
+faixas_acabamento = IndiceFaixas(TabelaPrecoAcabamento, 'acabamento')
+guilhotina = IndiceGuilhotina()
+catalogo = IndiceCatalogo()
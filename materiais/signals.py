@@ -0,0 +1,92 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from .models import (
+    TabelaPrecoPapel, TabelaPrecoAcabamento, GuilhotinaConfig,
+    Papel, CompraPapel, SaidaEstoque,
+    Insumo, CompraInsumo,
+    Impressora, ComponenteImpressora, TrocaSuprimento, LeituraImpressora,
+)
+from .precos import faixas_papel, faixas_acabamento, guilhotina, catalogo
+from .kpi import invalidar_kpi
+from .leituras import recalcular_producao
+
+
+# Índices em memória: a versão nova só pode ser publicada depois do commit, senão outro
+# worker recarrega as linhas antigas já com o token novo e fica com faixas desatualizadas
+@receiver([post_save, post_delete], sender=TabelaPrecoPapel)
+def invalidar_faixas_papel(sender, **kwargs):
+    transaction.on_commit(faixas_papel.invalidar)
+
+
+@receiver([post_save, post_delete], sender=TabelaPrecoAcabamento)
+def invalidar_faixas_acabamento(sender, **kwargs):
+    transaction.on_commit(faixas_acabamento.invalidar)
+
+
+@receiver([post_save, post_delete], sender=GuilhotinaConfig)
+def invalidar_guilhotina(sender, **kwargs):
+    transaction.on_commit(guilhotina.invalidar)
+
+
+@receiver(pre_delete, sender=CompraPapel)
+@receiver(pre_delete, sender=SaidaEstoque)
+def ler_movimento_excluido(sender, instance, **kwargs):
+    # Garante papel/quantidade gravados enquanto a linha ainda existe (objeto com campos adiados)
+    instance.carregar_movimento_original()
+
+
+@receiver(post_delete, sender=CompraPapel)
+@receiver(post_delete, sender=SaidaEstoque)
+def estornar_movimento_estoque(sender, instance, **kwargs):
+    # Também cobre o delete em lote do admin (queryset.delete() não chama Model.delete())
+    instance.estornar_movimento()
+
+
+@receiver(post_delete, sender=TrocaSuprimento)
+def estornar_troca(sender, instance, **kwargs):
+    # Sem isto os totais do componente continuariam contando a troca excluída
+    instance.estornar()
+
+
+@receiver([post_save, post_delete], sender=Papel)
+@receiver([post_save, post_delete], sender=CompraPapel)
+@receiver([post_save, post_delete], sender=Impressora)
+@receiver([post_save, post_delete], sender=ComponenteImpressora)
+@receiver([post_save, post_delete], sender=TrocaSuprimento)
+def invalidar_catalogo(sender, **kwargs):
+    # Preço da folha e click mudam por update() depois do save(): só recarregar após o commit
+    transaction.on_commit(catalogo.invalidar)
+
+
+@receiver([post_save, post_delete], sender=Papel)
+@receiver([post_save, post_delete], sender=CompraPapel)
+@receiver([post_save, post_delete], sender=SaidaEstoque)
+def invalidar_kpi_papel(sender, **kwargs):
+    transaction.on_commit(lambda: invalidar_kpi('papel'))
+
+
+@receiver([post_save, post_delete], sender=Insumo)
+@receiver([post_save, post_delete], sender=CompraInsumo)
+def invalidar_kpi_insumo(sender, **kwargs):
+    transaction.on_commit(lambda: invalidar_kpi('insumo'))
+
+
+@receiver([post_save, post_delete], sender=Impressora)
+@receiver([post_save, post_delete], sender=ComponenteImpressora)
+@receiver([post_save, post_delete], sender=TrocaSuprimento)
+def invalidar_kpi_impressora(sender, **kwargs):
+    transaction.on_commit(lambda: invalidar_kpi('impressora'))
+
+
+@receiver([post_save, post_delete], sender=LeituraImpressora)
+def recalcular_producao_impressora(sender, instance, **kwargs):
+    # Leitura avulsa (admin): refaz a produção da impressora a partir da data mexida;
+    # cargas em lote usam registrar_leituras
+    impressoras = {instance.impressora_id, getattr(instance, '_impressora_original', None)} - {None}
+    datas = {instance.data_leitura, getattr(instance, '_data_original', None)} - {None}
+    desde = min(datas) if datas else None
+    transaction.on_commit(lambda: recalcular_producao(impressoras, desde=desde))
+    # Um segundo save() da mesma instância parte do que acabou de ser gravado
+    instance._impressora_original, instance._data_original = instance.impressora_id, instance.data_leitura
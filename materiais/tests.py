@@ -1,3 +1,470 @@
+import io
+import re
+import unittest
+import zipfile
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.versoes import cache_versoes
+from .models import (
+    Papel, TabelaPrecoPapel, Fornecedor,
+    Insumo, CategoriaInsumo, CompraInsumo,
+    Acabamento, TabelaPrecoAcabamento, CategoriaAcabamento,
+    Impressora, ComponenteImpressora, TrocaSuprimento, GuilhotinaConfig, CompraPapel,
+    SaidaEstoque, LeituraImpressora, ProducaoImpressoraDia, ProducaoImpressoraMes,
+)
+from .exportacao import gerar
+from .importacao import converter_decimal, importar_compras, ler_linhas
+from .kpi import versao_kpi
+from .leituras import recalcular_producao, registrar_leituras
+from .precos import guilhotina
+
+
+class ChangelistQueryCountTests(TestCase):
+    """O número de consultas de cada changelist não pode crescer com o número de linhas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        cls.fornecedor = Fornecedor.objects.create(nome_empresa="Fornecedor", segmento='IMPRESSORA')
+        cls.impressora = Impressora.objects.create(
+            nome="Konica 01", marca="Konica", modelo="C3070", largura_max_mm=330, altura_max_mm=488
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def criar_linhas(self, inicio, fim):
+        for i in range(inicio, fim):
+            papel = Papel.objects.create(nome=f"Papel {i}", gramatura="90g", largura_mm=330, altura_mm=480)
+            TabelaPrecoPapel.objects.create(papel=papel, qtd_minima=1, valor_venda=Decimal('2.00'))
+            TabelaPrecoPapel.objects.create(papel=papel, qtd_minima=100, valor_venda=Decimal('1.50'))
+
+            categoria_insumo = CategoriaInsumo.objects.create(nome=f"Tag {i}")
+            Insumo.objects.create(nome=f"Insumo {i}", categoria=categoria_insumo)
+
+            categoria_acabamento = CategoriaAcabamento.objects.create(nome=f"Tag {i}")
+            acabamento = Acabamento.objects.create(nome=f"Acabamento {i}", categoria=categoria_acabamento)
+            TabelaPrecoAcabamento.objects.create(acabamento=acabamento, qtd_minima=1, valor_venda=Decimal('0.50'))
+
+            componente = ComponenteImpressora.objects.create(
+                impressora=self.impressora, nome=f"Toner {i}", tipo="Toner", rendimento_estimado=1000
+            )
+            TrocaSuprimento.objects.create(
+                componente=componente, data_troca=date(2025, 1, 1), fornecedor=self.fornecedor,
+                contador_no_momento=1000 * (i + 1), valor_compra=Decimal('300.00'),
+            )
+
+    def contar_consultas(self, url):
+        # A primeira requisição aquece caches de processo (índice de faixas, permissões)
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as consultas:
+            resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        return len(consultas)
+
+    def assertConsultasConstantes(self, nome_url):
+        url = reverse(nome_url)
+        self.criar_linhas(0, 2)
+        poucas = self.contar_consultas(url)
+        self.criar_linhas(2, 20)
+        muitas = self.contar_consultas(url)
+        self.assertEqual(poucas, muitas, f"{nome_url}: {poucas} consultas com 2 linhas, {muitas} com 20")
+
+    def test_papel(self):
+        self.assertConsultasConstantes('admin:materiais_papel_changelist')
+
+    def test_insumo(self):
+        self.assertConsultasConstantes('admin:materiais_insumo_changelist')
+
+    def test_acabamento(self):
+        self.assertConsultasConstantes('admin:materiais_acabamento_changelist')
+
+    def test_componente(self):
+        self.assertConsultasConstantes('admin:materiais_componenteimpressora_changelist')
+
+    def test_troca_suprimento(self):
+        self.assertConsultasConstantes('admin:materiais_trocasuprimento_changelist')
+
+
+class IndiceGuilhotinaTests(TestCase):
+    """Folhas por batida saem do índice em memória, com a regra da faixa de menor gramatura_min."""
+
+    @classmethod
+    def setUpTestData(cls):
+        GuilhotinaConfig.objects.create(gramatura_min=0, gramatura_max=120, folhas_por_corte=500)
+        GuilhotinaConfig.objects.create(gramatura_min=100, gramatura_max=250, folhas_por_corte=250)
+        GuilhotinaConfig.objects.create(gramatura_min=300, gramatura_max=400, folhas_por_corte=100)
+
+    def setUp(self):
+        guilhotina.invalidar()
+
+    def test_faixas_sobrepostas_e_buracos(self):
+        casos = {0: 500, 90: 500, 120: 500, 121: 250, 250: 250, 251: None, 300: 100, 400: 100, 401: None}
+        guilhotina.folhas_por_corte(90)  # carrega o índice
+        with self.assertNumQueries(0):
+            for gramatura, esperado in casos.items():
+                self.assertEqual(guilhotina.folhas_por_corte(gramatura), esperado, gramatura)
+            self.assertEqual(guilhotina.batidas(180, 1000), 4)
+            self.assertIsNone(guilhotina.batidas(260, 1000))
+
+    def test_recarrega_ao_salvar(self):
+        self.assertEqual(guilhotina.folhas_por_corte(350), 100)
+        config = GuilhotinaConfig.objects.get(gramatura_min=300)
+        config.folhas_por_corte = 80
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            config.save()
+            # Antes do commit a versão publicada não muda
+            self.assertEqual(guilhotina.folhas_por_corte(350), 100)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(guilhotina.folhas_por_corte(350), 80)
+
+    def test_versao_trocada_por_outro_worker(self):
+        self.assertEqual(guilhotina.folhas_por_corte(350), 100)
+        # Outro processo salvou: aqui não há signal, só a versão compartilhada muda
+        GuilhotinaConfig.objects.filter(gramatura_min=300).update(folhas_por_corte=80)
+        cache_versoes.set(guilhotina.chave_versao, 'outro-worker', None)
+        with self.assertNumQueries(0):
+            self.assertEqual(guilhotina.folhas_por_corte(350), 100)  # ainda dentro do intervalo
+        guilhotina._conferido -= guilhotina.intervalo
+        self.assertEqual(guilhotina.folhas_por_corte(350), 80)
+
+    def test_papel_grava_gramatura_numerica(self):
+        papel = Papel.objects.create(nome="Couchê", gramatura="150 g/m²", largura_mm=330, altura_mm=480)
+        self.assertEqual(papel.gramatura_g, 150)
+        papel.gramatura = "180g"
+        papel.save(update_fields=['gramatura'])
+        papel.refresh_from_db()
+        self.assertEqual(papel.gramatura_g, 180)
+
+
+class ExportacaoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        fornecedor = Fornecedor.objects.create(nome_empresa="Distribuidora", segmento='PAPEL')
+        papel = Papel.objects.create(nome="Couchê", gramatura="150g", largura_mm=330, altura_mm=480)
+        for dia in (5, 15, 25):
+            CompraPapel.objects.create(
+                papel=papel, data_compra=date(2025, 3, dia), fornecedor=fornecedor,
+                qtd_pacotes_compra=2, qtd_embalagem=250, valor_pacote=Decimal('125.50'),
+            )
+
+    def exportar(self, formato, **filtros):
+        return b''.join(gerar('compras_papel', formato, **filtros))
+
+    def test_csv_filtra_periodo_e_formata_pt_br(self):
+        texto = self.exportar('csv', inicio=date(2025, 3, 10), fim=date(2025, 3, 25)).decode('utf-8-sig')
+        linhas = texto.splitlines()
+        self.assertTrue(linhas[0].startswith('ID;Data;Papel'))
+        self.assertEqual(len(linhas), 3)
+        self.assertIn('15/03/2025;Couchê;150g;Distribuidora;2;250;125,50', linhas[1])
+        self.assertIn('25/03/2025', linhas[2])
+
+    def test_xlsx_valido(self):
+        with zipfile.ZipFile(io.BytesIO(self.exportar('xlsx'))) as arquivo:
+            self.assertIsNone(arquivo.testzip())
+            planilha = arquivo.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(planilha.count('<row'), 4)
+        self.assertIn('Distribuidora', planilha)
+
+    def test_action_do_admin_devolve_streaming(self):
+        self.client.force_login(self.admin)
+        resposta = self.client.post(reverse('admin:materiais_comprapapel_changelist'), {
+            'action': 'exportar_csv',
+            '_selected_action': list(CompraPapel.objects.values_list('pk', flat=True)[:2]),
+        })
+        self.assertTrue(resposta.streaming)
+        self.assertIn('attachment;', resposta['Content-Disposition'])
+        self.assertEqual(len(b''.join(resposta.streaming_content).splitlines()), 3)
+
+
+class PlanoConsultaMixin:
+    """
+    EXPLAIN QUERY PLAN (SQLite) das consultas críticas: nenhuma tabela pode ser
+    lida por varredura completa ("SCAN tabela") e, quando informadas, as colunas
+    devem aparecer na busca pelo índice.
+    """
+
+    def assertSemVarredura(self, queryset, *colunas):
+        plano = queryset.explain()
+        varreduras = re.findall(r'\bSCAN (\w+)', plano)
+        self.assertFalse(varreduras, f"Varredura completa em {varreduras}:\n{plano}\n{queryset.query}")
+        if colunas:
+            buscas = [linha for linha in plano.splitlines() if 'SEARCH' in linha and 'INDEX' in linha]
+            self.assertTrue(
+                any(all(f'{coluna}' in linha for coluna in colunas) for linha in buscas),
+                f"Nenhum índice cobre {colunas}:\n{plano}",
+            )
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN é do SQLite")
+class PlanoConsultaTests(PlanoConsultaMixin, TestCase):
+    inicio = date(2025, 1, 1)
+    fim = date(2025, 1, 31)
+
+    def test_troca_anterior_no_save(self):
+        qs = TrocaSuprimento.objects.filter(
+            componente_id=1, contador_no_momento__lt=5000
+        ).order_by('-contador_no_momento')
+        self.assertSemVarredura(qs, 'componente_id=?', 'contador_no_momento<?')
+
+    def test_compras_por_papel_e_periodo(self):
+        qs = CompraPapel.objects.filter(papel__in=[1, 2], data_compra__range=(self.inicio, self.fim))
+        self.assertSemVarredura(qs, 'papel_id=?', 'data_compra>?')
+        self.assertSemVarredura(CompraPapel.objects.filter(data_compra__gte=self.inicio))
+
+    def test_baixas_por_papel_e_periodo(self):
+        agora = timezone.now()
+        qs = SaidaEstoque.objects.filter(papel_id=1, data_movimento__gte=agora)
+        self.assertSemVarredura(qs, 'papel_id=?', 'data_movimento>?')
+        self.assertSemVarredura(SaidaEstoque.objects.filter(data_movimento__gte=agora))
+
+    def test_leituras_vizinhas(self):
+        outras = LeituraImpressora.objects.filter(impressora_id=1).exclude(pk=10)
+        self.assertSemVarredura(
+            outras.filter(data_leitura__lte=self.fim).order_by('-data_leitura', '-contador_total'),
+            'impressora_id=?', 'data_leitura<?',
+        )
+        self.assertSemVarredura(
+            outras.filter(data_leitura__gte=self.inicio).order_by('data_leitura', 'contador_total'),
+            'impressora_id=?', 'data_leitura>?',
+        )
+
+
+class MovimentoEstoqueTests(TestCase):
+    """O estoque do papel acompanha criação, edição, troca de papel e exclusão dos movimentos."""
+
+    def setUp(self):
+        self.fornecedor = Fornecedor.objects.create(nome_empresa="Distribuidora", segmento='PAPEL')
+        self.papel = Papel.objects.create(nome="Couchê", gramatura="150g", largura_mm=330, altura_mm=480)
+        self.outro = Papel.objects.create(nome="Offset", gramatura="90g", largura_mm=330, altura_mm=480)
+
+    def comprar(self, qtd, papel=None):
+        return CompraPapel.objects.create(
+            papel=papel or self.papel, data_compra=date(2025, 3, 1), fornecedor=self.fornecedor,
+            qtd_pacotes_compra=qtd, qtd_embalagem=250, valor_pacote=Decimal('100.00'),
+        )
+
+    def estoque(self, papel=None):
+        return Papel.objects.values_list('estoque_atual', flat=True).get(pk=(papel or self.papel).pk)
+
+    def test_criar_e_editar(self):
+        compra = self.comprar(7)
+        SaidaEstoque.objects.create(papel=self.papel, qtd_pacotes_baixa=2)
+        self.assertEqual(self.estoque(), 5)
+
+        compra = CompraPapel.objects.get(pk=compra.pk)
+        compra.qtd_pacotes_compra = 10
+        compra.save()
+        self.assertEqual(self.estoque(), 8)
+
+    def test_trocar_papel(self):
+        saida = SaidaEstoque.objects.create(papel=self.papel, qtd_pacotes_baixa=2)
+        saida = SaidaEstoque.objects.get(pk=saida.pk)
+        saida.papel = self.outro
+        saida.save()
+        self.assertEqual(self.estoque(), 0)
+        self.assertEqual(self.estoque(self.outro), -2)
+
+    def test_excluir_estorna(self):
+        compra = self.comprar(7)
+        saida = SaidaEstoque.objects.create(papel=self.papel, qtd_pacotes_baixa=2)
+        saida.delete()
+        self.assertEqual(self.estoque(), 7)
+        CompraPapel.objects.filter(pk=compra.pk).delete()
+        self.assertEqual(self.estoque(), 0)
+
+    def test_campos_adiados_nao_duplicam(self):
+        compra = self.comprar(5)
+        adiada = CompraPapel.objects.defer('qtd_pacotes_compra').get(pk=compra.pk)
+        adiada.save()
+        self.assertEqual(self.estoque(), 5)
+        CompraPapel.objects.only('pk').get(pk=compra.pk).delete()
+        self.assertEqual(self.estoque(), 0)
+
+
+class KpiChangelistTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'senha'))
+        self.papel = Papel.objects.create(nome="Couchê", gramatura="150g", largura_mm=330, altura_mm=480)
+        self.fornecedor = Fornecedor.objects.create(nome_empresa="Distribuidora", segmento='PAPEL')
+
+    def kpi(self):
+        return self.client.get(reverse('admin:materiais_papel_changelist')).context['kpi']
+
+    def test_versao_troca_so_depois_do_commit(self):
+        antes = versao_kpi('papel')
+        with self.captureOnCommitCallbacks(execute=True):
+            SaidaEstoque.objects.create(papel=self.papel, qtd_pacotes_baixa=1)
+            self.assertEqual(versao_kpi('papel'), antes)
+        self.assertNotEqual(versao_kpi('papel'), antes)
+
+    def test_movimento_atualiza_kpi_em_cache(self):
+        self.assertEqual(self.kpi()['total_pacotes'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            CompraPapel.objects.create(
+                papel=self.papel, data_compra=date(2025, 3, 1), fornecedor=self.fornecedor,
+                qtd_pacotes_compra=3, qtd_embalagem=250, valor_pacote=Decimal('100.00'),
+            )
+        self.assertEqual(self.kpi()['total_pacotes'], 3)
+
+
+class TrocaSuprimentoTests(TestCase):
+
+    def setUp(self):
+        self.fornecedor = Fornecedor.objects.create(nome_empresa="Toners", segmento='IMPRESSORA')
+        self.impressora = Impressora.objects.create(
+            nome="Konica 01", marca="Konica", modelo="C3070", largura_max_mm=330, altura_max_mm=488
+        )
+        self.componente = ComponenteImpressora.objects.create(
+            impressora=self.impressora, nome="Toner K", tipo="Toner", cor='K', rendimento_estimado=10000
+        )
+
+    def trocar(self, contador, valor='300.00'):
+        return TrocaSuprimento.objects.create(
+            componente=self.componente, data_troca=date(2025, 1, 1), fornecedor=self.fornecedor,
+            contador_no_momento=contador, valor_compra=Decimal(valor),
+        )
+
+    def totais(self):
+        return ComponenteImpressora.objects.values_list(
+            'total_gasto', 'total_paginas', 'custo_medio_por_pagina'
+        ).get(pk=self.componente.pk)
+
+    def test_excluir_ultima_troca_estorna_totais(self):
+        primeira = self.trocar(1000)
+        segunda = self.trocar(6000)
+        self.assertEqual(self.totais()[:2], (Decimal('600.00'), 5000))
+
+        segunda.delete()
+        primeira.refresh_from_db()
+        self.assertEqual(primeira.rendimento_real, 0)
+        self.assertEqual(self.totais()[:2], (Decimal('300.00'), 0))
+
+        primeira.delete()
+        self.assertEqual(self.totais(), (Decimal('0'), 0, Decimal('0')))
+        self.assertEqual(Impressora.objects.get(pk=self.impressora.pk).custo_click_mono, 0)
+
+    def test_excluir_troca_do_meio_religa_vizinhas(self):
+        primeira = self.trocar(1000)
+        meio = self.trocar(4000)
+        self.trocar(9000)
+        TrocaSuprimento.objects.filter(pk=meio.pk).delete()
+        primeira.refresh_from_db()
+        self.assertEqual(primeira.rendimento_real, 8000)
+        self.assertEqual(self.totais()[:2], (Decimal('600.00'), 8000))
+
+
+class ProducaoImpressoraTests(TestCase):
+    """Edição avulsa de leitura refaz só a partir do mês alterado e chega ao mesmo total da carga."""
+
+    def setUp(self):
+        self.impressora = Impressora.objects.create(
+            nome="Konica 01", marca="Konica", modelo="C3070", largura_max_mm=330, altura_max_mm=488
+        )
+        resultado = registrar_leituras([
+            {'impressora': self.impressora.pk, 'data_leitura': data, 'contador_total': contador}
+            for data, contador in (
+                ('2025-01-10', 1000), ('2025-01-31', 1500), ('10/02/2025', 2100), ('2025-03-05', 2500),
+            )
+        ])
+        self.assertEqual(resultado['erros'], [])
+
+    def producao(self):
+        dias = list(ProducaoImpressoraDia.objects.order_by('data').values_list('data', 'paginas', 'contador_final'))
+        meses = list(ProducaoImpressoraMes.objects.order_by('mes').values_list('mes', 'paginas', 'leituras'))
+        return dias, meses
+
+    def test_edicao_recalcula_a_partir_do_mes_alterado(self):
+        janeiro = ProducaoImpressoraMes.objects.get(mes=date(2025, 1, 1))
+        leitura = LeituraImpressora.objects.get(data_leitura=date(2025, 2, 10))
+        leitura.contador_total = 2300
+        with self.captureOnCommitCallbacks(execute=True):
+            leitura.save()
+
+        dias, meses = self.producao()
+        self.assertEqual(meses, [(date(2025, 1, 1), 500, 2), (date(2025, 2, 1), 800, 1), (date(2025, 3, 1), 200, 1)])
+        self.assertEqual(dias[-2:], [(date(2025, 2, 10), 800, 2300), (date(2025, 3, 5), 200, 2500)])
+        # Janeiro não foi apagado e recriado
+        self.assertTrue(ProducaoImpressoraMes.objects.filter(pk=janeiro.pk).exists())
+
+        recalcular_producao()
+        self.assertEqual(self.producao(), (dias, meses))
+
+    def test_mudar_data_para_tras_e_excluir(self):
+        leitura = LeituraImpressora.objects.get(data_leitura=date(2025, 3, 5))
+        leitura.data_leitura = date(2025, 2, 20)
+        with self.captureOnCommitCallbacks(execute=True):
+            leitura.save()
+        dias, meses = self.producao()
+        self.assertEqual(meses[1:], [(date(2025, 2, 1), 1000, 2)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            LeituraImpressora.objects.get(data_leitura=date(2025, 1, 31)).delete()
+        dias, meses = self.producao()
+        self.assertEqual(meses, [(date(2025, 1, 1), 0, 1), (date(2025, 2, 1), 1500, 2)])
+        recalcular_producao()
+        self.assertEqual(self.producao(), (dias, meses))
+
+
+class ImportacaoComprasTests(TestCase):
+
+    def setUp(self):
+        self.papel = Papel.objects.create(nome="Couchê", gramatura="150g", largura_mm=330, altura_mm=480)
+        self.insumo = Insumo.objects.create(nome="Espiral 12mm")
+        self.fornecedor_papel = Fornecedor.objects.create(nome_empresa="Papéis SA", segmento='PAPEL')
+        self.fornecedor_insumo = Fornecedor.objects.create(nome_empresa="Insumos SA", segmento='INSUMO')
+
+    def test_decimal_no_formato_brasileiro(self):
+        self.assertEqual(converter_decimal("1.234,56"), Decimal("1234.56"))
+        self.assertEqual(converter_decimal("1234,5"), Decimal("1234.5"))
+        self.assertEqual(converter_decimal(" 1.234 "), Decimal("1234"))
+        self.assertEqual(converter_decimal(Decimal("12.5")), Decimal("12.5"))
+        for ambiguo in ("12.50", "1.23", "1,234.56", "1.2345,6", ""):
+            with self.subTest(valor=ambiguo), self.assertRaises(ValueError):
+                converter_decimal(ambiguo)
+
+    def test_csv_grava_compras_e_estoque(self):
+        arquivo = (
+            "papel;fornecedor;data_compra;qtd_pacotes_compra;qtd_embalagem;valor_pacote\n"
+            f"{self.papel.pk};{self.fornecedor_papel.pk};05/01/2025;2;500;1.250,00\n"
+            f"{self.papel.pk};{self.fornecedor_papel.pk};2025-01-20;1;250;130,50\n"
+        )
+        resultado = importar_compras(ler_linhas(arquivo), tipo='papel')
+        self.assertEqual((resultado['erros'], resultado['importadas']), ([], 2))
+        self.papel.refresh_from_db()
+        self.assertEqual(self.papel.estoque_atual, 3)
+        self.assertEqual(self.papel.ultimo_valor_pacote, Decimal("130.50"))
+
+    def test_jsonl_usa_numeros_como_estao(self):
+        arquivo = (
+            f'{{"insumo": {self.insumo.pk}, "fornecedor": {self.fornecedor_insumo.pk}, '
+            f'"data_compra": "2025-01-05", "qtd_compra": 12.5, "valor_total_nota": 250}}\n'
+        )
+        resultado = importar_compras(ler_linhas(arquivo, 'jsonl'), tipo='insumo')
+        self.assertEqual(resultado['erros'], [])
+        self.assertEqual(CompraInsumo.objects.get().valor_unitario, Decimal("20"))
+
+    def test_fornecedor_de_outro_segmento_e_recusado(self):
+        linhas = [
+            {'papel': self.papel.pk, 'fornecedor': self.fornecedor_insumo.pk, 'data_compra': '2025-01-05',
+             'qtd_pacotes_compra': 1, 'qtd_embalagem': 500, 'valor_pacote': '100,00'},
+            {'papel': self.papel.pk, 'fornecedor': self.fornecedor_papel.pk, 'data_compra': '2025-01-05',
+             'qtd_pacotes_compra': 1, 'qtd_embalagem': 500, 'valor_pacote': '12.50'},
+        ]
+        resultado = importar_compras(linhas, tipo='papel')
+        self.assertEqual([numero for numero, _ in resultado['erros']], [1, 2])
+        self.assertIn("segmento", resultado['erros'][0][1])
+        self.assertEqual(resultado['importadas'], 0)
+        self.assertFalse(CompraPapel.objects.exists())
 
-# Create your tests here.
@@ -24,6 +24,7 @@ class ItemOrcamentoAdmin(admin.ModelAdmin):
 @admin.register(Orcamento)
 class OrcamentoAdmin(admin.ModelAdmin):
     list_display = ('pk', 'cliente', 'status', 'data_criacao')
+    list_filter = ('status', 'data_criacao')
 
 @admin.register(Cliente)
 class ClienteAdmin(admin.ModelAdmin):
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class OrcamentosConfig(AppConfig):
     name = 'orcamentos'
+
+    def ready(self):
+        from . import signals  # noqa: F401
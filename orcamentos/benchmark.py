@@ -0,0 +1,464 @@
+"""
+Suíte de benchmark dos caminhos quentes do sistema (comando `benchmark`).
+
+gerar_dados() cria uma base sintética no banco atual (milhares de papéis,
+centenas de milhares de compras/baixas/trocas, 100k clientes, na escala 1.0);
+CENARIOS mede cada caminho quente e rodar() devolve um dict pronto para JSON,
+comparável entre execuções com comparar().
+
+O comando roda tudo dentro de uma transação desfeita no final.
+"""
+import platform
+import random
+import statistics
+import subprocess
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+import django
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from materiais.models import (
+    Fornecedor, Papel, TabelaPrecoPapel, CompraPapel, SaidaEstoque,
+    CategoriaInsumo, Insumo, CategoriaAcabamento, Acabamento, TabelaPrecoAcabamento,
+    Impressora, ComponenteImpressora, TrocaSuprimento, GuilhotinaConfig,
+)
+from .busca import reindexar_todos
+from .combinacoes import melhores_combinacoes
+from .models import Cliente, Orcamento, ItemOrcamento
+from .montagem import Peca, montar_folhas
+from .precificacao import calcular_tiragens
+from .utils import calcular_imposicao, get_cache_imposicao
+
+# Quantidades na escala 1.0
+VOLUMES = {
+    'papeis': 2_000,
+    'compras_papel': 200_000,
+    'saidas_estoque': 200_000,
+    'impressoras': 40,
+    'trocas_suprimento': 100_000,
+    'insumos': 500,
+    'acabamentos': 300,
+    'clientes': 100_000,
+    'orcamentos': 20_000,
+}
+
+NOMES = ['Ana', 'João', 'Maria', 'José', 'Carlos', 'Fernanda', 'Paulo', 'Juliana', 'Marcos', 'Patrícia']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Rodrigues', 'Almeida', 'Gomes']
+PAPEIS = ['Couchê', 'Offset', 'Adesivo', 'Reciclato', 'Triplex', 'Supremo', 'Vergê', 'Kraft']
+FORMATOS = [(330, 480), (320, 450), (325, 487), (297, 420), (330, 660), (640, 880)]
+CORES = ['K', 'C', 'M', 'Y', 'ALL']
+TAMANHO_LOTE = 5_000
+
+
+def _em_lotes(model, objetos):
+    for inicio in range(0, len(objetos), TAMANHO_LOTE):
+        model.objects.bulk_create(objetos[inicio:inicio + TAMANHO_LOTE])
+
+
+def gerar_dados(escala=1.0, semente=42, log=print):
+    """
+    Popula o banco com dados sintéticos (bulk_create, sem signals) e devolve as contagens.
+    Estoques e totais derivados (estoque_atual, rendimento_real, totais do componente)
+    são calculados aqui mesmo, já consistentes com o histórico gerado.
+    """
+    rnd = random.Random(semente)
+    n = {chave: max(int(valor * escala), 1) for chave, valor in VOLUMES.items()}
+    inicio_historico = date(2023, 1, 1)
+
+    log("Cadastros base...")
+    fornecedores = Fornecedor.objects.bulk_create(
+        [Fornecedor(nome_empresa=f"Fornecedor Papel {i}", segmento='PAPEL') for i in range(20)]
+        + [Fornecedor(nome_empresa=f"Fornecedor Toner {i}", segmento='IMPRESSORA') for i in range(10)]
+    )
+    forn_papel = [f.pk for f in fornecedores if f.segmento == 'PAPEL']
+    forn_toner = [f.pk for f in fornecedores if f.segmento == 'IMPRESSORA']
+    GuilhotinaConfig.objects.bulk_create([
+        GuilhotinaConfig(gramatura_min=0, gramatura_max=120, folhas_por_corte=500),
+        GuilhotinaConfig(gramatura_min=121, gramatura_max=250, folhas_por_corte=250),
+        GuilhotinaConfig(gramatura_min=251, gramatura_max=999, folhas_por_corte=120),
+    ])
+
+    log(f"{n['papeis']} papéis, {n['compras_papel']} compras, {n['saidas_estoque']} baixas...")
+    papeis = []
+    for i in range(n['papeis']):
+        largura, altura = rnd.choice(FORMATOS)
+        gramatura = rnd.choice([75, 90, 120, 150, 180, 250, 300])
+        papeis.append(Papel(
+            nome=f"{rnd.choice(PAPEIS)} {i}", gramatura=f"{gramatura}g", gramatura_g=gramatura,
+            largura_mm=largura, altura_mm=altura,
+        ))
+    _em_lotes(Papel, papeis)
+    papeis = list(Papel.objects.order_by('pk'))
+    TabelaPrecoPapel.objects.bulk_create([
+        TabelaPrecoPapel(papel=p, qtd_minima=minimo, valor_venda=Decimal(valor))
+        for p in papeis for minimo, valor in ((1, '1.20'), (100, '0.95'), (1000, '0.70'))
+    ], batch_size=TAMANHO_LOTE)
+
+    estoque = {p.pk: 0 for p in papeis}
+    ultima = {}
+    compras = []
+    for i in range(n['compras_papel']):
+        papel = papeis[rnd.randrange(len(papeis))]
+        qtd, embalagem = rnd.randint(1, 20), rnd.choice([100, 125, 250, 500])
+        valor_pacote = Decimal(rnd.randint(2_000, 40_000)) / 100
+        compra = CompraPapel(
+            papel=papel, fornecedor_id=rnd.choice(forn_papel),
+            data_compra=inicio_historico + timedelta(days=i * 1000 // n['compras_papel']),
+            qtd_pacotes_compra=qtd, qtd_embalagem=embalagem,
+            valor_pacote=valor_pacote, valor_unitario=valor_pacote / embalagem,
+        )
+        compras.append(compra)
+        estoque[papel.pk] += qtd
+        ultima[papel.pk] = compra
+    _em_lotes(CompraPapel, compras)
+
+    saidas = []
+    ids_papel = list(estoque)
+    for _ in range(n['saidas_estoque']):
+        papel_id = ids_papel[rnd.randrange(len(ids_papel))]
+        if estoque[papel_id] <= 0:
+            continue
+        qtd = rnd.randint(1, min(estoque[papel_id], 5))
+        estoque[papel_id] -= qtd
+        saidas.append(SaidaEstoque(papel_id=papel_id, qtd_pacotes_baixa=qtd, observacao="Produção"))
+    _em_lotes(SaidaEstoque, saidas)
+
+    for papel in papeis:
+        papel.estoque_atual = estoque[papel.pk]
+        if papel.pk in ultima:
+            papel.ultimo_valor_pacote = ultima[papel.pk].valor_pacote
+            papel.ultimo_preco_unitario = ultima[papel.pk].valor_unitario
+    Papel.objects.bulk_update(
+        papeis, ['estoque_atual', 'ultimo_valor_pacote', 'ultimo_preco_unitario'], batch_size=TAMANHO_LOTE
+    )
+
+    log(f"{n['impressoras']} impressoras, {n['trocas_suprimento']} trocas de suprimento...")
+    impressoras = Impressora.objects.bulk_create([
+        Impressora(nome=f"Máquina {i:02d}", marca="Konica", modelo="C3070",
+                   largura_max_mm=330, altura_max_mm=488, contador_total_atual=0)
+        for i in range(n['impressoras'])
+    ])
+    componentes = ComponenteImpressora.objects.bulk_create([
+        ComponenteImpressora(impressora=imp, nome=f"Toner {cor}", tipo="Toner", cor=cor,
+                             rendimento_estimado=30_000)
+        for imp in impressoras for cor in CORES
+    ])
+    por_componente = max(n['trocas_suprimento'] // len(componentes), 1)
+    trocas = []
+    contadores = {imp.pk: 0 for imp in impressoras}
+    for comp in componentes:
+        contador = contadores[comp.impressora_id]
+        anterior = None
+        gasto = Decimal(0)
+        paginas = 0
+        for j in range(por_componente):
+            contador += rnd.randint(5_000, 40_000)
+            troca = TrocaSuprimento(
+                componente=comp, fornecedor_id=rnd.choice(forn_toner),
+                data_troca=inicio_historico + timedelta(days=j * 1000 // por_componente),
+                contador_no_momento=contador, valor_compra=Decimal(rnd.randint(150, 900)),
+            )
+            if anterior is not None:
+                anterior.rendimento_real = contador - anterior.contador_no_momento
+                gasto += anterior.valor_compra
+                paginas += anterior.rendimento_real
+            trocas.append(troca)
+            anterior = troca
+        contadores[comp.impressora_id] = max(contadores[comp.impressora_id], contador)
+        comp.total_gasto, comp.total_paginas = gasto, paginas
+        if paginas:
+            comp.custo_medio_por_pagina = gasto / paginas
+    _em_lotes(TrocaSuprimento, trocas)
+    ComponenteImpressora.objects.bulk_update(
+        componentes, ['total_gasto', 'total_paginas', 'custo_medio_por_pagina'], batch_size=TAMANHO_LOTE
+    )
+    for imp in impressoras:
+        imp.recalcular_custos(contador_total_atual=contadores[imp.pk])
+
+    log(f"{n['insumos']} insumos, {n['acabamentos']} acabamentos...")
+    cat_insumo = CategoriaInsumo.objects.bulk_create([CategoriaInsumo(nome=f"Tag {i}") for i in range(20)])
+    _em_lotes(Insumo, [
+        Insumo(nome=f"Insumo {i}", categoria=cat_insumo[i % len(cat_insumo)],
+               estoque_atual=Decimal(rnd.randint(0, 500)), ultimo_preco_custo=Decimal(rnd.randint(1, 300)))
+        for i in range(n['insumos'])
+    ])
+    cat_acab = CategoriaAcabamento.objects.bulk_create([CategoriaAcabamento(nome=f"Tag {i}") for i in range(10)])
+    acabamentos = Acabamento.objects.bulk_create([
+        Acabamento(nome=f"Acabamento {i}", categoria=cat_acab[i % len(cat_acab)]) for i in range(n['acabamentos'])
+    ])
+    TabelaPrecoAcabamento.objects.bulk_create([
+        TabelaPrecoAcabamento(acabamento=a, qtd_minima=minimo, valor_venda=Decimal(valor))
+        for a in acabamentos for minimo, valor in ((1, '0.50'), (500, '0.30'))
+    ], batch_size=TAMANHO_LOTE)
+
+    log(f"{n['clientes']} clientes, {n['orcamentos']} orçamentos...")
+    clientes = []
+    for i in range(n['clientes']):
+        documento = f"{10**10 + i}"
+        clientes.append(Cliente(
+            tipo=rnd.choice(['PF', 'PJ']),
+            nome=f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)}",
+            documento=documento, documento_normalizado=documento,
+            telefone="(11) 99999-0000", email=f"cliente{i}@exemplo.com.br",
+        ))
+    _em_lotes(Cliente, clientes)
+    reindexar_todos()
+    ids_cliente = list(Cliente.objects.values_list('pk', flat=True))
+    _em_lotes(Orcamento, [
+        Orcamento(cliente_id=ids_cliente[rnd.randrange(len(ids_cliente))]) for _ in range(n['orcamentos'])
+    ])
+
+    return {
+        'papeis': n['papeis'],
+        'compras_papel': len(compras),
+        'saidas_estoque': len(saidas),
+        'impressoras': len(impressoras),
+        'trocas_suprimento': len(trocas),
+        'insumos': n['insumos'],
+        'acabamentos': len(acabamentos),
+        'clientes': len(clientes),
+        'orcamentos': n['orcamentos'],
+    }
+
+
+# ------------------------------------------------------------------
+# CENÁRIOS
+# ------------------------------------------------------------------
+class Contexto:
+    """Objetos compartilhados pelos cenários (cliente HTTP logado, amostras da base)."""
+
+    def __init__(self, semente=42):
+        self.rnd = random.Random(semente)
+        self.usuario = User.objects.create_superuser('benchmark', 'benchmark@exemplo.com', 'benchmark')
+        self.http = Client()
+        self.http.force_login(self.usuario)
+        self.papeis = list(Papel.objects.values_list('pk', flat=True)[:200])
+        self.componentes = list(ComponenteImpressora.objects.values_list('pk', flat=True)[:100])
+        self.fornecedor_papel = Fornecedor.objects.filter(segmento='PAPEL').values_list('pk', flat=True).first()
+        self.fornecedor_toner = Fornecedor.objects.filter(segmento='IMPRESSORA').values_list('pk', flat=True).first()
+        self.item = ItemOrcamento.objects.create(
+            orcamento=Orcamento.objects.order_by('pk').first(), titulo="Cartão", largura_final_mm=90,
+            altura_final_mm=50, papel_id=self.papeis[0], impressora=Impressora.objects.order_by('pk').first(),
+        )
+
+    def get(self, url, **params):
+        resposta = self.http.get(url, params)
+        if resposta.status_code != 200:
+            raise RuntimeError(f"{url} respondeu {resposta.status_code}")
+        return resposta
+
+
+def _medidas():
+    return [(w, h) for w in range(40, 320, 7) for h in range(30, 450, 11)]
+
+
+def cenario_imposicao(ctx):
+    # Motor puro, sem cache: uma medida diferente a cada chamada
+    medidas = _medidas()
+    estado = {'i': 0}
+
+    def rodar():
+        w, h = medidas[estado['i'] % len(medidas)]
+        estado['i'] += 1
+        calcular_imposicao(330, 480, w, h)
+    return rodar
+
+
+def cenario_montagem(ctx):
+    # 50 trabalhos diferentes (cartões a cartazes A4) no mesmo 330x480, sem cache
+    rnd = random.Random(7)
+    lotes = [
+        [
+            Peca(i, rnd.randint(50, 210) + 6, rnd.randint(40, 297) + 6,
+                 rnd.choice([100, 250, 500, 1000, 2000, 5000]), 3)
+            for i in range(50)
+        ]
+        for _ in range(4)
+    ]
+    estado = {'i': 0}
+
+    def rodar():
+        pecas = lotes[estado['i'] % len(lotes)]
+        estado['i'] += 1
+        montar_folhas(330, 480, pecas)
+    return rodar
+
+
+def cenario_htmx_aproveitamento(ctx):
+    url = reverse('orcamentos:htmx_aproveitamento')
+    get_cache_imposicao().limpar()
+
+    def rodar():
+        w, h = ctx.rnd.choice([(90, 50), (210, 297), (148, 210), (100, 150), (55, 85)])
+        ctx.get(url, **{
+            'item-largura_final_mm': w, 'item-altura_final_mm': h, 'item-sangria_mm': 3,
+            'item-papel': ctx.rnd.choice(ctx.papeis),
+        })
+    return rodar
+
+
+def cenario_buscar_cliente(ctx):
+    url = reverse('orcamentos:buscar_cliente')
+    termos = ['mar', 'silva', 'jose sou', 'cliente123', 'oliv costa', '10000004242']
+
+    def rodar():
+        ctx.get(url, q=ctx.rnd.choice(termos))
+    return rodar
+
+
+def cenario_lista_clientes(ctx):
+    url = reverse('orcamentos:lista_clientes')
+
+    def rodar():
+        ctx.get(url)
+    return rodar
+
+
+def _changelist(nome_url):
+    def cenario(ctx):
+        url = reverse(nome_url)
+
+        def rodar():
+            ctx.get(url)
+        return rodar
+    return cenario
+
+
+def cenario_saida_estoque(ctx):
+    def rodar():
+        SaidaEstoque.objects.create(papel_id=ctx.rnd.choice(ctx.papeis), qtd_pacotes_baixa=1, usuario=ctx.usuario)
+    return rodar
+
+
+def cenario_compra_papel(ctx):
+    def rodar():
+        CompraPapel.objects.create(
+            papel_id=ctx.rnd.choice(ctx.papeis), fornecedor_id=ctx.fornecedor_papel, data_compra=date.today(),
+            qtd_pacotes_compra=2, qtd_embalagem=250, valor_pacote=Decimal('120.00'),
+        )
+    return rodar
+
+
+def cenario_troca_suprimento(ctx):
+    def rodar():
+        componente_id = ctx.rnd.choice(ctx.componentes)
+        ultimo = (
+            TrocaSuprimento.objects.filter(componente_id=componente_id)
+            .order_by('-contador_no_momento').values_list('contador_no_momento', flat=True).first()
+        ) or 0
+        TrocaSuprimento.objects.create(
+            componente_id=componente_id, fornecedor_id=ctx.fornecedor_toner, data_troca=date.today(),
+            contador_no_momento=ultimo + 25_000, valor_compra=Decimal('450.00'),
+        )
+    return rodar
+
+
+def cenario_precificacao(ctx):
+    def rodar():
+        calcular_tiragens(ctx.item, [100, 250, 500, 1000, 2000, 5000, 10000])
+    return rodar
+
+
+CENARIOS = {
+    'imposicao.calcular_imposicao': cenario_imposicao,
+    'imposicao.montagem_50_itens': cenario_montagem,
+    'view.htmx_calcular_aproveitamento': cenario_htmx_aproveitamento,
+    'view.buscar_cliente': cenario_buscar_cliente,
+    'view.lista_clientes': cenario_lista_clientes,
+    'admin.papel': _changelist('admin:materiais_papel_changelist'),
+    'admin.comprapapel': _changelist('admin:materiais_comprapapel_changelist'),
+    'admin.saidaestoque': _changelist('admin:materiais_saidaestoque_changelist'),
+    'admin.insumo': _changelist('admin:materiais_insumo_changelist'),
+    'admin.impressora': _changelist('admin:materiais_impressora_changelist'),
+    'admin.trocasuprimento': _changelist('admin:materiais_trocasuprimento_changelist'),
+    'admin.cliente': _changelist('admin:orcamentos_cliente_changelist'),
+    'save.saida_estoque': cenario_saida_estoque,
+    'save.compra_papel': cenario_compra_papel,
+    'save.troca_suprimento': cenario_troca_suprimento,
+    'orcamento.calcular_tiragens': cenario_precificacao,
+    'orcamento.melhores_combinacoes': cenario_combinacoes,
+}
+
+
+def cenario_combinacoes(ctx):
+    # Catálogo inteiro (papéis x impressoras) em memória; medidas variando como na digitação
+    medidas = [(90, 50), (210, 297), (148, 210), (100, 150), (55, 85), (297, 420)]
+    estado = {'i': 0}
+
+    def rodar():
+        w, h = medidas[estado['i'] % len(medidas)]
+        estado['i'] += 1
+        melhores_combinacoes(w, h, 3, '4x4', 1000)
+    return rodar
+
+
+def medir(rodar, repeticoes, aquecimento=2):
+    """Tempos em ms de 'repeticoes' chamadas + consultas SQL de uma chamada extra."""
+    for _ in range(aquecimento):
+        rodar()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        rodar()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    with CaptureQueriesContext(connection) as consultas:
+        rodar()
+    tempos.sort()
+    return {
+        'repeticoes': repeticoes,
+        'p50_ms': round(statistics.median(tempos), 3),
+        'p95_ms': round(tempos[min(int(len(tempos) * 0.95), len(tempos) - 1)], 3),
+        'media_ms': round(statistics.fmean(tempos), 3),
+        'min_ms': round(tempos[0], 3),
+        'consultas': len(consultas),
+    }
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def rodar(nomes=None, repeticoes=30, contagens=None, log=print):
+    """Executa os cenários (todos ou os informados) e devolve o resultado em formato JSON."""
+    ctx = Contexto()
+    resultados = {}
+    for nome, cenario in CENARIOS.items():
+        if nomes and not any(nome.startswith(filtro) for filtro in nomes):
+            continue
+        resultados[nome] = medir(cenario(ctx), repeticoes)
+        log(f"{nome:<36} p50 {resultados[nome]['p50_ms']:9.2f} ms   "
+            f"p95 {resultados[nome]['p95_ms']:9.2f} ms   {resultados[nome]['consultas']:3d} consultas")
+    return {
+        'meta': {
+            'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': _commit_atual(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'banco': connection.vendor,
+            'volumes': contagens or {},
+        },
+        'cenarios': resultados,
+    }
+
+
+def comparar(anterior, atual, tolerancia=0.10):
+    """Linhas (nome, p50 antes, p50 agora, variação) para os cenários presentes nas duas execuções."""
+    linhas = []
+    for nome, agora in atual['cenarios'].items():
+        antes = anterior.get('cenarios', {}).get(nome)
+        if not antes or not antes['p50_ms']:
+            continue
+        variacao = agora['p50_ms'] / antes['p50_ms'] - 1
+        linhas.append((nome, antes['p50_ms'], agora['p50_ms'], variacao, variacao > tolerancia))
+    return linhas
@@ -0,0 +1,140 @@
+"""
+Busca de clientes com índice full-text (SQLite FTS5).
+
+A tabela virtual orcamentos_cliente_busca guarda nome, nome fantasia, documento
+e email de cada Cliente (rowid = id do cliente) e é mantida pelos signals de
+orcamentos.signals. A busca é por prefixo de cada palavra digitada, sem acento,
+ordenada pela relevância (bm25) do FTS5.
+
+Em bancos sem FTS5 (ex: outro vendor) cai no icontains de antes.
+Texto que é um CPF/CNPJ completo vai direto no índice único de documento_normalizado.
+
+abuscar_clientes() é a versão para views assíncronas (ORM async; só o MATCH,
+que é SQL cru, passa por sync_to_async).
+"""
+import re
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .documentos import normalizar_documento, parece_documento
+from .models import Cliente
+
+TABELA = 'orcamentos_cliente_busca'  # criada na migração 0002_cliente_busca
+
+
+def fts_disponivel():
+    return connection.vendor == 'sqlite'
+
+
+def _termos(texto):
+    # Cada palavra vira um prefixo entre aspas: "jo"* "silv"*
+    palavras = re.findall(r'\w+', texto or '')
+    return ' '.join(f'"{p}"*' for p in palavras)
+
+
+def _linha(cliente):
+    return (
+        cliente.pk, cliente.nome or '', cliente.nome_fantasia or '',
+        cliente.documento or '', cliente.email or '',
+    )
+
+
+def indexar_clientes(clientes):
+    """Insere/atualiza clientes no índice."""
+    if not fts_disponivel():
+        return
+    linhas = [_linha(c) for c in clientes]
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {TABELA} WHERE rowid = %s", [(l[0],) for l in linhas])
+        cursor.executemany(
+            f"INSERT INTO {TABELA} (rowid, nome, nome_fantasia, documento, email) VALUES (%s, %s, %s, %s, %s)",
+            linhas,
+        )
+
+
+def remover_cliente(cliente_id):
+    if not fts_disponivel():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABELA} WHERE rowid = %s", [cliente_id])
+
+
+def reindexar_todos():
+    """Reconstrói o índice inteiro a partir da tabela de clientes (após cargas em lote)."""
+    if not fts_disponivel():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABELA}")
+        cursor.execute(
+            f"INSERT INTO {TABELA} (rowid, nome, nome_fantasia, documento, email) "
+            f"SELECT id, nome, COALESCE(nome_fantasia, ''), COALESCE(documento, ''), COALESCE(email, '') "
+            f"FROM {Cliente._meta.db_table}"
+        )
+
+
+def filtrar_clientes(qs, texto):
+    """
+    Restringe um queryset de Cliente ao que casa com a busca (sem mudar a ordenação).
+    O MATCH roda uma vez como subconsulta não correlacionada.
+    """
+    if parece_documento(texto):
+        return qs.filter(documento_normalizado=normalizar_documento(texto))
+    termos = _termos(texto)
+    if not termos:
+        return qs.none()
+    if not fts_disponivel():
+        return qs.filter(Q(nome__icontains=texto) | Q(documento__icontains=texto) | Q(email__icontains=texto))
+    return qs.filter(pk__in=RawSQL(f"SELECT rowid FROM {TABELA} WHERE {TABELA} MATCH %s", [termos]))
+
+
+def buscar_clientes(texto, limite=5):
+    """
+    Os 'limite' clientes mais relevantes para o texto digitado (lista ordenada).
+
+    A relevância (bm25) é calculada sobre todas as linhas que casam e só depois
+    vem o LIMIT: o FTS5 faz o ORDER BY rank LIMIT n com um top-n, sem ordenar tudo.
+    Empates ficam com o cadastro mais recente.
+    """
+    if parece_documento(texto):
+        return list(Cliente.objects.filter(documento_normalizado=normalizar_documento(texto))[:limite])
+    termos = _termos(texto)
+    if not termos:
+        return []
+    ids = _ids_relevantes(termos, limite)
+    if ids is None:
+        return list(Cliente.objects.filter(nome__icontains=texto)[:limite])
+    clientes = Cliente.objects.in_bulk(ids)
+    return [clientes[i] for i in ids if i in clientes]
+
+
+async def abuscar_clientes(texto, limite=5):
+    """Mesmo resultado de buscar_clientes(), para views assíncronas."""
+    if parece_documento(texto):
+        qs = Cliente.objects.filter(documento_normalizado=normalizar_documento(texto))[:limite]
+        return [cliente async for cliente in qs]
+    termos = _termos(texto)
+    if not termos:
+        return []
+
+    # Cursor cru não tem API assíncrona: só essa consulta vai para a thread de banco.
+    # O teste do vendor vai junto: 'connection' lido no loop cria um contextvar por thread.
+    ids = await sync_to_async(_ids_relevantes)(termos, limite)
+    if ids is None:
+        return [cliente async for cliente in Cliente.objects.filter(nome__icontains=texto)[:limite]]
+    clientes = await Cliente.objects.ain_bulk(ids)
+    return [clientes[i] for i in ids if i in clientes]
+
+
+def _ids_relevantes(termos, limite):
+    # None = sem FTS neste banco
+    if not fts_disponivel():
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {TABELA} WHERE {TABELA} MATCH %s ORDER BY rank, rowid DESC LIMIT %s",
+            [termos, limite],
+        )
+        return [linha[0] for linha in cursor.fetchall()]
@@ -0,0 +1,87 @@
+"""
+Combinação papel x impressora mais barata para um item.
+
+Para as medidas finais, sangria, cores e quantidade, avalia cada papel do
+catálogo em cada impressora onde ele cabe (largura_max_mm/altura_max_mm, nas
+duas orientações) e ordena por custo: folhas x preço da folha + folhas x click.
+
+Tudo sai do catálogo em memória (materiais.precos.catalogo) e do cache de
+imposição; imposição e impressoras compatíveis são calculadas uma vez por
+formato de papel, não por papel. Como o click não depende do papel, as
+impressoras são ordenadas pelo click uma vez e cada papel só combina com as
+'limite' compatíveis mais baratas: as outras não teriam como entrar no ranking.
+"""
+import heapq
+import math
+from decimal import Decimal
+
+from materiais.precos import catalogo
+from .precificacao import _dinheiro, _lados_cor
+from .utils import calcular_imposicao_cache
+
+
+def _cabe(papel, impressora):
+    return (
+        (papel.largura_mm <= impressora.largura_max_mm and papel.altura_mm <= impressora.altura_max_mm)
+        or (papel.altura_mm <= impressora.largura_max_mm and papel.largura_mm <= impressora.altura_max_mm)
+    )
+
+
+def melhores_combinacoes(largura_final, altura_final, sangria, cor_impressao, quantidade,
+                         paginas=1, limite=10, gramatura=None, margem_papel=5):
+    """
+    As 'limite' combinações mais baratas, da mais barata para a mais cara.
+
+    Cada uma é um dicionário com papel e impressora (tuplas do catálogo),
+    itens_por_folha, folhas e os custos em Decimal (papel, click, total, unitário).
+    'gramatura' (g/m²) restringe os papéis a essa gramatura.
+    """
+    corte_w = float(largura_final) + float(sangria) * 2
+    corte_h = float(altura_final) + float(sangria) * 2
+    pecas = int(quantidade) * int(paginas)
+    if corte_w <= 0 or corte_h <= 0 or pecas <= 0 or limite <= 0:
+        return []
+
+    lados = _lados_cor(cor_impressao)
+    impressoras = sorted(
+        ((sum(imp.click_color if cores > 1 else imp.click_mono for cores in lados), imp)
+         for imp in catalogo.impressoras()),
+        key=lambda par: (par[0], par[1].pk),
+    )
+
+    # Imposição e impressoras compatíveis dependem só do formato do papel
+    por_formato = {}
+    candidatos = []
+    for papel in catalogo.papeis():
+        if gramatura is not None and papel.gramatura_g != gramatura:
+            continue
+        formato = (papel.largura_mm, papel.altura_mm)
+        if formato not in por_formato:
+            imposicao = calcular_imposicao_cache(papel.largura_mm, papel.altura_mm, corte_w, corte_h, margem_papel)
+            compativeis = [par for par in impressoras if _cabe(papel, par[1])][:limite]
+            por_formato[formato] = (imposicao['total'] if imposicao else 0, compativeis)
+        itens_por_folha, compativeis = por_formato[formato]
+        if not itens_por_folha:
+            continue
+
+        folhas = math.ceil(pecas / itens_por_folha)
+        custo_papel = folhas * papel.preco_folha
+        for click, impressora in compativeis:
+            candidatos.append((custo_papel + folhas * click, -itens_por_folha, papel.pk, impressora.pk,
+                               papel, impressora, itens_por_folha, folhas, click))
+
+    resultado = []
+    for total, _, _, _, papel, impressora, itens_por_folha, folhas, click in heapq.nsmallest(limite, candidatos):
+        custo_papel = Decimal(repr(papel.preco_folha)) * folhas
+        custo_click = Decimal(repr(click)) * folhas
+        resultado.append({
+            'papel': papel,
+            'impressora': impressora,
+            'itens_por_folha': itens_por_folha,
+            'folhas': folhas,
+            'custo_papel': _dinheiro(custo_papel),
+            'custo_click': _dinheiro(custo_click),
+            'custo_total': _dinheiro(custo_papel + custo_click),
+            'custo_unitario': _dinheiro((custo_papel + custo_click) / int(quantidade)),
+        })
+    return resultado
@@ -0,0 +1,85 @@
+"""
+Chave normalizada de CPF/CNPJ dos clientes.
+
+Cliente.documento guarda o que foi digitado ("123.456.789-00"); a coluna
+documento_normalizado guarda só letras/dígitos em maiúsculas ("12345678900"),
+tem índice único e é por ela que se faz upsert e busca exata.
+Letras são mantidas por causa do CNPJ alfanumérico.
+"""
+import re
+
+from django.db.models import Case, When, Value
+
+
+def normalizar_documento(valor):
+    """'123.456.789-00' -> '12345678900'; None se não sobrar nada."""
+    normalizado = re.sub(r'[^0-9A-Za-z]', '', valor or '').upper()
+    return normalizado or None
+
+
+def parece_documento(texto):
+    """True se o texto digitado é um CPF/CNPJ (11+ dígitos, só com pontuação de máscara)."""
+    texto = (texto or '').strip()
+    return bool(texto) and not re.search(r'[^\d.\-/\s]', texto) and len(re.sub(r'\D', '', texto)) >= 11
+
+
+# Campos copiados dos duplicados para o cliente mantido quando estiverem vazios nele
+CAMPOS_COMPLEMENTARES = ('nome_fantasia', 'telefone', 'email')
+
+
+def mesclar_duplicados(cliente_model, orcamento_model, dry_run=False, tamanho_bloco=500, using='default'):
+    """
+    Preenche documento_normalizado de todos os clientes e mescla os que
+    compartilham a mesma chave: fica o cadastro mais antigo, os orçamentos
+    dos outros passam para ele e os duplicados são apagados.
+
+    Recebe as classes de modelo (e o banco) para poder rodar também dentro de migrações.
+    Retorna (mantidos, removidos): clientes atualizados e ids apagados.
+    """
+    campos = ('id', 'nome', 'documento', 'documento_normalizado') + CAMPOS_COMPLEMENTARES
+    grupos = {}
+    atualizar = {}  # id -> cliente com alteração a gravar
+    for cliente in cliente_model.objects.using(using).only(*campos).order_by('id').iterator(chunk_size=2000):
+        chave = normalizar_documento(cliente.documento)
+        if chave is None:
+            if cliente.documento_normalizado is not None:
+                cliente.documento_normalizado = None
+                atualizar[cliente.pk] = cliente
+            continue
+        grupo = grupos.setdefault(chave, [])
+        grupo.append(cliente)
+        if len(grupo) == 1 and cliente.documento_normalizado != chave:
+            cliente.documento_normalizado = chave
+            atualizar[cliente.pk] = cliente
+
+    destino = {}  # id do duplicado -> id do cliente mantido
+    for chave, grupo in grupos.items():
+        mantido = grupo[0]
+        if len(grupo) == 1:
+            continue
+        # Dados mais recentes primeiro: completam os campos vazios do mantido
+        for duplicado in reversed(grupo[1:]):
+            destino[duplicado.pk] = mantido.pk
+            for campo in CAMPOS_COMPLEMENTARES:
+                if not getattr(mantido, campo) and getattr(duplicado, campo):
+                    setattr(mantido, campo, getattr(duplicado, campo))
+        atualizar[mantido.pk] = mantido
+
+    atualizar = list(atualizar.values())
+    if dry_run:
+        return atualizar, list(destino)
+
+    # Orçamentos: um UPDATE com CASE por bloco de duplicados
+    ids = list(destino)
+    for inicio in range(0, len(ids), tamanho_bloco):
+        bloco = ids[inicio:inicio + tamanho_bloco]
+        orcamento_model.objects.using(using).filter(cliente_id__in=bloco).update(
+            cliente_id=Case(*[When(cliente_id=i, then=Value(destino[i])) for i in bloco])
+        )
+    # Apaga antes de gravar as chaves, para não violar o índice único
+    for inicio in range(0, len(ids), tamanho_bloco):
+        cliente_model.objects.using(using).filter(pk__in=ids[inicio:inicio + tamanho_bloco]).delete()
+    cliente_model.objects.using(using).bulk_update(
+        atualizar, ('documento_normalizado',) + CAMPOS_COMPLEMENTARES, batch_size=tamanho_bloco
+    )
+    return atualizar, ids
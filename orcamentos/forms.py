@@ -41,6 +41,15 @@ class ClienteForm(forms.ModelForm):
             'email': forms.EmailInput(attrs={'class': INPUT_CLASS, 'placeholder': 'contato@email.com'}),
         }
 
+    def validate_unique(self):
+        # Documento já cadastrado não é erro nesta tela: NovoOrcamentoView faz upsert pela chave normalizada
+        exclude = self._get_validation_exclusions()
+        exclude.add('documento')
+        try:
+            self.instance.validate_unique(exclude=exclude)
+        except forms.ValidationError as e:
+            self._update_errors(e)
+
 class ItemOrcamentoForm(forms.ModelForm):
     # Campo extra para quantidades
     quantidades_input = forms.CharField(
@@ -86,6 +95,14 @@ class ItemOrcamentoForm(forms.ModelForm):
             'paginas': forms.NumberInput(attrs={'class': INPUT_CLASS}),
         }
 
+    def clean_quantidades_input(self):
+        # "100, 500, 1000" -> [100, 500, 1000] (usado por precificacao.calcular_tiragens)
+        texto = self.cleaned_data['quantidades_input']
+        partes = [p.strip().replace('.', '') for p in texto.replace(';', ',').split(',') if p.strip()]
+        if not partes or not all(p.isdigit() and int(p) > 0 for p in partes):
+            raise forms.ValidationError("Informe quantidades inteiras separadas por vírgula. Ex: 100, 500, 1000")
+        return sorted({int(p) for p in partes})
+
 class ConfiguracaoGlobalForm(forms.ModelForm):
     class Meta:
         model = ConfiguracaoGlobal
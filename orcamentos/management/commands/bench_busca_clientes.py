@@ -0,0 +1,97 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from orcamentos.busca import buscar_clientes, filtrar_clientes, reindexar_todos
+from orcamentos.models import Cliente
+
+NOMES = ['Ana', 'João', 'Maria', 'José', 'Carlos', 'Fernanda', 'Paulo', 'Juliana', 'Marcos', 'Patrícia']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Rodrigues', 'Almeida', 'Gomes']
+RAMOS = ['Gráfica', 'Papelaria', 'Comércio', 'Distribuidora', 'Eventos', 'Restaurante', 'Clínica', 'Escola']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a latência da busca de clientes (índice full-text x icontains) com N clientes "
+        "sintéticos. Tudo roda numa transação desfeita no final: nada fica gravado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=100_000)
+        parser.add_argument('--repeticoes', type=int, default=50)
+
+    def medir(self, funcao, termos, repeticoes):
+        tempos = []
+        for i in range(repeticoes):
+            termo = termos[i % len(termos)]
+            inicio = time.perf_counter()
+            funcao(termo)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        tempos.sort()
+        return statistics.median(tempos), tempos[int(len(tempos) * 0.95) - 1]
+
+    def handle(self, *args, **options):
+        total = options['clientes']
+        repeticoes = options['repeticoes']
+        rnd = random.Random(42)
+
+        try:
+            with transaction.atomic():
+                self.stdout.write(f"Gerando {total} clientes...")
+                lote = []
+                for i in range(total):
+                    nome = f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)}"
+                    lote.append(Cliente(
+                        tipo=rnd.choice(['PF', 'PJ']),
+                        nome=nome,
+                        nome_fantasia=f"{rnd.choice(RAMOS)} {rnd.choice(SOBRENOMES)} {i}",
+                        documento=f"{rnd.randrange(10**10, 10**11)}",
+                        telefone="(11) 99999-0000",
+                        email=f"cliente{i}@exemplo.com.br",
+                    ))
+                    if len(lote) == 5000:
+                        Cliente.objects.bulk_create(lote)
+                        lote = []
+                Cliente.objects.bulk_create(lote)
+                reindexar_todos()
+
+                termos = ['mar', 'silva', 'graf', 'jose sou', 'cliente123', 'oliv costa', 'escola alm']
+
+                def antigo_autocomplete(termo):
+                    list(Cliente.objects.filter(nome__icontains=termo)[:5])
+
+                def novo_autocomplete(termo):
+                    buscar_clientes(termo, limite=5)
+
+                def antigo_lista(termo):
+                    qs = Cliente.objects.filter(
+                        Q(nome__icontains=termo) | Q(documento__icontains=termo) | Q(email__icontains=termo)
+                    )
+                    qs.count()
+                    list(qs.order_by('-id')[:20])
+
+                def novo_lista(termo):
+                    qs = filtrar_clientes(Cliente.objects.all(), termo)
+                    qs.count()
+                    list(qs.order_by('-id')[:20])
+
+                for rotulo, funcao in [
+                    ("buscar_cliente (icontains)", antigo_autocomplete),
+                    ("buscar_cliente (FTS5)", novo_autocomplete),
+                    ("lista + count (icontains)", antigo_lista),
+                    ("lista + count (FTS5)", novo_lista),
+                ]:
+                    p50, p95 = self.medir(funcao, termos, repeticoes)
+                    self.stdout.write(f"{rotulo:<30} p50 {p50:8.2f} ms   p95 {p95:8.2f} ms")
+
+                raise Rollback
+        except Rollback:
+            pass
@@ -0,0 +1,245 @@
+import asyncio
+import io
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlencode
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from materiais.models import Papel
+from orcamentos import benchmark
+from orcamentos.models import Cliente
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(int(len(valores) * p), len(valores) - 1)]
+
+
+# ------------------------------------------------------------------
+# CHAMADAS DIRETAS AOS HANDLERS (sem socket, o mesmo caminho do servidor)
+# ------------------------------------------------------------------
+def _pedido_wsgi(app, caminho, query):
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': caminho, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'localhost', 'HTTP_HX_REQUEST': 'true',
+        'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+        'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    status = []
+    resposta = app(environ, lambda s, headers, exc_info=None: status.append(s))
+    try:
+        b''.join(resposta)
+    finally:
+        resposta.close()  # dispara request_finished, como o servidor WSGI
+    return int(status[0].split()[0])
+
+
+async def _pedido_asgi(app, caminho, query):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': caminho, 'raw_path': caminho.encode(), 'root_path': '',
+        'query_string': query.encode(), 'client': ('127.0.0.1', 50000), 'server': ('localhost', 80),
+        'headers': [(b'host', b'localhost'), (b'hx-request', b'true')],
+    }
+    fim = asyncio.Event()
+    lido = False
+    status = []
+
+    async def receive():
+        nonlocal lido
+        if not lido:
+            lido = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await fim.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(mensagem):
+        if mensagem['type'] == 'http.response.start':
+            status.append(mensagem['status'])
+        elif not mensagem.get('more_body'):
+            fim.set()
+
+    await app(scope, receive, send)
+    fim.set()
+    return status[0]
+
+
+class Command(BaseCommand):
+    help = (
+        "Teste de carga dos endpoints HTMX disparados a cada tecla (busca de cliente e "
+        "aproveitamento): N usuários digitando ao mesmo tempo contra UM worker, servido "
+        "por WSGI (threads) e por ASGI (core.asgi). Usa um banco temporário com base sintética."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', type=float, default=0.1, help="Escala da base sintética (0.1 = 10k clientes).")
+        parser.add_argument('--usuarios', type=int, nargs='+', default=[5, 20, 50])
+        parser.add_argument('--teclas', type=int, default=12, help="Teclas digitadas por usuário.")
+        parser.add_argument('--intervalo-ms', type=float, default=150, help="Intervalo entre teclas de um usuário.")
+        parser.add_argument('--threads', type=int, default=1, help="Threads do worker WSGI (gunicorn sync = 1).")
+        parser.add_argument('--modos', nargs='+', choices=['wsgi', 'asgi'], default=['wsgi', 'asgi'])
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as pasta:
+            # Banco em arquivo (WAL, como em produção): as threads dos workers precisam ver os dados
+            connection.settings_dict['TEST']['NAME'] = str(Path(pasta) / 'bench_htmx.sqlite3')
+            nome_original = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                # Sem log de request lento: a fila proposital do teste inundaria o console
+                with override_settings(ALLOWED_HOSTS=['*'], DESEMPENHO={'ATIVO': True, 'LIMITE_LENTO_MS': 10**9}):
+                    self._executar(options)
+            finally:
+                connection.creation.destroy_test_db(nome_original, verbosity=0)
+
+    def _executar(self, options):
+        inicio = time.perf_counter()
+        benchmark.gerar_dados(options['escala'], log=self.stdout.write)
+        self.stdout.write(f"Base gerada em {time.perf_counter() - inicio:.1f}s.\n")
+
+        rnd = random.Random(42)
+        nomes = list(Cliente.objects.values_list('nome', flat=True)[:500])
+        papeis = list(Papel.objects.values_list('pk', flat=True)[:200])
+        url_busca = reverse('orcamentos:buscar_cliente')
+        url_aproveitamento = reverse('orcamentos:htmx_aproveitamento')
+
+        def teclas_de_um_usuario():
+            # Metade digitando o nome de um cliente, metade mexendo nas medidas do item
+            nome = rnd.choice(nomes)
+            papel = rnd.choice(papeis)
+            pedidos = []
+            for i in range(options['teclas']):
+                if i % 2 == 0:
+                    pedidos.append((url_busca, urlencode({'q': nome[:3 + i // 2]})))
+                else:
+                    pedidos.append((url_aproveitamento, urlencode({
+                        'item-papel': papel, 'item-largura_final_mm': rnd.randint(40, 300),
+                        'item-altura_final_mm': rnd.randint(30, 400), 'item-sangria_mm': 3,
+                    })))
+            return pedidos
+
+        resultados = []
+        for usuarios in options['usuarios']:
+            intervalo = options['intervalo_ms'] / 1000
+            plano = []
+            for _ in range(usuarios):
+                deslocamento = rnd.uniform(0, intervalo)
+                plano.extend(
+                    (deslocamento + i * intervalo, caminho, query)
+                    for i, (caminho, query) in enumerate(teclas_de_um_usuario())
+                )
+            plano.sort()
+            for modo in options['modos']:
+                if modo == 'wsgi':
+                    r = self._rodar_wsgi(plano, options['threads'])
+                else:
+                    r = self._rodar_asgi(plano)
+                r.update(modo=modo, usuarios=usuarios)
+                resultados.append(r)
+                self.stdout.write(
+                    f"{usuarios:4d} usuários  {modo:<5} {r['pedidos'] / r['segundos']:7.0f} req/s  "
+                    f"p50 {r['p50']:7.1f} ms  p95 {r['p95']:7.1f} ms  máx {r['max']:7.1f} ms  "
+                    f"simultâneos {r['em_voo']:3d}  erros {r['erros']}"
+                )
+
+        self._resumo(resultados, options['intervalo_ms'])
+
+    # --------------------------------------------------------------
+    # Os dois modos recebem o mesmo plano: (segundo de chegada, caminho, query).
+    # A latência conta da chegada da tecla até a resposta, incluindo a fila do worker.
+    # --------------------------------------------------------------
+    def _rodar_wsgi(self, plano, threads):
+        app = WSGIHandler()
+        for _, caminho, query in plano[:2]:
+            _pedido_wsgi(app, caminho, query)  # aquece middlewares e templates
+
+        lock = threading.Lock()
+        latencias, erros, em_voo = [], [0], [0, 0]
+
+        def atender(chegada, caminho, query):
+            with lock:
+                em_voo[0] += 1
+                em_voo[1] = max(em_voo[1], em_voo[0])
+            status = _pedido_wsgi(app, caminho, query)
+            with lock:
+                em_voo[0] -= 1
+                latencias.append((time.perf_counter() - chegada) * 1000)
+                erros[0] += status != 200
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as worker:
+            for deslocamento, caminho, query in plano:
+                espera = inicio + deslocamento - time.perf_counter()
+                if espera > 0:
+                    time.sleep(espera)
+                worker.submit(atender, inicio + deslocamento, caminho, query)
+        return self._estatisticas(latencias, erros[0], em_voo[1], time.perf_counter() - inicio)
+
+    def _rodar_asgi(self, plano):
+        app = ASGIHandler()
+        # Como em core.asgi: sem conexão persistente (cada request usa uma thread própria)
+        max_age = connection.settings_dict['CONN_MAX_AGE']
+        connection.settings_dict['CONN_MAX_AGE'] = 0
+        try:
+            return asyncio.run(self._rodar_asgi_loop(app, plano))
+        finally:
+            connection.settings_dict['CONN_MAX_AGE'] = max_age
+
+    async def _rodar_asgi_loop(self, app, plano):
+        for _, caminho, query in plano[:2]:
+            await _pedido_asgi(app, caminho, query)
+
+        latencias, erros, em_voo = [], [0], [0, 0]
+
+        async def atender(chegada, caminho, query):
+            em_voo[0] += 1
+            em_voo[1] = max(em_voo[1], em_voo[0])
+            status = await _pedido_asgi(app, caminho, query)
+            em_voo[0] -= 1
+            latencias.append((time.perf_counter() - chegada) * 1000)
+            erros[0] += status != 200
+
+        inicio = time.perf_counter()
+        tarefas = []
+        for deslocamento, caminho, query in plano:
+            espera = inicio + deslocamento - time.perf_counter()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            tarefas.append(asyncio.create_task(atender(inicio + deslocamento, caminho, query)))
+        await asyncio.gather(*tarefas)
+        return self._estatisticas(latencias, erros[0], em_voo[1], time.perf_counter() - inicio)
+
+    @staticmethod
+    def _estatisticas(latencias, erros, em_voo, segundos):
+        return {
+            'pedidos': len(latencias),
+            'erros': erros,
+            'segundos': segundos,
+            'p50': _percentil(latencias, 0.50),
+            'p95': _percentil(latencias, 0.95),
+            'max': max(latencias, default=0.0),
+            'em_voo': em_voo,
+        }
+
+    def _resumo(self, resultados, intervalo_ms):
+        # "Aguenta" = p95 abaixo do intervalo entre teclas (a resposta chega antes da próxima tecla)
+        self.stdout.write(f"\nUsuários digitando com p95 < {intervalo_ms:.0f} ms, por worker:")
+        for modo in ('wsgi', 'asgi'):
+            do_modo = [r for r in resultados if r['modo'] == modo]
+            if not do_modo:
+                continue
+            atendidos = [r['usuarios'] for r in do_modo if r['p95'] < intervalo_ms]
+            self.stdout.write(f"  {modo}: {max(atendidos) if atendidos else 'nenhum dos testados'}")
@@ -0,0 +1,78 @@
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from orcamentos import benchmark
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera uma base sintética e mede os caminhos quentes (imposição, views HTMX, busca de "
+        "clientes, changelists do admin, saves de estoque/toner). Tudo roda numa transação "
+        "desfeita no final; o resultado pode ser salvo em JSON e comparado com uma execução anterior."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--escala', type=float, default=1.0,
+            help="Multiplicador dos volumes da base (1.0 = 100k clientes, 200k compras...).",
+        )
+        parser.add_argument('--repeticoes', type=int, default=30)
+        parser.add_argument(
+            '--cenarios', nargs='+',
+            help=f"Prefixos dos cenários a rodar. Disponíveis: {', '.join(benchmark.CENARIOS)}",
+        )
+        parser.add_argument('--saida', help="Grava o resultado neste arquivo JSON.")
+        parser.add_argument('--comparar', help="JSON de uma execução anterior para comparar o p50.")
+        parser.add_argument(
+            '--tolerancia', type=float, default=0.10,
+            help="Variação do p50 acima da qual o cenário é marcado como regressão (padrão 10%%).",
+        )
+
+    def handle(self, *args, **options):
+        anterior = None
+        if options['comparar']:
+            caminho = Path(options['comparar'])
+            if not caminho.exists():
+                raise CommandError(f"Arquivo não encontrado: {caminho}")
+            anterior = json.loads(caminho.read_text(encoding='utf-8'))
+
+        try:
+            # O cliente HTTP de teste usa o host 'testserver'
+            with override_settings(ALLOWED_HOSTS=['*']), transaction.atomic():
+                inicio = time.perf_counter()
+                contagens = benchmark.gerar_dados(options['escala'], log=self.stdout.write)
+                self.stdout.write(f"Base gerada em {time.perf_counter() - inicio:.1f}s.\n")
+                resultado = benchmark.rodar(
+                    options['cenarios'], options['repeticoes'], contagens, log=self.stdout.write
+                )
+                raise Rollback
+        except Rollback:
+            pass
+
+        if options['saida']:
+            Path(options['saida']).write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding='utf-8')
+            self.stdout.write(f"\nResultado salvo em {options['saida']}")
+
+        if anterior:
+            self.stdout.write(f"\nComparação com {options['comparar']} (p50):")
+            regressoes = 0
+            for nome, antes, agora, variacao, regressao in benchmark.comparar(
+                anterior, resultado, options['tolerancia']
+            ):
+                linha = f"{nome:<36} {antes:9.2f} -> {agora:9.2f} ms  ({variacao:+.0%})"
+                if regressao:
+                    regressoes += 1
+                    self.stdout.write(self.style.ERROR(linha + "  REGRESSÃO"))
+                else:
+                    self.stdout.write(linha)
+            if regressoes:
+                raise CommandError(f"{regressoes} cenário(s) mais lento(s) que a tolerância.")
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from materiais.kpi import invalidar_kpi
+from orcamentos import busca
+from orcamentos.documentos import mesclar_duplicados
+from orcamentos.models import Cliente, Orcamento
+
+
+class Command(BaseCommand):
+    help = (
+        "Preenche o documento normalizado de todos os clientes e mescla os cadastros "
+        "duplicados pelo mesmo CPF/CNPJ (os orçamentos passam para o cadastro mais antigo)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Apenas relata, sem gravar nada.")
+        parser.add_argument('--bloco', type=int, default=500, help="Registros por UPDATE/DELETE.")
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        with transaction.atomic():
+            mantidos, removidos = mesclar_duplicados(
+                Cliente, Orcamento, dry_run=dry_run, tamanho_bloco=options['bloco']
+            )
+            if not dry_run and mantidos:
+                # bulk_update não dispara signals: atualiza o índice full-text aqui
+                busca.indexar_clientes(mantidos)
+                transaction.on_commit(lambda: invalidar_kpi('cliente'))
+
+        if not mantidos and not removidos:
+            self.stdout.write(self.style.SUCCESS("Nada a fazer: documentos já normalizados e sem duplicados."))
+        elif dry_run:
+            self.stdout.write(
+                f"{len(mantidos)} cliente(s) a atualizar, {len(removidos)} duplicado(s) a mesclar "
+                f"(nada foi gravado)."
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"{len(mantidos)} cliente(s) atualizado(s), {len(removidos)} duplicado(s) mesclado(s)."
+            ))
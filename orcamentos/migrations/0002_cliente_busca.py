@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-18 13:05
+
+from django.db import migrations
+
+TABELA = 'orcamentos_cliente_busca'
+
+
+def criar_indice(apps, schema_editor):
+    # Índice full-text só existe no SQLite (FTS5); outros bancos usam icontains
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA} USING fts5("
+        "nome, nome_fantasia, documento, email, "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    schema_editor.execute(
+        f"INSERT INTO {TABELA} (rowid, nome, nome_fantasia, documento, email) "
+        "SELECT id, nome, COALESCE(nome_fantasia, ''), COALESCE(documento, ''), COALESCE(email, '') "
+        "FROM orcamentos_cliente"
+    )
+
+
+def remover_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {TABELA}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orcamentos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2 on 2026-10-18 15:20
+
+import re
+
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+# Cópia da regra de orcamentos.documentos na data desta migração: a migração não
+# pode mudar de comportamento se o código do app mudar depois
+CAMPOS_COMPLEMENTARES = ('nome_fantasia', 'telefone', 'email')
+TAMANHO_BLOCO = 500
+
+
+def normalizar_documento(valor):
+    return re.sub(r'[^0-9A-Za-z]', '', valor or '').upper() or None
+
+
+def mesclar_duplicados(Cliente, Orcamento, using):
+    """Preenche a chave e mescla os clientes com o mesmo documento no cadastro mais antigo."""
+    campos = ('id', 'nome', 'documento', 'documento_normalizado') + CAMPOS_COMPLEMENTARES
+    grupos = {}
+    atualizar = {}
+    for cliente in Cliente.objects.using(using).only(*campos).order_by('id').iterator(chunk_size=2000):
+        chave = normalizar_documento(cliente.documento)
+        if chave is None:
+            continue
+        grupo = grupos.setdefault(chave, [])
+        grupo.append(cliente)
+        if len(grupo) == 1:
+            cliente.documento_normalizado = chave
+            atualizar[cliente.pk] = cliente
+
+    destino = {}
+    for grupo in grupos.values():
+        mantido = grupo[0]
+        for duplicado in reversed(grupo[1:]):
+            destino[duplicado.pk] = mantido.pk
+            for campo in CAMPOS_COMPLEMENTARES:
+                if not getattr(mantido, campo) and getattr(duplicado, campo):
+                    setattr(mantido, campo, getattr(duplicado, campo))
+
+    ids = list(destino)
+    for inicio in range(0, len(ids), TAMANHO_BLOCO):
+        bloco = ids[inicio:inicio + TAMANHO_BLOCO]
+        Orcamento.objects.using(using).filter(cliente_id__in=bloco).update(
+            cliente_id=Case(*[When(cliente_id=i, then=Value(destino[i])) for i in bloco])
+        )
+        Cliente.objects.using(using).filter(pk__in=bloco).delete()
+    Cliente.objects.using(using).bulk_update(
+        list(atualizar.values()), ('documento_normalizado',) + CAMPOS_COMPLEMENTARES, batch_size=TAMANHO_BLOCO
+    )
+
+
+def preencher_e_mesclar(apps, schema_editor):
+    Cliente = apps.get_model('orcamentos', 'Cliente')
+    Orcamento = apps.get_model('orcamentos', 'Orcamento')
+    mesclar_duplicados(Cliente, Orcamento, schema_editor.connection.alias)
+    # Tira do índice full-text os clientes apagados na mescla
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            "DELETE FROM orcamentos_cliente_busca WHERE rowid NOT IN (SELECT id FROM orcamentos_cliente)"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orcamentos', '0002_cliente_busca'),
+    ]
+
+    operations = [
+        # Sem unique até preencher e mesclar os duplicados já existentes
+        migrations.AddField(
+            model_name='cliente',
+            name='documento_normalizado',
+            field=models.CharField(blank=True, editable=False, max_length=20, null=True),
+        ),
+        migrations.RunPython(preencher_e_mesclar, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='cliente',
+            name='documento_normalizado',
+            field=models.CharField(blank=True, editable=False, max_length=20, null=True, unique=True),
+        ),
+    ]
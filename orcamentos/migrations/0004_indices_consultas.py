@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 17:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orcamentos', '0003_cliente_documento_normalizado'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='orcamento',
+            index=models.Index(fields=['status', 'data_criacao'], name='orcamentos__status_93e626_idx'),
+        ),
+    ]
@@ -1,7 +1,13 @@
-from django.db import models
+import copy
+import threading
+import time
+
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from core.versoes import cache_versoes
 from materiais.models import Papel, Impressora, Acabamento, Insumo
+from .documentos import normalizar_documento
 
 # ==========================================
 # 0. CONFIGURAÇÕES GLOBAIS (Singleton)
@@ -18,6 +24,12 @@ class ConfiguracaoGlobal(models.Model):
     # Layout
     logo_empresa = models.ImageField(upload_to='config/', blank=True, null=True)
 
+    # Cópia em memória do processo, validada pela versão no cache compartilhado (core.versoes)
+    CHAVE_VERSAO = 'configuracao_global:versao'
+    INTERVALO_VERSAO = 1.0  # segundos entre conferências: atraso máximo para ver o save de outro worker
+    _em_memoria = None  # (versão, instância ou None, monotonic da conferência)
+    _lock = threading.Lock()
+
     class Meta:
         verbose_name = "Configuração Global"
         verbose_name_plural = "Configurações Globais"
@@ -26,7 +38,57 @@ class ConfiguracaoGlobal(models.Model):
         # Garante que só exista 1 registro
         if not self.pk and ConfiguracaoGlobal.objects.exists():
             raise ValidationError('Só pode haver uma configuração global.')
-        return super(ConfiguracaoGlobal, self).save(*args, **kwargs)
+        resultado = super(ConfiguracaoGlobal, self).save(*args, **kwargs)
+        transaction.on_commit(ConfiguracaoGlobal.invalidar_cache)
+        return resultado
+
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        transaction.on_commit(ConfiguracaoGlobal.invalidar_cache)
+        return resultado
+
+    @classmethod
+    def atual(cls):
+        """
+        A configuração vigente, sem reler a linha enquanto ninguém salvar outra
+        (None se ainda não existir). Devolve uma cópia: pode ser alterada à vontade.
+
+        A linha em si só é lida quando a versão muda. A versão é conferida no
+        máximo uma vez por INTERVALO_VERSAO; com o cache 'versoes' padrão
+        (DatabaseCache, o único backend compartilhado sem serviço extra) essa
+        conferência é um SELECT por segundo por worker. Dentro do intervalo,
+        criar um orçamento não faz consulta nenhuma para a configuração.
+        Apontar CACHES['versoes'] para Redis/Memcached tira o banco também disso.
+        """
+        em_memoria = cls._em_memoria
+        agora = time.monotonic()
+        if em_memoria is None or agora - em_memoria[2] >= cls.INTERVALO_VERSAO:
+            versao = cache_versoes.get(cls.CHAVE_VERSAO)
+            with cls._lock:
+                em_memoria = cls._em_memoria
+                if em_memoria is None or em_memoria[0] != versao:
+                    # Versão lida antes da consulta: um save no meio força nova leitura
+                    em_memoria = (versao, cls.objects.first(), agora)
+                else:
+                    em_memoria = (versao, em_memoria[1], agora)
+                cls._em_memoria = em_memoria
+        config = em_memoria[1]
+        return copy.copy(config) if config is not None else None
+
+    @classmethod
+    def carregar(cls):
+        """Como atual(), mas cria o registro padrão (pk=1) se ainda não houver nenhum."""
+        config = cls.atual()
+        if config is None:
+            config, _ = cls.objects.get_or_create(pk=1)
+        return config
+
+    @classmethod
+    def invalidar_cache(cls):
+        # Nova versão no cache compartilhado: todos os workers releem no próximo acesso
+        cache_versoes.set(cls.CHAVE_VERSAO, time.time_ns(), None)
+        with cls._lock:
+            cls._em_memoria = None
 
     def __str__(self):
         return "Configurações do Sistema"
@@ -41,10 +103,29 @@ class Cliente(models.Model):
     nome = models.CharField(max_length=150, verbose_name="Nome / Razão Social")
     nome_fantasia = models.CharField(max_length=150, blank=True, null=True)
     documento = models.CharField(max_length=20, blank=True, null=True, verbose_name="CPF/CNPJ")
+    # Só letras/dígitos do documento (ver orcamentos.documentos); chave única para upsert e busca exata
+    documento_normalizado = models.CharField(max_length=20, unique=True, null=True, blank=True, editable=False)
     telefone = models.CharField(max_length=20, verbose_name="Telefone/Celular")
     email = models.EmailField(blank=True, null=True)
     data_cadastro = models.DateTimeField(auto_now_add=True)
 
+    def save(self, *args, **kwargs):
+        self.documento_normalizado = normalizar_documento(self.documento)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'documento' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'documento_normalizado'}
+        super().save(*args, **kwargs)
+
+    def validate_unique(self, exclude=None):
+        super().validate_unique(exclude)
+        # documento_normalizado não é editável, então o ModelForm não confere a unicidade dele:
+        # a checagem vai para o campo digitado, antes que o índice único vire IntegrityError
+        if exclude and 'documento' in exclude:
+            return
+        chave = normalizar_documento(self.documento)
+        if chave and Cliente.objects.filter(documento_normalizado=chave).exclude(pk=self.pk).exists():
+            raise ValidationError({'documento': "Já existe um cliente com este CPF/CNPJ."})
+
     def __str__(self):
         return self.nome
 
@@ -89,9 +170,13 @@ class Orcamento(models.Model):
     percentual_comissao = models.DecimalField(max_digits=5, decimal_places=2, default=0)
     percentual_cartao = models.DecimalField(max_digits=5, decimal_places=2, default=0)
 
+    class Meta:
+        # Listagens por status em ordem de data (admin, painel)
+        indexes = [models.Index(fields=['status', 'data_criacao'])]
+
     def save(self, *args, **kwargs):
         if not self.pk:
-            config = ConfiguracaoGlobal.objects.first()
+            config = ConfiguracaoGlobal.atual()
             if config:
                 self.percentual_imposto = config.imposto_padrao
                 self.percentual_comissao = config.comissao_padrao
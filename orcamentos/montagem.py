@@ -0,0 +1,325 @@
+"""
+Montagem (gang run): vários trabalhos do mesmo papel e impressora na mesma folha.
+
+A imposição de utils.py repete UMA peça na folha. Aqui cada peça tem sua
+quantidade e a saída é uma lista de "folhas montadas": um layout (blocos em
+grade de peças diferentes) e quantas cópias dele imprimir. O objetivo é o
+menor total de folhas e, entre layouts equivalentes, menos cortes.
+
+Heurística sequencial (a mesma ideia do SHP usado em corte de bobinas/chapas):
+
+1. Com a demanda restante, estima quantas folhas R seriam necessárias se a
+   área fosse 100% aproveitada e monta layouts pedindo ceil(restante / R)
+   peças de cada trabalho (para vários R), em blocos de grade com cortes de
+   guilhotina, sobrando espaço preenchido com quem mais falta.
+2. Para cada layout escolhe a quantidade de cópias que desperdiça menos
+   (peças que sobram contam como perda) e fica com o melhor layout.
+3. Desconta o que foi produzido e repete até zerar a demanda. Cada rodada
+   termina pelo menos um trabalho.
+
+No fim compara com imprimir cada trabalho sozinho (melhor_imposicao) e
+devolve o que gastar menos folhas.
+"""
+import math
+from collections import namedtuple
+from functools import lru_cache
+
+from .utils import _melhor_layout_area, _montar_resultado, melhor_imposicao
+
+# Largura/altura do corte (peça final + sangria dos dois lados), em mm
+Peca = namedtuple('Peca', 'chave largura altura quantidade sangria', defaults=(0,))
+
+# Folhas estimadas (x limite inferior) testadas a cada rodada
+FATORES_R = (1, 1.15, 1.35, 1.7, 2.2, 3, 5)
+
+
+# ------------------------------------------------------------------
+# UMA FOLHA: blocos em grade separados por cortes de guilhotina
+# ------------------------------------------------------------------
+class _Layout:
+    """
+    Área útil livre como lista de retângulos. Cada bloco é colocado no canto de
+    um retângulo livre e a sobra é dividida em dois por um corte de ponta a ponta
+    (guilhotina), então a folha sempre se separa só com cortes retos.
+
+    A calha ('espaco') é somada ao tamanho de cada peça e à área livre, o que
+    dispensa tratar a última peça da fileira à parte.
+    """
+
+    def __init__(self, area_w, area_h, pecas, espaco=0):
+        self.pecas = pecas
+        self.espaco = espaco
+        self.menor_lado = min(min(p.largura, p.altura) for p in pecas) + espaco
+        self.livres = [(0.0, 0.0, area_w + espaco, area_h + espaco)]
+        self.blocos = []
+        self.contagem = {}
+
+    def colocar(self, i, n):
+        """Coloca até n cópias da peça i num bloco. Retorna quantas couberam (0 = nenhuma)."""
+        peca = self.pecas[i]
+        e = self.espaco
+        melhor = None
+        orientacoes = [(peca.largura, peca.altura, 'original')]
+        if peca.largura != peca.altura:
+            orientacoes.append((peca.altura, peca.largura, 'rotacionado'))
+
+        for indice, (x, y, w, h) in enumerate(self.livres):
+            for pw, ph, orientacao in orientacoes:
+                cols_max = int(w // (pw + e))
+                rows_max = int(h // (ph + e))
+                if not cols_max or not rows_max:
+                    continue
+                k = min(n, cols_max * rows_max)
+                # Fileiras com a largura toda do retângulo ou colunas com a altura toda
+                rows = math.ceil(k / cols_max)
+                formatos = {(math.ceil(k / rows), rows)}
+                cols = math.ceil(k / rows_max)
+                formatos.add((cols, math.ceil(k / cols)))
+                for cols, rows in formatos:
+                    bw, bh = cols * (pw + e), rows * (ph + e)
+                    # Mais peças, depois o encaixe mais justo (menor sobra no lado menor)
+                    chave = (k, -min(w - bw, h - bh), -(cols * rows - k), -indice)
+                    if melhor is None or chave > melhor[0]:
+                        melhor = (chave, indice, cols, rows, pw, ph, orientacao)
+
+        if melhor is None:
+            return 0
+        _, indice, cols, rows, pw, ph, orientacao = melhor
+        x, y, w, h = self.livres.pop(indice)
+        bw, bh = cols * (pw + e), rows * (ph + e)
+        self.blocos.append({
+            'x': x, 'y': y, 'cols': cols, 'rows': rows, 'w': pw, 'h': ph,
+            'orientacao': orientacao, 'peca': i,
+        })
+        self.contagem[i] = self.contagem.get(i, 0) + cols * rows
+
+        # Divide a sobra pelo corte que deixa o maior retângulo inteiro
+        horizontal = [(x + bw, y, w - bw, bh), (x, y + bh, w, h - bh)]
+        vertical = [(x + bw, y, w - bw, h), (x, y + bh, bw, h - bh)]
+        maior = max((max(r[2] * r[3] for r in opcao), opcao) for opcao in (horizontal, vertical))[1]
+        self.livres.extend(r for r in maior if min(r[2], r[3]) >= self.menor_lado)
+        return cols * rows
+
+
+def _cortes(blocos, refilar):
+    """
+    Estimativa de cortes de guilhotina para separar e refilar um maço do layout.
+
+    Um corte para separar cada bloco do resto da folha; dentro do bloco, peças
+    vizinhas sem sangria nem calha dividem o corte (cols + 1 + rows + 1), com
+    sangria ou calha cada peça leva dois cortes por eixo (2 * (cols + rows)).
+    'refilar' diz, por índice de peça, se há sangria ou calha.
+    """
+    total = max(len(blocos) - 1, 0)
+    for bloco in blocos:
+        if refilar[bloco['peca']]:
+            total += 2 * (bloco['cols'] + bloco['rows'])
+        else:
+            total += bloco['cols'] + bloco['rows'] + 2
+    return total
+
+
+def _montar_layout(area_w, area_h, pecas, restante, ativos, folhas_estimadas, espaco):
+    layout = _Layout(area_w, area_h, pecas, espaco)
+    alvos = {i: math.ceil(restante[i] / folhas_estimadas) for i in ativos}
+    # Peças maiores primeiro (as pequenas encaixam nas sobras)
+    ordem = sorted(ativos, key=lambda i: (-pecas[i].largura * pecas[i].altura, i))
+    for i in ordem:
+        falta = alvos[i]
+        while falta > 0:
+            colocadas = layout.colocar(i, falta)
+            if not colocadas:
+                break
+            falta -= colocadas
+
+    # Sobra de espaço: mais um bloco do mesmo tamanho para quem mais falta, em rodadas
+    colocou = True
+    while colocou and layout.livres:
+        colocou = False
+        prioridade = sorted(ativos, key=lambda i: (-restante[i] / (layout.contagem.get(i, 0) + 1), i))
+        for i in prioridade:
+            if layout.colocar(i, alvos[i]):
+                colocou = True
+    return layout
+
+
+def _avaliar(contagem, restante, areas, area_util):
+    """(aproveitamento útil, cópias) da melhor quantidade de cópias para um layout."""
+    melhor = (0.0, 0)
+    for copias in {math.ceil(restante[i] / c) for i, c in contagem.items() if restante[i] > 0}:
+        util = sum(min(c * copias, restante[i]) * areas[i] for i, c in contagem.items())
+        chave = (round(util / (copias * area_util), 4), copias)
+        if chave > melhor:
+            melhor = chave
+    return melhor
+
+
+def _layout_unico(area_w, area_h, pecas, i, unica, espaco):
+    """Layout de uma peça só (a mesma grade mista de melhor_imposicao)."""
+    layout = _Layout(area_w, area_h, pecas, espaco)
+    layout.livres = []
+    layout.blocos = [dict(b, peca=i) for b in unica[1]]
+    layout.contagem = {i: unica[0]}
+    return layout
+
+
+# ------------------------------------------------------------------
+# VÁRIAS FOLHAS
+# ------------------------------------------------------------------
+def _resultado_folha(papel_largura, papel_altura, layout, copias, pecas, espaco, refilar, cores):
+    blocos = [dict(b, chave=pecas[b['peca']].chave, cor=cores[b['peca']]) for b in layout.blocos]
+    for bloco in blocos:
+        del bloco['peca']
+    resultado = _montar_resultado(papel_largura, papel_altura, sum(layout.contagem.values()), blocos, espaco)
+    resultado.update(
+        copias=copias,
+        pecas={pecas[i].chave: c for i, c in sorted(layout.contagem.items())},
+        cortes=_cortes(layout.blocos, refilar),
+    )
+    return resultado
+
+
+def cortes_totais(folhas, folhas_por_corte=None):
+    """Cortes por maço x maços de cada layout (um maço por layout sem configuração da guilhotina)."""
+    return sum(
+        f['cortes'] * (math.ceil(f['copias'] / folhas_por_corte) if folhas_por_corte else 1)
+        for f in folhas
+    )
+
+
+def _resumo(folhas, pecas, nao_cabem, folhas_separadas, folhas_por_corte):
+    produzido = {}
+    for folha in folhas:
+        for chave, c in folha['pecas'].items():
+            produzido[chave] = produzido.get(chave, 0) + c * folha['copias']
+    return {
+        'folhas': folhas,
+        'total_folhas': sum(f['copias'] for f in folhas),
+        'cortes': cortes_totais(folhas, folhas_por_corte),
+        'folhas_separadas': folhas_separadas,
+        'sobras': {
+            p.chave: produzido.get(p.chave, 0) - p.quantidade
+            for p in pecas if p.quantidade > 0 and p.chave not in nao_cabem
+        },
+        'nao_cabem': nao_cabem,
+    }
+
+
+def montar_folhas(papel_largura, papel_altura, pecas, margem_papel=5, espaco=0, folhas_por_corte=None):
+    """
+    Distribui várias peças (Peca: chave, corte_w, corte_h, quantidade, sangria) em folhas.
+
+    Retorna um dicionário com 'folhas' (cada uma no formato de melhor_imposicao,
+    mais 'copias', 'pecas' {chave: por folha} e 'cortes' por maço; cada bloco
+    leva 'chave' e 'cor' = posição da peça na entrada), 'total_folhas', 'cortes'
+    (total, com folhas_por_corte da guilhotina), 'folhas_separadas' (imprimindo
+    cada peça sozinha), 'sobras' {chave: excedente} e 'nao_cabem' [chaves].
+    """
+    area_w = papel_largura - margem_papel * 2
+    area_h = papel_altura - margem_papel * 2
+    pecas = [Peca(p.chave, float(p.largura), float(p.altura), int(p.quantidade), float(p.sangria)) for p in pecas]
+
+    # Peças que entram na montagem, a posição delas na entrada e o layout de cada uma sozinha
+    validas, cores, unicas, nao_cabem = [], [], [], []
+    for posicao, p in enumerate(pecas):
+        if p.quantidade <= 0:
+            continue
+        total, blocos = (0, []) if min(area_w, area_h) <= 0 else _melhor_layout_area(
+            area_w, area_h, p.largura, p.altura, espaco
+        )
+        if not total:
+            nao_cabem.append(p.chave)
+            continue
+        validas.append(p)
+        cores.append(posicao)
+        unicas.append((total, blocos))
+    if not validas:
+        return _resumo([], pecas, nao_cabem, 0, folhas_por_corte)
+
+    areas = [p.largura * p.altura for p in validas]
+    refilar = [bool(p.sangria or espaco) for p in validas]
+    area_util = area_w * area_h
+    restante = [p.quantidade for p in validas]
+
+    layouts_escolhidos = []
+    while True:
+        ativos = [i for i, r in enumerate(restante) if r > 0]
+        if not ativos:
+            break
+        limite_inferior = max(1, math.ceil(sum(restante[i] * areas[i] for i in ativos) / area_util))
+        candidatos = sorted({math.ceil(limite_inferior * f) for f in FATORES_R})
+        layouts = [_montar_layout(area_w, area_h, validas, restante, ativos, r, espaco) for r in candidatos]
+        # A grade da peça com mais área pendente, sozinha, também concorre
+        maior = max(ativos, key=lambda i: (restante[i] * areas[i], -i))
+        layouts.append(_layout_unico(area_w, area_h, validas, maior, unicas[maior], espaco))
+
+        escolhido = None
+        for layout in layouts:
+            util, copias = _avaliar(layout.contagem, restante, areas, area_util)
+            chave = (util, copias, -_cortes(layout.blocos, refilar))
+            if copias and (escolhido is None or chave > escolhido[0]):
+                escolhido = (chave, layout, copias)
+        _, layout, copias = escolhido
+
+        for i, c in layout.contagem.items():
+            restante[i] -= c * copias
+        layouts_escolhidos.append((layout, copias))
+
+    separadas = [
+        (_layout_unico(area_w, area_h, validas, i, unica, espaco), math.ceil(p.quantidade / unica[0]))
+        for i, (p, unica) in enumerate(zip(validas, unicas))
+    ]
+    folhas_separadas = sum(copias for _, copias in separadas)
+    if sum(copias for _, copias in layouts_escolhidos) > folhas_separadas:
+        # A montagem não compensou: cada peça na sua própria folha
+        layouts_escolhidos = separadas
+
+    folhas = [
+        _resultado_folha(papel_largura, papel_altura, layout, copias, validas, espaco, refilar, cores)
+        for layout, copias in layouts_escolhidos
+    ]
+    return _resumo(folhas, pecas, nao_cabem, folhas_separadas, folhas_por_corte)
+
+
+@lru_cache(maxsize=128)
+def _montar_folhas_memo(papel_largura, papel_altura, medidas, margem_papel, espaco):
+    pecas = [Peca(i, w, h, q, s) for i, (w, h, q, s) in enumerate(medidas)]
+    return montar_folhas(papel_largura, papel_altura, pecas, margem_papel, espaco)
+
+
+def normalizar_medidas(medidas):
+    # Mesma regra do cache de imposição: 90, 90.0 e Decimal('90.00') dão a mesma chave
+    return tuple((round(float(w), 1), round(float(h), 1), int(q), round(float(s), 1)) for w, h, q, s in medidas)
+
+
+def montar_folhas_cache(papel_largura, papel_altura, medidas, margem_papel=5, espaco=0):
+    """
+    montar_folhas memoizado pela geometria: 'medidas' é uma sequência de
+    (corte_w, corte_h, quantidade, sangria) e as chaves das peças são as posições.
+    Usado pela view e pelo SVG de cada folha, que recalculam a mesma montagem.
+    O resultado é compartilhado: não altere o dicionário.
+    """
+    return _montar_folhas_memo(
+        round(float(papel_largura), 1), round(float(papel_altura), 1),
+        normalizar_medidas(medidas), round(float(margem_papel), 1), round(float(espaco), 1),
+    )
+
+
+def medidas_dos_itens(itens_quantidades):
+    """
+    [(ItemOrcamento, quantidade)] -> [(corte_w, corte_h, peças, sangria)].
+
+    Peças = quantidade x páginas/lâminas do item. Só junta itens do mesmo papel
+    e da mesma impressora (ValueError caso contrário).
+    """
+    itens_quantidades = list(itens_quantidades)
+    if len({(item.papel_id, item.impressora_id) for item, _ in itens_quantidades}) > 1:
+        raise ValueError("A montagem só junta itens do mesmo papel e da mesma impressora.")
+    medidas = []
+    for item, quantidade in itens_quantidades:
+        sangria = item.sangria_mm or 0
+        medidas.append((
+            item.largura_final_mm + sangria * 2, item.altura_final_mm + sangria * 2,
+            int(quantidade) * item.paginas, sangria,
+        ))
+    return medidas
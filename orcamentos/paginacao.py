@@ -0,0 +1,75 @@
+"""
+Paginação por cursor (keyset) e contagem em cache para listas grandes.
+
+Em vez de OFFSET, cada página pede "id < último id da página anterior"
+(ou "id > primeiro id" para voltar), que é uma busca direta na chave primária:
+a página 500 custa o mesmo que a primeira. O total não é recontado a cada
+página: fica no cache sob a versão do grupo (materiais.kpi), que os signals
+trocam quando a tabela muda.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+
+from materiais.kpi import versao_kpi
+
+
+def _cursor(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+class PaginaCursor:
+    """Uma página de um queryset ordenado por -id, no formato esperado pelo ListView (page_obj)."""
+
+    def __init__(self, object_list, tem_proxima, tem_anterior, total=None):
+        self.object_list = object_list
+        self.tem_proxima = tem_proxima
+        self.tem_anterior = tem_anterior
+        self.total = total
+        self.apos = object_list[-1].pk if object_list else None
+        self.antes = object_list[0].pk if object_list else None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def paginar_por_cursor(qs, tamanho, apos=None, antes=None):
+    """
+    Página de 'tamanho' itens de qs (mais novos primeiro).
+
+    apos: id do último item da página anterior (avançar).
+    antes: id do primeiro item da página seguinte (voltar).
+    Busca um item a mais para saber se existe outra página naquela direção.
+    """
+    apos, antes = _cursor(apos), _cursor(antes)
+    if antes is not None:
+        itens = list(qs.filter(pk__gt=antes).order_by('pk')[:tamanho + 1])
+        tem_anterior = len(itens) > tamanho
+        itens = itens[:tamanho][::-1]
+        return PaginaCursor(itens, tem_proxima=True, tem_anterior=tem_anterior)
+
+    if apos is not None:
+        qs = qs.filter(pk__lt=apos)
+    itens = list(qs.order_by('-pk')[:tamanho + 1])
+    return PaginaCursor(itens[:tamanho], tem_proxima=len(itens) > tamanho, tem_anterior=apos is not None)
+
+
+def contagem_cacheada(qs, grupo, timeout=300):
+    """COUNT(*) de qs guardado no cache até o grupo mudar de versão (ou expirar)."""
+    try:
+        filtro = hashlib.md5(str(qs.query).encode()).hexdigest()
+    except EmptyResultSet:  # qs.none()
+        return 0
+    chave = f'contagem:{grupo}:{versao_kpi(grupo)}:{filtro}'
+    total = cache.get(chave)
+    if total is None:
+        total = qs.order_by().count()
+        cache.set(chave, total, timeout)
+    return total
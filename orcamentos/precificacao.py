@@ -0,0 +1,154 @@
+"""
+Precificação em lote das tiragens de um ItemOrcamento.
+
+Tudo o que o cálculo precisa (papel, custos de click e de acabamento, faixas de
+preço, guilhotina, percentuais do orçamento) é carregado uma vez (faixas e
+guilhotina vêm dos índices em memória de materiais.precos, sem consulta); depois
+cada quantidade é só aritmética, e as tiragens são gravadas com um único bulk_create.
+Cotar 20 quantidades custa praticamente o mesmo que cotar uma.
+"""
+import math
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from materiais.models import Acabamento, parse_gramatura
+from materiais.precos import faixas_papel, faixas_acabamento, guilhotina
+from .models import ItemOrcamentoTiragem
+from .utils import calcular_imposicao_cache
+
+CENTAVOS = Decimal('0.01')
+
+
+def _dinheiro(valor):
+    return Decimal(valor).quantize(CENTAVOS, rounding=ROUND_HALF_UP)
+
+
+def _lados_cor(cor_impressao):
+    """'4x0' -> [4], '4x4' -> [4, 4], '1x0' -> [1]: número de cores de cada lado impresso."""
+    lados = []
+    for parte in (cor_impressao or '').lower().split('x')[:2]:
+        parte = parte.strip()
+        if parte.isdigit() and int(parte) > 0:
+            lados.append(int(parte))
+    return lados or [1]
+
+
+class PrecificadorItem:
+    """Carrega uma vez os dados de um item e calcula qualquer quantidade de tiragens."""
+
+    def __init__(self, item, acabamentos=()):
+        self.item = item
+        papel = item.papel
+        impressora = item.impressora
+        orcamento = item.orcamento
+
+        # Imposição: peças por folha com sangria
+        corte_w = float(item.largura_final_mm + item.sangria_mm * 2)
+        corte_h = float(item.altura_final_mm + item.sangria_mm * 2)
+        imposicao = calcular_imposicao_cache(papel.largura_mm, papel.altura_mm, corte_w, corte_h)
+        self.itens_por_folha = imposicao['total'] if imposicao else 0
+        if not self.itens_por_folha:
+            # Sem peças por folha não há folhas nem custo: o orçamento sairia de graça
+            raise ValidationError(
+                f"O corte {corte_w:g}x{corte_h:g} mm não cabe no papel {papel.largura_mm}x{papel.altura_mm} mm.",
+                code='corte_nao_cabe',
+            )
+
+        # Custo de click por folha (soma dos lados; lado com mais de 1 cor usa click color)
+        self.click_por_folha = sum(
+            impressora.custo_click_color if cores > 1 else impressora.custo_click_mono
+            for cores in _lados_cor(item.cor_impressao)
+        )
+        self.preco_folha = papel.ultimo_preco_unitario
+
+        # Faixas de venda vêm do índice em memória (materiais.precos); o custo, do cadastro
+        self.papel_id = papel.pk
+        self.acabamento_ids = [getattr(a, 'pk', a) for a in acabamentos]
+        self.custo_acabamento_unidade = Decimal(0)
+        if self.acabamento_ids:
+            custos = Acabamento.objects.filter(pk__in=self.acabamento_ids).values_list('custo_unitario', flat=True)
+            self.custo_acabamento_unidade = sum(custos, Decimal(0))
+
+        # Guilhotina: quantas folhas por batida para a gramatura do papel (índice em memória)
+        gramatura = papel.gramatura_g
+        if gramatura is None:
+            # Papel criado por bulk_create (sem save) pode estar sem a coluna numérica
+            gramatura = parse_gramatura(papel.gramatura)
+        self.folhas_por_corte = guilhotina.folhas_por_corte(gramatura)
+
+        # Percentuais do orçamento viram divisor sobre o preço (imposto + comissão + cartão)
+        # str(): o orçamento recém-criado ainda traz os defaults do model (int/float)
+        percentuais = sum(
+            (Decimal(str(p)) for p in (orcamento.percentual_imposto, orcamento.percentual_comissao,
+                                       orcamento.percentual_cartao)),
+            Decimal(0),
+        )
+        self.divisor = 1 - percentuais / 100 if percentuais < 100 else Decimal(1)
+
+    def folhas(self, quantidade):
+        if not self.itens_por_folha:
+            return 0
+        return math.ceil(quantidade * self.item.paginas / self.itens_por_folha)
+
+    def batidas(self, folhas):
+        """Batidas de guilhotina para refilar a tiragem (None sem configuração)."""
+        if not self.folhas_por_corte or not folhas:
+            return None
+        return math.ceil(folhas / self.folhas_por_corte)
+
+    def calcular(self, quantidade):
+        """Retorna uma ItemOrcamentoTiragem (não salva) para a quantidade."""
+        folhas = self.folhas(quantidade)
+        custo_papel = self.preco_folha * folhas
+        custo_impressao = self.click_por_folha * folhas
+
+        venda_acabamento = Decimal(0)
+        for acabamento_id in self.acabamento_ids:
+            venda_acabamento += (faixas_acabamento.preco(acabamento_id, quantidade) or 0) * quantidade
+        custo_acabamento = self.custo_acabamento_unidade * quantidade
+
+        preco_folha_venda = faixas_papel.preco(self.papel_id, folhas)
+        if preco_folha_venda is not None:
+            venda_base = preco_folha_venda * folhas + venda_acabamento
+        else:
+            # Papel sem tabela de venda: parte do custo de papel + click
+            venda_base = custo_papel + custo_impressao + venda_acabamento
+
+        custo_total = custo_papel + custo_impressao + custo_acabamento
+        valor_final = venda_base / self.divisor
+
+        tiragem = ItemOrcamentoTiragem(
+            item=self.item,
+            quantidade=quantidade,
+            custo_papel=_dinheiro(custo_papel),
+            custo_impressao=_dinheiro(custo_impressao),
+            custo_acabamento=_dinheiro(custo_acabamento),
+            custo_total_producao=_dinheiro(custo_total),
+            valor_final_venda=_dinheiro(valor_final),
+            valor_unitario=_dinheiro(valor_final / quantidade) if quantidade else Decimal(0),
+        )
+        # Dados de produção (não persistidos) para exibição
+        tiragem.folhas = folhas
+        tiragem.batidas_guilhotina = self.batidas(folhas)
+        return tiragem
+
+
+def calcular_tiragens(item, quantidades, acabamentos=(), salvar=True):
+    """
+    Calcula as tiragens de um item para todas as quantidades de uma vez.
+
+    Com salvar=True, substitui as tiragens existentes do item por estas
+    (um delete + um bulk_create, na mesma transação).
+    ValidationError se o corte não cabe no papel.
+    """
+    quantidades = sorted({int(q) for q in quantidades if int(q) > 0})
+    precificador = PrecificadorItem(item, acabamentos)
+    tiragens = [precificador.calcular(q) for q in quantidades]
+
+    if salvar:
+        with transaction.atomic():
+            item.tiragens.all().delete()
+            ItemOrcamentoTiragem.objects.bulk_create(tiragens)
+    return tiragens
@@ -0,0 +1,20 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from materiais.kpi import invalidar_kpi
+
+from .models import Cliente
+from . import busca
+
+
+@receiver(post_save, sender=Cliente)
+def indexar_cliente(sender, instance, **kwargs):
+    busca.indexar_clientes([instance])
+    transaction.on_commit(lambda: invalidar_kpi('cliente'))  # contagens em cache da lista de clientes
+
+
+@receiver(post_delete, sender=Cliente)
+def remover_cliente_indice(sender, instance, **kwargs):
+    busca.remover_cliente(instance.pk)
+    transaction.on_commit(lambda: invalidar_kpi('cliente'))
@@ -1,3 +1,441 @@
-from django.test import TestCase
+import random
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from django.contrib.auth.models import User
+
+from materiais.models import Acabamento, Fornecedor, Impressora, Papel, TabelaPrecoAcabamento, TabelaPrecoPapel
+from core.versoes import cache_versoes
+from materiais.importacao import importar_compras
+from materiais.precos import PapelCatalogo, catalogo
+from materiais.tests import PlanoConsultaMixin
+from .busca import buscar_clientes, reindexar_todos
+from .combinacoes import melhores_combinacoes
+from .documentos import mesclar_duplicados, normalizar_documento, parece_documento
+from .models import Cliente, ConfiguracaoGlobal, ItemOrcamento, Orcamento
+from .montagem import Peca, montar_folhas
+from .precificacao import calcular_tiragens
+from .utils import _ocupado, imposicao_em_lote, melhor_imposicao, ranquear_papeis
+
+
+class ImposicaoTests(SimpleTestCase):
+
+    def test_grades_uniformes_e_mista(self):
+        self.assertEqual(melhor_imposicao(330, 480, 96, 56)['total'], 24)
+        self.assertEqual(melhor_imposicao(297, 420, 96, 56)['orientacao'], 'rotacionado')
+        # 650x950 úteis: 6x16=96 normal, 11x9=99 girado; a grade mista com faixa girada leva 107
+        resultado = melhor_imposicao(660, 960, 96, 56)
+        self.assertEqual((resultado['total'], resultado['orientacao']), (107, 'misto'))
+        self.assertEqual(sum(b['cols'] * b['rows'] for b in resultado['blocos']), 107)
+        self.assertIsNone(melhor_imposicao(330, 480, 0, 56))
+        self.assertEqual(melhor_imposicao(330, 480, 500, 500)['total'], 0)
+
+    def test_lote_calcula_cada_formato_uma_vez(self):
+        resultados = imposicao_em_lote([(1, 330, 480), (2, 330, 480), (3, 297, 420)], 96, 56)
+        self.assertIs(resultados[1], resultados[2])
+        self.assertEqual((resultados[1]['total'], resultados[3]['total']), (24, 20))
+
+    def test_ranking_de_papeis(self):
+        papeis = [
+            PapelCatalogo(1, "A3", "90g", 90, 297, 420, 0.3),
+            PapelCatalogo(2, "SRA3", "150g", 150, 330, 480, 0.5),
+            PapelCatalogo(3, "Tira", "90g", 90, 50, 480, 0.1),
+            PapelCatalogo(4, "Grande", "300g", 300, 660, 960, 0.9),
+        ]
+        ranking = ranquear_papeis(96, 56, papeis)
+        self.assertEqual([(p.pk, r['total']) for p, r in ranking], [(4, 107), (2, 24), (1, 20)])
+        self.assertEqual(len(ranquear_papeis(96, 56, papeis, limite=2)), 2)
+
+    def test_espacamentos_candidatos(self):
+        # Calha que não custa peças ganha (mais folga); a que custa é descartada
+        self.assertEqual(melhor_imposicao(330, 480, 100, 100, espacamentos=(0, 2, 4))['espacamento'], 4)
+        resultado = melhor_imposicao(330, 480, 106, 117, espacamentos=(0, 2, 4))
+        self.assertEqual((resultado['total'], resultado['espacamento']), (12, 0))
+
+        papeis = [PapelCatalogo(1, "SRA3", "150g", 150, 330, 480, 0.5)]
+        (_, resultado), = ranquear_papeis(100, 100, papeis, espacamentos=(0, 2, 4))
+        self.assertEqual((resultado['total'], resultado['espacamento']), (12, 4))
+        self.assertEqual(imposicao_em_lote([(1, 330, 480)], 100, 100)[1]['espacamento'], 0)
+
+
+class MontagemTests(SimpleTestCase):
+
+    def _pecas(self, n, semente=1):
+        rnd = random.Random(semente)
+        return [
+            Peca(i, rnd.randint(40, 200) + 6, rnd.randint(40, 250) + 6, rnd.choice([100, 500, 2000]), 3)
+            for i in range(n)
+        ]
+
+    def test_atende_a_demanda_dentro_da_margem_sem_sobrepor(self):
+        pecas = self._pecas(12)
+        resultado = montar_folhas(330, 480, pecas, margem_papel=5)
+
+        produzido = {}
+        for folha in resultado['folhas']:
+            retangulos = []
+            for b in folha['blocos']:
+                x2 = b['x'] + _ocupado(b['cols'], b['w'])
+                y2 = b['y'] + _ocupado(b['rows'], b['h'])
+                self.assertGreaterEqual(min(b['x'], b['y']), 5 - 1e-6)
+                self.assertLessEqual(x2, 325 + 1e-6)
+                self.assertLessEqual(y2, 475 + 1e-6)
+                for ox, oy, ox2, oy2 in retangulos:
+                    self.assertFalse(b['x'] < ox2 - 1e-6 and ox < x2 - 1e-6 and b['y'] < oy2 - 1e-6 and oy < y2 - 1e-6)
+                retangulos.append((b['x'], b['y'], x2, y2))
+            for chave, n in folha['pecas'].items():
+                produzido[chave] = produzido.get(chave, 0) + n * folha['copias']
+
+        for p in pecas:
+            self.assertGreaterEqual(produzido[p.chave], p.quantidade)
+        self.assertEqual(resultado['total_folhas'], sum(f['copias'] for f in resultado['folhas']))
+
+    def test_nunca_pior_que_imprimir_separado(self):
+        for semente in range(3):
+            resultado = montar_folhas(330, 480, self._pecas(20, semente))
+            self.assertLessEqual(resultado['total_folhas'], resultado['folhas_separadas'])
+
+    def test_peca_maior_que_a_folha(self):
+        resultado = montar_folhas(330, 480, [Peca('a', 96, 56, 100), Peca('grande', 500, 300, 10)])
+        self.assertEqual(resultado['nao_cabem'], ['grande'])
+        self.assertEqual(list(resultado['sobras']), ['a'])
+
+
+class ConfiguracaoGlobalTests(TestCase):
+
+    def setUp(self):
+        ConfiguracaoGlobal.invalidar_cache()
+        # A cópia em memória sobrevive ao rollback do teste
+        self.addCleanup(ConfiguracaoGlobal.invalidar_cache)
+
+    def test_save_de_outro_worker_aparece_apos_o_intervalo(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            config = ConfiguracaoGlobal.objects.create(imposto_padrao=8)
+        self.assertEqual(ConfiguracaoGlobal.atual().imposto_padrao, 8)
+
+        # Outro processo salvou: aqui só a versão compartilhada muda
+        ConfiguracaoGlobal.objects.filter(pk=config.pk).update(imposto_padrao=12)
+        cache_versoes.set(ConfiguracaoGlobal.CHAVE_VERSAO, 'outro-worker', None)
+        with self.assertNumQueries(0):
+            self.assertEqual(ConfiguracaoGlobal.atual().imposto_padrao, 8)
+
+        versao, instancia, conferido = ConfiguracaoGlobal._em_memoria
+        ConfiguracaoGlobal._em_memoria = (versao, instancia, conferido - ConfiguracaoGlobal.INTERVALO_VERSAO)
+        self.assertEqual(ConfiguracaoGlobal.atual().imposto_padrao, 12)
+
+    def test_criar_orcamento_nao_rele_a_configuracao(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ConfiguracaoGlobal.objects.create(imposto_padrao=8)
+        cliente = Cliente.objects.create(nome="Cliente", tipo='PF')
+        ConfiguracaoGlobal.atual()
+
+        # Dentro do intervalo: só o INSERT do orçamento
+        with self.assertNumQueries(1):
+            self.assertEqual(Orcamento.objects.create(cliente=cliente).percentual_imposto, 8)
+
+        # Intervalo vencido: + 1 leitura da versão (cache 'versoes' no banco), sem reler a configuração
+        versao, instancia, conferido = ConfiguracaoGlobal._em_memoria
+        ConfiguracaoGlobal._em_memoria = (versao, instancia, conferido - ConfiguracaoGlobal.INTERVALO_VERSAO)
+        with self.assertNumQueries(2):
+            Orcamento.objects.create(cliente=cliente)
+
+
+class SvgAproveitamentoTests(SimpleTestCase):
+
+    def svg(self, **params):
+        return self.client.get(reverse('orcamentos:aproveitamento_svg'), dict({'pw': 330, 'ph': 480, 'iw': 96, 'ih': 56}, **params))
+
+    def test_desenha_geometria_valida(self):
+        resposta = self.svg()
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta['Content-Type'], 'image/svg+xml')
+        self.assertTrue(resposta.has_header('ETag'))
+
+    def test_recusa_medidas_fora_da_faixa(self):
+        for params in ({'pw': '1e9', 'iw': '0.1'}, {'iw': '0.1'}, {'pw': 'inf'}, {'ih': 'nan'},
+                       {'m': '-1'}, {'m': 'nan'}, {'pw': '0'}, {'pw': 'abc'}):
+            self.assertEqual(self.svg(**params).status_code, 400, params)
+
+
+class MontagemViewTests(TestCase):
+
+    def test_svg_recusa_pecas_invalidas(self):
+        url = reverse('orcamentos:montagem_svg')
+        base = {'pw': 330, 'ph': 480}
+        self.assertEqual(self.client.get(url, dict(base, p='96:56:100:3')).status_code, 200)
+        for pecas in (['0.1:0.1:100:0'], ['inf:56:100:3'], ['96:nan:100:3'], ['96:56:1e12:3'],
+                      ['96:56:-1:3'], ['96:56'], ['96:56:100:3'] * 101, []):
+            self.assertEqual(self.client.get(url, dict(base, p=pecas)).status_code, 400, pecas[:1])
+        self.assertEqual(self.client.get(url, {'pw': '1e9', 'ph': 480, 'p': '96:56:100:3'}).status_code, 400)
+
+    def test_htmx_ignora_ids_invalidos(self):
+        resposta = self.client.get(reverse('orcamentos:htmx_montagem'), {'item': ['abc', '-1'], 'quantidade': [10, 10]})
+        self.assertEqual(resposta.status_code, 200)
+
+
+class MelhoresCombinacoesTests(TestCase):
+
+    def setUp(self):
+        self.sra3 = Papel.objects.create(nome="Couchê", gramatura="150g", largura_mm=330, altura_mm=480)
+        self.a3 = Papel.objects.create(nome="Offset", gramatura="90g", largura_mm=297, altura_mm=420)
+        self.grande = Papel.objects.create(nome="Cartão", gramatura="300g", largura_mm=660, altura_mm=960)
+        Papel.objects.filter(pk=self.sra3.pk).update(ultimo_preco_unitario=Decimal('0.50'))
+        Papel.objects.filter(pk=self.a3.pk).update(ultimo_preco_unitario=Decimal('0.30'))
+        Papel.objects.filter(pk=self.grande.pk).update(ultimo_preco_unitario=Decimal('0.10'))
+        self.barata = Impressora.objects.create(nome="Barata", marca="X", modelo="A", largura_max_mm=330, altura_max_mm=488)
+        self.cara = Impressora.objects.create(nome="Cara", marca="X", modelo="B", largura_max_mm=330, altura_max_mm=488)
+        Impressora.objects.filter(pk=self.barata.pk).update(custo_click_mono=Decimal('0.05'), custo_click_color=Decimal('0.20'))
+        Impressora.objects.filter(pk=self.cara.pk).update(custo_click_mono=Decimal('0.10'), custo_click_color=Decimal('0.40'))
+        catalogo.invalidar()
+
+    def test_ordena_por_custo_e_respeita_formato_maximo(self):
+        resultado = melhores_combinacoes(90, 50, 3, '4x0', 1000)
+        pares = [(c['papel'].pk, c['impressora'].pk) for c in resultado]
+
+        # O papel 660x960 não cabe em nenhuma das máquinas
+        self.assertNotIn(self.grande.pk, {papel for papel, _ in pares})
+        self.assertEqual(len(pares), 4)
+        custos = [c['custo_total'] for c in resultado]
+        self.assertEqual(custos, sorted(custos))
+        # A3: 20 un/fl -> 50 folhas x (0,30 + 0,20); SRA3: 24 un/fl -> 42 x (0,50 + 0,20) = 29,40
+        self.assertEqual(pares[0], (self.a3.pk, self.barata.pk))
+        self.assertEqual(resultado[0]['folhas'], 50)
+        self.assertEqual(resultado[0]['custo_total'], Decimal('25.00'))
+        self.assertEqual(pares[1], (self.sra3.pk, self.barata.pk))
+
+    def test_limite_e_gramatura(self):
+        resultado = melhores_combinacoes(90, 50, 3, '4x0', 1000, limite=1, gramatura=90)
+        self.assertEqual(len(resultado), 1)
+        self.assertEqual(resultado[0]['papel'].pk, self.a3.pk)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN é do SQLite")
+class MelhoresCombinacoesViewTests(TestCase):
+
+    def test_medidas_invalidas_sao_recusadas(self):
+        for largura in ('nan', 'inf', '1e-9', '9999'):
+            with self.subTest(largura=largura):
+                resposta = self.client.get(reverse('orcamentos:htmx_combinacoes'), {
+                    'item-largura_final_mm': largura, 'item-altura_final_mm': 50, 'quantidade': 100,
+                })
+                self.assertEqual(resposta.status_code, 400)
+
+    def test_sem_medidas_nao_sugere_nada(self):
+        resposta = self.client.get(reverse('orcamentos:htmx_combinacoes'), {'quantidade': 100})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.context['combinacoes'], [])
+
+
+class PlanoConsultaOrcamentoTests(PlanoConsultaMixin, TestCase):
+
+    def test_orcamentos_por_status_e_data(self):
+        desde = timezone.now() - timedelta(days=30)
+        qs = Orcamento.objects.filter(status='APROVADO', data_criacao__gte=desde).order_by('-data_criacao')
+        self.assertSemVarredura(qs, 'status=?', 'data_criacao>?')
+        self.assertSemVarredura(Orcamento.objects.filter(status='EM_ANALISE').order_by('-data_criacao'), 'status=?')
+
+
+class PreviewAproveitamentoTests(TestCase):
+
+    def test_preview_lista_os_melhores_papeis(self):
+        sra3 = Papel.objects.create(nome="Couchê", gramatura="150g", largura_mm=330, altura_mm=480)
+        Papel.objects.create(nome="Offset", gramatura="90g", largura_mm=297, altura_mm=420)
+        catalogo.invalidar()
+        resposta = self.client.get(reverse('orcamentos:htmx_aproveitamento'), {
+            'item-largura_final_mm': 90, 'item-altura_final_mm': 50, 'item-sangria_mm': 3, 'item-papel': sra3.pk,
+        })
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual([(p.pk, r['total']) for p, r in resposta.context['ranking']][0], (sra3.pk, 24))
+        self.assertContains(resposta, 'Melhores papéis para este corte')
+        self.assertContains(resposta, 'Offset 90g (297x420)')
+
+    def test_ranking_ve_o_preco_importado(self):
+        papel = Papel.objects.create(nome="Couchê", gramatura="150g", largura_mm=330, altura_mm=480)
+        fornecedor = Fornecedor.objects.create(nome_empresa="Papéis SA", segmento='PAPEL')
+        catalogo.invalidar()
+        self.assertEqual(ranquear_papeis(96, 56)[0][0].preco_folha, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resultado = importar_compras([{
+                'papel': papel.pk, 'fornecedor': fornecedor.pk, 'data_compra': '2025-01-05',
+                'qtd_pacotes_compra': 1, 'qtd_embalagem': 500, 'valor_pacote': '1.250,00',
+            }])
+        self.assertEqual(resultado['erros'], [])
+        self.assertEqual(ranquear_papeis(96, 56)[0][0].preco_folha, 2.5)
+
+    def test_medidas_invalidas_nao_calculam(self):
+        papel = Papel.objects.create(nome="Couchê", gramatura="150g", largura_mm=330, altura_mm=480)
+        for largura in ('nan', 'inf', '1e9', 'abc'):
+            with self.subTest(largura=largura), self.assertNoLogs('orcamentos.views'):
+                resposta = self.client.get(reverse('orcamentos:htmx_aproveitamento'), {
+                    'item-largura_final_mm': largura, 'item-altura_final_mm': 50, 'item-papel': papel.pk,
+                })
+                self.assertNotIn('resultado', resposta.context)
+
+
+class PrecificacaoTests(TestCase):
+
+    def setUp(self):
+        self.papel = Papel.objects.create(nome="Couchê", gramatura="150g", largura_mm=330, altura_mm=480)
+        Papel.objects.filter(pk=self.papel.pk).update(ultimo_preco_unitario=Decimal('0.50'))
+        self.papel.refresh_from_db()
+        # Os índices de faixas são invalidados no commit
+        with self.captureOnCommitCallbacks(execute=True):
+            TabelaPrecoPapel.objects.create(papel=self.papel, qtd_minima=1, valor_venda=Decimal('2.00'))
+            TabelaPrecoPapel.objects.create(papel=self.papel, qtd_minima=40, valor_venda=Decimal('1.50'))
+        impressora = Impressora.objects.create(nome="Konica", marca="K", modelo="C", largura_max_mm=330, altura_max_mm=488)
+        Impressora.objects.filter(pk=impressora.pk).update(custo_click_mono=Decimal('0.05'), custo_click_color=Decimal('0.20'))
+        impressora.refresh_from_db()
+        self.acabamento = Acabamento.objects.create(nome="Laminação", custo_unitario=Decimal('0.02'))
+        with self.captureOnCommitCallbacks(execute=True):
+            TabelaPrecoAcabamento.objects.create(acabamento=self.acabamento, qtd_minima=1, valor_venda=Decimal('0.10'))
+
+        orcamento = Orcamento.objects.create(cliente=Cliente.objects.create(nome="Cliente", tipo='PF'))
+        self.item = ItemOrcamento.objects.create(
+            orcamento=orcamento, titulo="Cartão", largura_final_mm=90, altura_final_mm=50, sangria_mm=3,
+            papel=self.papel, impressora=impressora, cor_impressao='4x0',
+        )
+
+    def test_lote_igual_a_cada_quantidade_sozinha(self):
+        quantidades = [100, 500, 1000, 5000]
+        lote = calcular_tiragens(self.item, quantidades, [self.acabamento], salvar=False)
+        campos = ['quantidade', 'custo_papel', 'custo_impressao', 'custo_acabamento',
+                  'custo_total_producao', 'valor_final_venda', 'valor_unitario']
+        for tiragem, quantidade in zip(lote, quantidades):
+            sozinha, = calcular_tiragens(self.item, [quantidade], [self.acabamento], salvar=False)
+            self.assertEqual([getattr(tiragem, c) for c in campos], [getattr(sozinha, c) for c in campos])
+
+    def test_acabamento_entra_pelo_custo_na_producao_e_pela_venda_no_preco(self):
+        tiragem, = calcular_tiragens(self.item, [1000], [self.acabamento])
+        # 24 un/fl -> 42 folhas: papel 21,00; click 8,40; acabamento 1000 x 0,02 = 20,00
+        self.assertEqual(tiragem.custo_acabamento, Decimal('20.00'))
+        self.assertEqual(tiragem.custo_total_producao, Decimal('49.40'))
+        # Venda: 42 x 1,50 + 1000 x 0,10 = 163,00, sem percentuais
+        self.assertEqual(tiragem.valor_final_venda, Decimal('163.00'))
+        self.assertEqual(self.item.tiragens.count(), 1)
+
+    def test_corte_que_nao_cabe_no_papel_nao_gera_orcamento_de_graca(self):
+        self.item.largura_final_mm = 500
+        self.item.save()
+        with self.assertRaises(ValidationError):
+            calcular_tiragens(self.item, [100, 500])
+        self.assertFalse(self.item.tiragens.exists())
+
+
+class DocumentoClienteTests(TestCase):
+
+    def test_normalizacao(self):
+        self.assertEqual(normalizar_documento("123.456.789-00"), "12345678900")
+        self.assertEqual(normalizar_documento(" 12.abc.345/0001-99 "), "12ABC345000199")
+        self.assertIsNone(normalizar_documento("./-"))
+        self.assertIsNone(normalizar_documento(None))
+        self.assertTrue(parece_documento("123.456.789-00"))
+        self.assertFalse(parece_documento("Gráfica 123"))
+        self.assertFalse(parece_documento("1234"))
+
+    def test_mescla_no_cadastro_mais_antigo(self):
+        # bulk_create não passa por save(): simula a base antes da chave normalizada
+        antigo, novo, outro = Cliente.objects.bulk_create([
+            Cliente(nome="Maria", documento="123.456.789-00", telefone=""),
+            Cliente(nome="Maria S.", documento="12345678900", telefone="1199", email="m@x.com"),
+            Cliente(nome="João", documento="987.654.321-00", telefone="1188"),
+        ])
+        orcamento = Orcamento.objects.create(cliente=novo)
+
+        mantidos, removidos = mesclar_duplicados(Cliente, Orcamento)
+
+        self.assertEqual(removidos, [novo.pk])
+        self.assertFalse(Cliente.objects.filter(pk=novo.pk).exists())
+        antigo.refresh_from_db()
+        self.assertEqual((antigo.documento_normalizado, antigo.telefone, antigo.email), ("12345678900", "1199", "m@x.com"))
+        self.assertEqual(Cliente.objects.get(pk=outro.pk).documento_normalizado, "98765432100")
+        orcamento.refresh_from_db()
+        self.assertEqual(orcamento.cliente_id, antigo.pk)
+
+    def test_admin_recusa_documento_duplicado(self):
+        Cliente.objects.create(nome="Maria", documento="123.456.789-00", telefone="1199")
+        self.client.force_login(User.objects.create_superuser('admin', password='senha'))
+        resposta = self.client.post(reverse('admin:orcamentos_cliente_add'), {
+            'tipo': 'PF', 'nome': 'Outra Maria', 'documento': '12345678900', 'telefone': '1188',
+        })
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn('documento', resposta.context['adminform'].form.errors)
+        self.assertEqual(Cliente.objects.count(), 1)
+
+
+class BuscaClientesTests(TestCase):
+
+    def setUp(self):
+        # Cadastro antigo e muito relevante, atrás de 250 mais recentes que casam pouco
+        self.antigo = Cliente.objects.create(nome="Maria", nome_fantasia="Maria Papelaria", telefone="1")
+        Cliente.objects.bulk_create([
+            Cliente(nome=f"Maria Souza Lima Pereira Costa {i}", telefone="1") for i in range(250)
+        ])
+        reindexar_todos()
+
+    def test_relevancia_considera_todos_os_resultados(self):
+        self.assertEqual(buscar_clientes("maria", limite=3)[0], self.antigo)
+
+    def test_empate_fica_com_o_mais_recente(self):
+        ids = [c.pk for c in buscar_clientes("souza", limite=3)]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(ids[0], Cliente.objects.latest('pk').pk)
+
+
+class NovoOrcamentoViewTests(TestCase):
+
+    def test_calcular_grava_orcamento_e_tiragens(self):
+        self.client.force_login(User.objects.create_user('vendedor', password='senha'))
+        papel = Papel.objects.create(nome="Couchê", gramatura="150g", largura_mm=330, altura_mm=480)
+        impressora = Impressora.objects.create(nome="Konica", marca="K", modelo="C", largura_max_mm=330, altura_max_mm=488)
+        resposta = self.client.post(reverse('orcamentos:novo_orcamento'), {
+            'acao': 'calcular',
+            'cliente-tipo': 'PF', 'cliente-nome': 'Maria', 'cliente-documento': '', 'cliente-telefone': '11999990000',
+            'item-titulo': 'Cartão', 'item-quantidades_input': '100, 500',
+            'item-largura_final_mm': 90, 'item-altura_final_mm': 50, 'item-sangria_mm': 3,
+            'item-papel': papel.pk, 'item-impressora': impressora.pk, 'item-cor_impressao': '4x0',
+            'item-paginas': 1, 'percentual_imposto': '8.00', 'percentual_comissao': '0', 'taxa_cartao': '0',
+        })
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual([t.quantidade for t in resposta.context['resultados']], [100, 500])
+        orcamento = Orcamento.objects.get()
+        self.assertEqual(orcamento.percentual_imposto, Decimal('8.00'))
+        self.assertEqual(orcamento.itens.get().tiragens.count(), 2)
+
+    def test_documento_existente_atualiza_cliente(self):
+        cliente = Cliente.objects.create(nome="Maria", documento="123.456.789-00", telefone="1199")
+        self.client.force_login(User.objects.create_user('vendedor', password='senha'))
+        resposta = self.client.post(reverse('orcamentos:novo_orcamento'), {
+            'cliente-tipo': 'PF', 'cliente-nome': 'Maria Silva', 'cliente-documento': '12345678900',
+            'cliente-telefone': '1188',
+        })
+        self.assertLess(resposta.status_code, 500)
+        self.assertEqual(Cliente.objects.count(), 1)
+        cliente.refresh_from_db()
+        self.assertEqual(cliente.nome, "Maria Silva")
+
+    def test_corte_que_nao_cabe_volta_como_erro_do_formulario(self):
+        self.client.force_login(User.objects.create_user('vendedor', password='senha'))
+        papel = Papel.objects.create(nome="Couchê", gramatura="150g", largura_mm=330, altura_mm=480)
+        impressora = Impressora.objects.create(nome="Konica", marca="K", modelo="C", largura_max_mm=330, altura_max_mm=488)
+        resposta = self.client.post(reverse('orcamentos:novo_orcamento'), {
+            'acao': 'calcular',
+            'cliente-tipo': 'PF', 'cliente-nome': 'Maria', 'cliente-documento': '', 'cliente-telefone': '11999990000',
+            'item-titulo': 'Banner', 'item-quantidades_input': '100',
+            'item-largura_final_mm': 900, 'item-altura_final_mm': 600, 'item-sangria_mm': 3,
+            'item-papel': papel.pk, 'item-impressora': impressora.pk, 'item-cor_impressao': '4x0',
+            'item-paginas': 1,
+        })
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn("não cabe no papel", str(resposta.context['form_item'].non_field_errors()))
+        self.assertContains(resposta, "não cabe no papel")
+        self.assertFalse(Orcamento.objects.exists())
+        self.assertFalse(Cliente.objects.exists())
 
-# Create your tests here.
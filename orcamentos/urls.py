@@ -13,5 +13,13 @@ urlpatterns = [
 
     path('htmx/aproveitamento/', htmx_calcular_aproveitamento, name='htmx_aproveitamento'),
 
+    path('htmx/aproveitamento/svg/', views.svg_aproveitamento, name='aproveitamento_svg'),
+
+    path('htmx/combinacoes/', views.htmx_melhores_combinacoes, name='htmx_combinacoes'),
+
+    path('htmx/montagem/', views.htmx_montagem, name='htmx_montagem'),
+
+    path('htmx/montagem/svg/', views.svg_montagem, name='montagem_svg'),
+
     path('htmx/buscar-cliente/', views.buscar_cliente, name='buscar_cliente'),
 ]
\ No newline at end of file
@@ -1,72 +1,370 @@
 import math
+import threading
+import time
+from collections import OrderedDict
 
-def calcular_imposicao(papel_largura, papel_altura, item_largura, item_altura, margem_papel=5):
+
+# Faixa aceita para medidas vindas de requisições (mm). O custo do layout cresce com
+# papel / peça, então valores absurdos (1e9, 0.001), inf e nan são recusados antes do cálculo
+MEDIDA_MIN_MM = 1
+MEDIDA_MAX_MM = 5000
+
+
+def medidas_validas(*medidas, minimo=MEDIDA_MIN_MM):
+    """True se todas as medidas são finitas e estão entre 'minimo' e MEDIDA_MAX_MM."""
+    return all(math.isfinite(m) and minimo <= m <= MEDIDA_MAX_MM for m in medidas)
+
+
+def _qtd_em_linha(comprimento, peca, espaco=0):
+    """Quantas peças cabem em linha num comprimento, com 'espaco' (calha) entre elas."""
+    if peca <= 0 or comprimento < peca:
+        return 0
+    return int((comprimento + espaco) // (peca + espaco))
+
+
+def _ocupado(qtd, peca, espaco=0):
+    """Comprimento ocupado por 'qtd' peças em linha."""
+    return qtd * peca + max(qtd - 1, 0) * espaco
+
+
+def _bloco(x, y, cols, rows, w, h, orientacao):
+    return {'x': x, 'y': y, 'cols': cols, 'rows': rows, 'w': w, 'h': h, 'orientacao': orientacao}
+
+
+def _melhor_layout_area(area_w, area_h, item_w, item_h, espaco=0):
     """
-    Calcula o melhor aproveitamento (Normal ou Rotacionado).
-    Retorna um dicionário com os dados para desenho e quantidade.
+    Testa todos os layouts "grade principal + faixa girada na sobra" numa área útil.
+
+    Para cada orientação da grade principal, varia quantas linhas (faixa embaixo)
+    ou colunas (faixa à direita) a grade ocupa e preenche a sobra com a peça girada.
+    Os extremos do laço são as grades uniformes (normal e rotacionada).
+    Retorna (total, blocos) com coordenadas relativas à área útil.
     """
-    # Área útil do papel (descontando margem técnica da máquina/pinça)
-    area_w = papel_largura - (margem_papel * 2)
-    area_h = papel_altura - (margem_papel * 2)
+    melhor = (0, 0, 0)
+    escolhido = None
+    for pw, ph, ori, ori_faixa in ((item_w, item_h, 'original', 'rotacionado'),
+                                   (item_h, item_w, 'rotacionado', 'original')):
+        cols = _qtd_em_linha(area_w, pw, espaco)
+        rows = _qtd_em_linha(area_h, ph, espaco)
+        preferencia = 1 if ori == 'original' else 0
 
-    if item_largura <= 0 or item_altura <= 0 or area_w <= 0 or area_h <= 0:
-        return None
+        # Faixa horizontal: k linhas da grade principal + peças giradas embaixo
+        faixa_cols = _qtd_em_linha(area_w, ph, espaco)
+        for k in range(rows + 1):
+            usado = _ocupado(k, ph, espaco) + (espaco if k else 0)
+            faixa_rows = _qtd_em_linha(area_h - usado, pw, espaco) if faixa_cols else 0
+            n_blocos = bool(k and cols) + bool(faixa_rows and faixa_cols)
+            chave = (k * cols + faixa_rows * faixa_cols, -n_blocos, preferencia)
+            if chave > melhor:
+                melhor = chave
+                escolhido = (pw, ph, ori, ori_faixa, (cols, k), (faixa_cols, faixa_rows), (0, usado))
 
-    # CENÁRIO 1: Item na orientação original
-    cols_1 = math.floor(area_w / item_largura)
-    rows_1 = math.floor(area_h / item_altura)
-    total_1 = cols_1 * rows_1
-
-    # CENÁRIO 2: Item rotacionado (90 graus)
-    cols_2 = math.floor(area_w / item_altura)
-    rows_2 = math.floor(area_h / item_largura)
-    total_2 = cols_2 * rows_2
-
-    # Decide o vencedor
-    melhor_cenario = {
-        'total': 0,
-        'cols': 0,
-        'rows': 0,
-        'item_w_final': item_largura, # Para desenho
-        'item_h_final': item_altura,  # Para desenho
-        'orientacao': 'original'
-    }
+        # Faixa vertical: k colunas da grade principal + peças giradas à direita
+        faixa_rows = _qtd_em_linha(area_h, pw, espaco)
+        for k in range(cols + 1):
+            usado = _ocupado(k, pw, espaco) + (espaco if k else 0)
+            faixa_cols = _qtd_em_linha(area_w - usado, ph, espaco) if faixa_rows else 0
+            n_blocos = bool(k and rows) + bool(faixa_rows and faixa_cols)
+            chave = (k * rows + faixa_rows * faixa_cols, -n_blocos, preferencia)
+            if chave > melhor:
+                melhor = chave
+                escolhido = (pw, ph, ori, ori_faixa, (k, rows), (faixa_cols, faixa_rows), (usado, 0))
+
+    if escolhido is None:
+        return 0, []
+
+    pw, ph, ori, ori_faixa, (cols, rows), (faixa_cols, faixa_rows), (faixa_x, faixa_y) = escolhido
+    blocos = []
+    if cols and rows:
+        blocos.append(_bloco(0, 0, cols, rows, pw, ph, ori))
+    if faixa_cols and faixa_rows:
+        blocos.append(_bloco(faixa_x, faixa_y, faixa_cols, faixa_rows, ph, pw, ori_faixa))
+    return melhor[0], blocos
 
-    if total_1 >= total_2:
-        melhor_cenario.update({'total': total_1, 'cols': cols_1, 'rows': rows_1})
-    else:
-        melhor_cenario.update({
-            'total': total_2, 
-            'cols': cols_2, 
-            'rows': rows_2,
-            'item_w_final': item_altura, # Inverte para desenhar
-            'item_h_final': item_largura,
-            'orientacao': 'rotacionado'
-        })
-    
-    # Calcula dimensões finais do grid e offset para centralização
-    grid_w = melhor_cenario['cols'] * melhor_cenario['item_w_final']
-    grid_h = melhor_cenario['rows'] * melhor_cenario['item_h_final']
-    
-    # Centraliza no papel
+
+def _montar_resultado(papel_largura, papel_altura, total, blocos, espaco):
+    """Centraliza os blocos no papel e monta o dicionário de resultado."""
+    grid_w = max((b['x'] + _ocupado(b['cols'], b['w'], espaco) for b in blocos), default=0)
+    grid_h = max((b['y'] + _ocupado(b['rows'], b['h'], espaco) for b in blocos), default=0)
     offset_x = (papel_largura - grid_w) / 2
     offset_y = (papel_altura - grid_h) / 2
 
-    # Gera lista de posições absolutas de cada retângulo
-    rectangles = []
-    for row in range(melhor_cenario['rows']):
-        for col in range(melhor_cenario['cols']):
-            rectangles.append({
-                'x': offset_x + (col * melhor_cenario['item_w_final']),
-                'y': offset_y + (row * melhor_cenario['item_h_final'])
-            })
-
-    melhor_cenario.update({
+    blocos = [dict(b, x=b['x'] + offset_x, y=b['y'] + offset_y) for b in blocos]
+    orientacoes = {b['orientacao'] for b in blocos}
+    principal = blocos[0] if blocos else _bloco(0, 0, 0, 0, 0, 0, 'original')
+    area_pecas = sum(b['cols'] * b['rows'] * b['w'] * b['h'] for b in blocos)
+
+    return {
+        'total': total,
+        # Campos da grade principal (compatíveis com o resultado antigo)
+        'cols': principal['cols'],
+        'rows': principal['rows'],
+        'item_w_final': principal['w'],
+        'item_h_final': principal['h'],
+        'orientacao': 'misto' if len(orientacoes) > 1 else principal['orientacao'],
+        'blocos': blocos,
+        'espacamento': espaco,
         'grid_w': grid_w,
         'grid_h': grid_h,
         'offset_x': offset_x,
         'offset_y': offset_y,
-        'rectangles': rectangles
-    })
-    
-    return melhor_cenario
\ No newline at end of file
+        'aproveitamento': round(100 * area_pecas / (papel_largura * papel_altura), 1),
+    }
+
+
+def melhor_imposicao(papel_largura, papel_altura, item_largura, item_altura, margem_papel=5, espacamentos=(0,)):
+    """
+    Melhor layout para uma folha, testando grades uniformes, mistas e cada
+    espaçamento (calha entre peças) informado. Retorna None se nada couber.
+    """
+    area_w = papel_largura - (margem_papel * 2)
+    area_h = papel_altura - (margem_papel * 2)
+
+    if item_largura <= 0 or item_altura <= 0 or area_w <= 0 or area_h <= 0:
+        return None
+
+    melhor = None
+    for espaco in espacamentos:
+        total, blocos = _melhor_layout_area(area_w, area_h, item_largura, item_altura, espaco)
+        # Em empate, fica o maior espaçamento (mais folga para o corte)
+        if melhor is None or (total, espaco) > (melhor[0], melhor[2]):
+            melhor = (total, blocos, espaco)
+
+    return _montar_resultado(papel_largura, papel_altura, *melhor)
+
+
+def imposicao_em_lote(folhas, item_largura, item_altura, margem_papel=5, espacamentos=(0,)):
+    """
+    Calcula o melhor layout de várias folhas numa chamada só.
+
+    'folhas' é um iterável de (chave, largura, altura). Formatos repetidos
+    (ex: vários papéis 330x480) são calculados uma única vez, pelo cache de imposição.
+    Cada folha fica com o melhor dos 'espacamentos' (calhas) candidatos.
+    Retorna {chave: resultado ou None}.
+    """
+    por_formato = {}
+    resultados = {}
+    for chave, largura, altura in folhas:
+        formato = (largura, altura)
+        if formato not in por_formato:
+            por_formato[formato] = calcular_imposicao_cache(
+                largura, altura, item_largura, item_altura, margem_papel, espacamentos
+            )
+        resultados[chave] = por_formato[formato]
+    return resultados
+
+
+def ranquear_papeis(item_largura, item_altura, papeis=None, margem_papel=5, limite=None, espacamentos=(0,)):
+    """
+    Ordena os papéis pelo aproveitamento da peça (mais peças por folha primeiro).
+    'papeis' são objetos com pk, largura_mm e altura_mm; por padrão, o catálogo em
+    memória (materiais.precos.catalogo). Cada papel é avaliado com todos os
+    'espacamentos' candidatos (resultado['espacamento'] diz qual ganhou).
+    Retorna até 'limite' pares (papel, resultado), ignorando papéis em que a peça não cabe.
+    """
+    if papeis is None:
+        from materiais.precos import catalogo
+        papeis = catalogo.papeis()
+
+    resultados = imposicao_em_lote(
+        ((p.pk, p.largura_mm, p.altura_mm) for p in papeis),
+        item_largura, item_altura, margem_papel, espacamentos,
+    )
+    ranking = [(p, resultados[p.pk]) for p in papeis if resultados[p.pk] and resultados[p.pk]['total']]
+    ranking.sort(key=lambda par: (-par[1]['total'], -par[1]['aproveitamento'], par[0].pk))
+    return ranking[:limite]
+
+
+def calcular_imposicao(papel_largura, papel_altura, item_largura, item_altura, margem_papel=5):
+    """
+    Calcula o melhor aproveitamento (Normal, Rotacionado ou Misto).
+    Retorna um dicionário com os dados para desenho e quantidade.
+    """
+    resultado = melhor_imposicao(papel_largura, papel_altura, item_largura, item_altura, margem_papel)
+    if resultado is None:
+        return None
+
+    # Gera lista de posições absolutas de cada retângulo (para o desenho)
+    espaco = resultado['espacamento']
+    rectangles = []
+    for bloco in resultado['blocos']:
+        for row in range(bloco['rows']):
+            for col in range(bloco['cols']):
+                rectangles.append({
+                    'x': bloco['x'] + col * (bloco['w'] + espaco),
+                    'y': bloco['y'] + row * (bloco['h'] + espaco),
+                    'w': bloco['w'],
+                    'h': bloco['h'],
+                })
+
+    resultado['rectangles'] = rectangles
+    return resultado
+
+
+# (preenchimento, contorno) por peça; na montagem cada trabalho ganha uma cor ('cor' do bloco)
+CORES_BLOCOS = (
+    ('#ddd6fe', '#7c3aed'), ('#bfdbfe', '#2563eb'), ('#bbf7d0', '#16a34a'), ('#fde68a', '#d97706'),
+    ('#fecaca', '#dc2626'), ('#a5f3fc', '#0891b2'), ('#fbcfe8', '#db2777'), ('#e5e7eb', '#4b5563'),
+)
+
+
+def cor_bloco(indice):
+    return CORES_BLOCOS[indice % len(CORES_BLOCOS)]
+
+
+def renderizar_svg_imposicao(papel_largura, papel_altura, resultado, margem_papel=5):
+    """
+    Desenha o papel e o resultado da imposição em SVG.
+
+    Cada bloco da grade vira um único <rect> preenchido por um <pattern> (a célula
+    de uma peça repetida), então o tamanho do SVG não cresce com a quantidade de peças.
+    """
+    def n(valor):
+        return '%g' % round(float(valor), 2)
+
+    defs = []
+    blocos = []
+    espaco = resultado['espacamento'] if resultado else 0
+    for i, bloco in enumerate(resultado['blocos'] if resultado else []):
+        preenchimento, contorno = cor_bloco(bloco.get('cor', 0))
+        defs.append(
+            f'<pattern id="bloco{i}" x="{n(bloco["x"])}" y="{n(bloco["y"])}" '
+            f'width="{n(bloco["w"] + espaco)}" height="{n(bloco["h"] + espaco)}" patternUnits="userSpaceOnUse">'
+            f'<rect width="{n(bloco["w"])}" height="{n(bloco["h"])}" fill="{preenchimento}" stroke="{contorno}" stroke-width="0.5"/>'
+            f'</pattern>'
+        )
+        blocos.append(
+            f'<rect x="{n(bloco["x"])}" y="{n(bloco["y"])}" '
+            f'width="{n(_ocupado(bloco["cols"], bloco["w"], espaco))}" '
+            f'height="{n(_ocupado(bloco["rows"], bloco["h"], espaco))}" '
+            f'fill="url(#bloco{i})" stroke="{contorno}" stroke-width="0.5"/>'
+        )
+
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {n(papel_largura)} {n(papel_altura)}" '
+        f'width="{n(papel_largura)}" height="{n(papel_altura)}">'
+        f'<defs>{"".join(defs)}</defs>'
+        f'<rect width="100%" height="100%" fill="white"/>'
+        f'<rect x="{n(margem_papel)}" y="{n(margem_papel)}" '
+        f'width="{n(papel_largura - 2 * margem_papel)}" height="{n(papel_altura - 2 * margem_papel)}" '
+        f'fill="none" stroke="#ef4444" stroke-width="0.5" stroke-dasharray="8" opacity="0.3"/>'
+        f'{"".join(blocos)}'
+        f'</svg>'
+    )
+
+
+# ==========================================
+# CACHE DE IMPOSIÇÃO
+# ==========================================
+class CacheImposicao:
+    """
+    Memoiza melhor_imposicao por geometria (papel, corte, margem, espaçamentos).
+
+    Primeiro consulta um LRU em memória (com TTL); se não achar e houver um alias
+    de cache do Django configurado, consulta o cache compartilhado entre workers.
+    Os resultados devolvidos são compartilhados: não altere o dicionário.
+    """
+    VERSAO = 3  # Incrementar quando o cálculo mudar, para descartar resultados antigos
+
+    def __init__(self, max_itens=1024, ttl=3600, alias=None):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self.alias = alias
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.hits_compartilhado = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalizar(*medidas):
+        # 90, 90.0 e Decimal('90.00') devem cair na mesma chave
+        return tuple(round(float(m), 1) for m in medidas)
+
+    def chave(self, geometria):
+        return 'imposicao:v%d:%s' % (self.VERSAO, ':'.join('%g' % m for m in geometria))
+
+    def _backend(self):
+        if not self.alias:
+            return None
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    def obter(self, papel_largura, papel_altura, item_largura, item_altura, margem_papel=5, espacamentos=(0,)):
+        # Chave: (papel, corte, margem, *espaçamentos candidatos)
+        geometria = self.normalizar(papel_largura, papel_altura, item_largura, item_altura, margem_papel, *espacamentos)
+        agora = time.monotonic()
+
+        with self._lock:
+            item = self._itens.get(geometria)
+            if item and item[0] > agora:
+                self._itens.move_to_end(geometria)
+                self.hits += 1
+                return item[1]
+
+        backend = self._backend()
+        chave = self.chave(geometria)
+        resultado = backend.get(chave, self) if backend else self
+        if resultado is not self:
+            compartilhado = True
+        else:
+            compartilhado = False
+            resultado = melhor_imposicao(*geometria[:5], espacamentos=geometria[5:])
+            if backend:
+                backend.set(chave, resultado, self.ttl)
+
+        with self._lock:
+            if compartilhado:
+                self.hits_compartilhado += 1
+            else:
+                self.misses += 1
+            self._itens[geometria] = (agora + self.ttl, resultado)
+            self._itens.move_to_end(geometria)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+        return resultado
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self.hits = self.hits_compartilhado = self.misses = 0
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.hits + self.hits_compartilhado + self.misses
+            return {
+                'itens': len(self._itens),
+                'hits': self.hits,
+                'hits_compartilhado': self.hits_compartilhado,
+                'misses': self.misses,
+                'taxa_acerto': (self.hits + self.hits_compartilhado) / consultas if consultas else 0,
+            }
+
+
+_cache_imposicao = None
+
+
+def get_cache_imposicao():
+    """Instância única do cache, configurada por settings.IMPOSICAO_CACHE."""
+    global _cache_imposicao
+    if _cache_imposicao is None:
+        from django.conf import settings
+        config = getattr(settings, 'IMPOSICAO_CACHE', {})
+        _cache_imposicao = CacheImposicao(
+            max_itens=config.get('MAX_ITENS', 1024),
+            ttl=config.get('TIMEOUT', 3600),
+            alias=config.get('ALIAS'),
+        )
+    return _cache_imposicao
+
+
+def calcular_imposicao_cache(papel_largura, papel_altura, item_largura, item_altura, margem_papel=5,
+                             espacamentos=(0,)):
+    """
+    Melhor imposição passando pelo cache de geometria.
+    Devolve só os blocos da grade (sem a lista de retângulos); para desenhar use
+    renderizar_svg_imposicao.
+    """
+    return get_cache_imposicao().obter(
+        papel_largura, papel_altura, item_largura, item_altura, margem_papel, espacamentos
+    )
@@ -1,13 +1,44 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from .models import ConfiguracaoGlobal, Cliente
-from materiais.models import Papel
-from .utils import calcular_imposicao
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from .models import ConfiguracaoGlobal, Cliente, ItemOrcamento, Orcamento
+from materiais.models import Papel, parse_gramatura
+from materiais.precos import guilhotina
+from .busca import abuscar_clientes, filtrar_clientes
+from .combinacoes import melhores_combinacoes
+from .documentos import normalizar_documento
+from .montagem import cortes_totais, medidas_dos_itens, montar_folhas_cache, normalizar_medidas
+from .paginacao import paginar_por_cursor, contagem_cacheada
+from .precificacao import calcular_tiragens
+from .utils import (
+    calcular_imposicao_cache, cor_bloco, get_cache_imposicao, medidas_validas, ranquear_papeis,
+    renderizar_svg_imposicao,
+)
 from django.views.generic import TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from .forms import ClienteForm, ItemOrcamentoForm, ConfiguracaoGlobalForm
 from django.views.generic import TemplateView, ListView  # Adicionado ListView
-from django.db.models import Q                           # Adicionado Q
+from django.http import HttpResponse, HttpResponseBadRequest
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+import hashlib
+import logging
+from decimal import Decimal, InvalidOperation
+
+from asgiref.sync import sync_to_async
+
+logger = logging.getLogger(__name__)
+
+# (campo do Orcamento, input da tela) dos percentuais sobre o preço
+PERCENTUAIS_ORCAMENTO = (
+    ('percentual_imposto', 'percentual_imposto'),
+    ('percentual_comissao', 'percentual_comissao'),
+    ('percentual_cartao', 'taxa_cartao'),
+)
+
 
 class NovoOrcamentoView(LoginRequiredMixin, TemplateView):
     template_name = "orcamentos/novo_orcamento.html"
@@ -22,31 +53,16 @@ class NovoOrcamentoView(LoginRequiredMixin, TemplateView):
     def post(self, request, *args, **kwargs):
         # Captura apenas os dados do formulário de Cliente
         form_cliente = ClienteForm(request.POST, prefix='cliente')
-        
-        # Instanciamos o form_item apenas para não quebrar a validação visual, 
-        # mas não vamos salvá-lo agora.
         form_item = ItemOrcamentoForm(request.POST, prefix='item')
 
+        if request.POST.get('acao') == 'calcular':
+            return self.calcular(request, form_cliente, form_item)
+
         if form_cliente.is_valid():
             try:
-                # Lógica para Salvar ou Atualizar Cliente pelo Documento
-                cliente_data = form_cliente.cleaned_data
-                documento = cliente_data.get('documento')
-                
-                if documento:
-                    # Se tem documento, tenta atualizar ou criar (evita duplicados)
-                    cliente, created = Cliente.objects.update_or_create(
-                        documento=documento,
-                        defaults=cliente_data
-                    )
-                    acao = "cadastrado" if created else "atualizado"
-                else:
-                    # Se não tem documento, cria um novo sempre
-                    cliente = form_cliente.save()
-                    acao = "cadastrado"
-
+                cliente, acao = self.salvar_cliente(form_cliente)
                 messages.success(request, f"Cliente {cliente.nome} {acao} com sucesso!")
-                
+
                 # Redireciona para a nova lista de clientes
                 return redirect('orcamentos:lista_clientes')
 
@@ -61,75 +77,314 @@ class NovoOrcamentoView(LoginRequiredMixin, TemplateView):
             'form_item': form_item
         })
 
-def htmx_calcular_aproveitamento(request):
+    def salvar_cliente(self, form_cliente):
+        """Salva ou atualiza o cliente pelo documento. Retorna (cliente, 'cadastrado'/'atualizado')."""
+        cliente_data = form_cliente.cleaned_data
+        chave = normalizar_documento(cliente_data.get('documento'))
+
+        if chave:
+            # Se tem documento, atualiza ou cria pela chave normalizada (índice único)
+            cliente, created = Cliente.objects.update_or_create(
+                documento_normalizado=chave,
+                defaults=cliente_data
+            )
+            return cliente, "cadastrado" if created else "atualizado"
+        # Se não tem documento, cria um novo sempre
+        return form_cliente.save(), "cadastrado"
+
+    def calcular(self, request, form_cliente, form_item):
+        """
+        Botão "Calcular Orçamento": grava cliente, orçamento e item e precifica
+        todas as quantidades numa chamada (precificacao.calcular_tiragens).
+        """
+        contexto = {'form_cliente': form_cliente, 'form_item': form_item}
+        if not (form_cliente.is_valid() and form_item.is_valid()):
+            messages.error(request, "Verifique os dados do formulário.")
+            return render(request, self.template_name, contexto)
+
+        try:
+            with transaction.atomic():
+                cliente, _ = self.salvar_cliente(form_cliente)
+                orcamento = Orcamento.objects.create(cliente=cliente, vendedor=request.user)
+                # Percentuais da tela, quando informados, substituem os padrões da configuração
+                for campo, nome in PERCENTUAIS_ORCAMENTO:
+                    try:
+                        setattr(orcamento, campo, Decimal(request.POST[nome].replace(',', '.')))
+                    except (KeyError, InvalidOperation):
+                        pass
+                orcamento.save(update_fields=[campo for campo, _ in PERCENTUAIS_ORCAMENTO])
+
+                item = form_item.save(commit=False)
+                item.orcamento = orcamento
+                item.save()
+                tiragens = calcular_tiragens(
+                    item, form_item.cleaned_data['quantidades_input'], form_item.cleaned_data['acabamentos'],
+                )
+        except ValidationError as e:
+            # Nada fica gravado (nem cliente nem orçamento): o erro volta no formulário do item
+            form_item.add_error(None, e)
+            messages.error(request, "Verifique os dados do formulário.")
+            return render(request, self.template_name, contexto)
+
+        contexto.update(orcamento=orcamento, resultados=tiragens)
+        return render(request, self.template_name, contexto)
+
+
+RANKING_PAPEIS = 5  # papéis sugeridos no preview de aproveitamento
+# Calhas (mm) testadas por papel no ranking: fica a maior que não perde peças
+CALHAS_RANKING_MM = (0, 2, 4)
+
+
+async def htmx_calcular_aproveitamento(request):
+    # Assíncrona: roda a cada tecla; sob ASGI não prende uma thread esperando o banco
     try:
         # 1. Coleta dados do Request
         largura_final = float(request.GET.get('item-largura_final_mm') or 0)
         altura_final = float(request.GET.get('item-altura_final_mm') or 0)
         sangria = float(request.GET.get('item-sangria_mm') or 0)
         papel_id = request.GET.get('item-papel')
-        
-        # 2. Validações básicas
+
+        # 2. Validações básicas (inclusive nan/inf e medidas absurdas digitadas no campo)
         if not papel_id or largura_final == 0 or altura_final == 0:
             return render(request, 'orcamentos/partials/aproveitamento_vazio.html')
+        if not medidas_validas(largura_final, altura_final) or not medidas_validas(sangria, minimo=0):
+            return render(request, 'orcamentos/partials/aproveitamento_vazio.html')
+
+        papel = await Papel.objects.only('largura_mm', 'altura_mm').aget(pk=papel_id)
+    except (ValueError, Papel.DoesNotExist):
+        # Campo ainda sendo digitado ou papel removido: só não mostra a prévia
+        return render(request, 'orcamentos/partials/aproveitamento_vazio.html')
 
-        papel = Papel.objects.get(pk=papel_id)
-        
+    try:
         # Tamanho total do "corte" (Item + Sangria de cada lado)
         corte_w = largura_final + (sangria * 2)
         corte_h = altura_final + (sangria * 2)
 
-        # 3. Faz o Cálculo
-        resultado = calcular_imposicao(
-            papel.largura_mm, 
-            papel.altura_mm, 
-            corte_w, 
+        # 3. Faz o Cálculo (memoizado por geometria). É código síncrono (LRU, cache de
+        # imposição e, na falta, o cálculo em si): roda fora do loop de eventos
+        resultado = await sync_to_async(calcular_imposicao_cache)(
+            papel.largura_mm,
+            papel.altura_mm,
+            corte_w,
             corte_h
         )
 
         if not resultado:
             return render(request, 'orcamentos/partials/aproveitamento_vazio.html')
 
-        # 4. Prepara contexto para o template
+        # 4. Prepara contexto para o template (o desenho vem do endpoint SVG, cacheável)
+        svg_url = reverse('orcamentos:aproveitamento_svg') + '?' + urlencode({
+            'pw': papel.largura_mm, 'ph': papel.altura_mm, 'iw': corte_w, 'ih': corte_h,
+        })
+        # 5. Outros papéis do catálogo para o mesmo corte, do melhor aproveitamento para o pior
+        ranking = await sync_to_async(ranquear_papeis)(
+            corte_w, corte_h, limite=RANKING_PAPEIS, espacamentos=CALHAS_RANKING_MM
+        )
+
         context = {
             'papel': papel,
             'resultado': resultado,
             'corte_w': corte_w,
             'corte_h': corte_h,
+            'svg_url': svg_url,
+            'ranking': ranking,
         }
         return render(request, 'orcamentos/partials/aproveitamento_resultado.html', context)
 
-    except Exception as e:
-        print(f"Erro no cálculo: {e}")
+    except Exception:
+        # A prévia não pode derrubar o formulário, mas o erro fica no log com traceback
+        logger.exception("Erro no cálculo de aproveitamento (papel %s)", papel_id)
         return render(request, 'orcamentos/partials/aproveitamento_vazio.html')
 
+def _geometria_svg(request):
+    # (papel_w, papel_h, corte_w, corte_h, margem) normalizados, ou None se inválido
+    try:
+        geometria = get_cache_imposicao().normalizar(
+            request.GET['pw'], request.GET['ph'], request.GET['iw'], request.GET['ih'],
+            request.GET.get('m', 5),
+        )
+    except (KeyError, ValueError):
+        return None
+    if not medidas_validas(*geometria[:4]) or not medidas_validas(geometria[4], minimo=0):
+        return None
+    return geometria
+
+
+def _etag_svg(request):
+    # O desenho só depende da geometria: o ETag sai da chave do cache, sem calcular nada
+    geometria = _geometria_svg(request)
+    if geometria is None:
+        return None
+    return hashlib.md5(get_cache_imposicao().chave(geometria).encode()).hexdigest()
+
+
+@cache_control(public=True, max_age=60 * 60 * 24)
+@condition(etag_func=_etag_svg)
+def svg_aproveitamento(request):
+    geometria = _geometria_svg(request)
+    if geometria is None:
+        return HttpResponseBadRequest("Geometria inválida.")
+
+    papel_w, papel_h, corte_w, corte_h, margem = geometria
+    resultado = calcular_imposicao_cache(papel_w, papel_h, corte_w, corte_h, margem)
+    svg = renderizar_svg_imposicao(papel_w, papel_h, resultado, margem)
+    return HttpResponse(svg, content_type='image/svg+xml')
+
+def htmx_melhores_combinacoes(request):
+    """
+    Papel x impressora mais baratos para as medidas do formulário do item
+    (catálogo em memória). Quantidade: ?quantidade= ou a primeira de item-quantidades_input.
+    """
+    try:
+        largura_final = float(request.GET.get('item-largura_final_mm') or 0)
+        altura_final = float(request.GET.get('item-altura_final_mm') or 0)
+        sangria = float(request.GET.get('item-sangria_mm') or 0)
+        paginas = int(request.GET.get('item-paginas') or 1)
+        quantidade = request.GET.get('quantidade') or (request.GET.get('item-quantidades_input') or '').split(',')[0]
+        quantidade = int(quantidade.strip().replace('.', '') or 0)
+        limite = min(int(request.GET.get('limite') or 10), 50)
+        gramatura = int(request.GET['gramatura']) if request.GET.get('gramatura') else None
+    except ValueError:
+        return HttpResponseBadRequest("Parâmetros inválidos.")
+    if not largura_final or not altura_final:
+        # Formulário ainda sem as medidas: nada a sugerir
+        return render(request, 'orcamentos/partials/combinacoes_resultado.html', {
+            'combinacoes': [], 'quantidade': quantidade,
+        })
+    # nan/inf ou medidas fora da faixa travam o otimizador (1e-9 mm = laço sem fim)
+    if not medidas_validas(largura_final, altura_final) or not medidas_validas(sangria, minimo=0):
+        return HttpResponseBadRequest("Medidas fora da faixa.")
+
+    combinacoes = melhores_combinacoes(
+        largura_final, altura_final, sangria, request.GET.get('item-cor_impressao', '4x0'),
+        quantidade, paginas=paginas, limite=limite, gramatura=gramatura,
+    )
+    return render(request, 'orcamentos/partials/combinacoes_resultado.html', {
+        'combinacoes': combinacoes,
+        'quantidade': quantidade,
+    })
+
+
+# Limites da montagem vinda da URL (o SVG é público): peças por folha e tiragem de cada uma
+MONTAGEM_MAX_PECAS = 100
+MONTAGEM_MAX_QUANTIDADE = 1_000_000
+
+
+def htmx_montagem(request):
+    """
+    Montagem (gang run) de itens do mesmo papel e impressora: ?item=<id>&quantidade=<n>
+    repetidos, na mesma ordem. Mostra cada folha montada no preview de aproveitamento.
+    """
+    ids = request.GET.getlist('item')
+    try:
+        quantidades = [int(q) for q in request.GET.getlist('quantidade')]
+    except ValueError:
+        quantidades = []
+    if not ids or len(ids) != len(quantidades) or len(ids) > MONTAGEM_MAX_PECAS:
+        return render(request, 'orcamentos/partials/aproveitamento_vazio.html')
+
+    validos = [(int(pk), q) for pk, q in zip(ids, quantidades) if pk.isdigit() and 0 < q <= MONTAGEM_MAX_QUANTIDADE]
+    itens = ItemOrcamento.objects.select_related('papel').in_bulk([pk for pk, _ in validos])
+    pares = [(itens[pk], q) for pk, q in validos if pk in itens]
+    try:
+        medidas = medidas_dos_itens(pares)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    if not medidas:
+        return render(request, 'orcamentos/partials/aproveitamento_vazio.html')
+
+    papel = pares[0][0].papel
+    gramatura = papel.gramatura_g if papel.gramatura_g is not None else parse_gramatura(papel.gramatura)
+    resultado = montar_folhas_cache(papel.largura_mm, papel.altura_mm, medidas)
+
+    # O desenho de cada folha vem do endpoint SVG, que refaz a mesma montagem pela geometria
+    consulta = {
+        'pw': papel.largura_mm, 'ph': papel.altura_mm,
+        'p': [':'.join('%g' % v for v in medida) for medida in normalizar_medidas(medidas)],
+    }
+    svg_base = reverse('orcamentos:montagem_svg')
+    folhas = [
+        {
+            'resultado': folha,
+            'svg_url': svg_base + '?' + urlencode(dict(consulta, f=indice), doseq=True),
+            'itens': [(pares[chave][0], cor_bloco(chave)[1], n) for chave, n in folha['pecas'].items()],
+        }
+        for indice, folha in enumerate(resultado['folhas'])
+    ]
+    context = {
+        'papel': papel,
+        'resultado': resultado,
+        'folhas': folhas,
+        'nao_cabem': [pares[chave][0] for chave in resultado['nao_cabem']],
+        'economia': resultado['folhas_separadas'] - resultado['total_folhas'],
+        'cortes': cortes_totais(resultado['folhas'], guilhotina.folhas_por_corte(gramatura)),
+    }
+    return render(request, 'orcamentos/partials/montagem_resultado.html', context)
+
+
+def _montagem_svg(request):
+    # (papel_w, papel_h, margem, medidas, folha) ou None se inválido
+    try:
+        geometria = get_cache_imposicao().normalizar(request.GET['pw'], request.GET['ph'], request.GET.get('m', 5))
+        pecas = request.GET.getlist('p')
+        if not pecas or len(pecas) > MONTAGEM_MAX_PECAS:
+            return None
+        medidas = normalizar_medidas(p.split(':') for p in pecas)
+        folha = int(request.GET.get('f', 0))
+    except (KeyError, ValueError, TypeError, OverflowError):
+        return None
+    if not medidas_validas(*geometria[:2]) or not medidas_validas(geometria[2], minimo=0):
+        return None
+    for w, h, quantidade, sangria in medidas:
+        if not (medidas_validas(w, h) and medidas_validas(sangria, minimo=0)
+                and 0 < quantidade <= MONTAGEM_MAX_QUANTIDADE):
+            return None
+    return geometria, medidas, folha
+
+
+def _etag_montagem_svg(request):
+    spec = _montagem_svg(request)
+    if spec is None:
+        return None
+    return hashlib.md5(('montagem:%r' % (spec,)).encode()).hexdigest()
+
+
+@cache_control(public=True, max_age=60 * 60 * 24)
+@condition(etag_func=_etag_montagem_svg)
+def svg_montagem(request):
+    spec = _montagem_svg(request)
+    if spec is None:
+        return HttpResponseBadRequest("Geometria inválida.")
+
+    (papel_w, papel_h, margem), medidas, indice = spec
+    folhas = montar_folhas_cache(papel_w, papel_h, medidas, margem)['folhas']
+    if not 0 <= indice < len(folhas):
+        return HttpResponseBadRequest("Folha inexistente.")
+    svg = renderizar_svg_imposicao(papel_w, papel_h, folhas[indice], margem)
+    return HttpResponse(svg, content_type='image/svg+xml')
+
 def configuracoes_view(request):
-    # Pega a config existente ou cria a primeira (ID=1)
-    config, created = ConfiguracaoGlobal.objects.get_or_create(pk=1)
+    # Pega a config existente (cache do processo) ou cria a primeira (ID=1)
+    config = ConfiguracaoGlobal.carregar()
 
     if request.method == 'POST':
         form = ConfiguracaoGlobalForm(request.POST, request.FILES, instance=config)
         if form.is_valid():
             form.save()
             messages.success(request, "Configurações atualizadas com sucesso!")
-            return redirect('configuracoes')
+            return redirect('orcamentos:configuracoes')
     else:
         form = ConfiguracaoGlobalForm(instance=config)
 
     return render(request, 'orcamentos/configuracoes.html', {'form': form})
 
-def buscar_cliente(request):
+async def buscar_cliente(request):
     query = request.GET.get('q', '')
     clientes = []
     
     if len(query) > 2: # Só busca se tiver mais de 2 caracteres
-        clientes = Cliente.objects.filter(
-            nome__icontains=query
-        )[:5] # Limita a 5 resultados
-        
-        # Se quiser buscar por documento também:
-        # from django.db.models import Q
-        # clientes = Cliente.objects.filter(Q(nome__icontains=query) | Q(documento__icontains=query))[:5]
+        # Índice full-text (nome, fantasia, documento, email), por relevância
+        clientes = await abuscar_clientes(query, limite=5)
 
     return render(request, 'orcamentos/partials/resultados_busca_cliente.html', {'clientes': clientes})
 
@@ -142,11 +397,37 @@ class ClientesListView(LoginRequiredMixin, ListView):
     def get_queryset(self):
         qs = super().get_queryset()
         query = self.request.GET.get('q')
-        # Filtra por Nome, Documento ou Email
+        # Filtra por Nome, Documento ou Email (índice full-text)
         if query:
-            qs = qs.filter(
-                Q(nome__icontains=query) | 
-                Q(documento__icontains=query) |
-                Q(email__icontains=query)
-            )
-        return qs.order_by('-id')
\ No newline at end of file
+            qs = filtrar_clientes(qs, query)
+        return qs.order_by('-id')
+
+    def get_template_names(self):
+        # Navegação via HTMX troca só a tabela + paginação
+        if self.request.headers.get('HX-Request'):
+            return ["orcamentos/partials/lista_clientes.html"]
+        return super().get_template_names()
+
+    def paginate_queryset(self, queryset, page_size):
+        # Cursor por id (?apos= / ?antes=) em vez de ?page=: sem OFFSET e sem COUNT a cada página
+        pagina = paginar_por_cursor(
+            queryset, page_size,
+            apos=self.request.GET.get('apos'),
+            antes=self.request.GET.get('antes'),
+        )
+        pagina.total = contagem_cacheada(queryset, 'cliente')
+        return None, pagina, pagina.object_list, pagina.tem_anterior or pagina.tem_proxima
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        q = self.request.GET.get('q', '')
+        pagina = context['page_obj']
+        base = {'q': q} if q else {}
+        context['q'] = q
+        context['url_anterior'] = (
+            '?' + urlencode({**base, 'antes': pagina.antes}) if pagina.tem_anterior and pagina.antes else None
+        )
+        context['url_proxima'] = (
+            '?' + urlencode({**base, 'apos': pagina.apos}) if pagina.tem_proxima and pagina.apos else None
+        )
+        return context
\ No newline at end of file
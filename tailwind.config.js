@@ -0,0 +1,22 @@
+// CSS das telas de orçamento (templates/ e classes montadas em Python).
+// O admin usa o CSS do Unfold e não entra aqui.
+const defaultTheme = require('tailwindcss/defaultTheme');
+
+/** @type {import('tailwindcss').Config} */
+module.exports = {
+  content: [
+    './templates/**/*.html',
+    './orcamentos/**/*.py',
+    './core/static/js/**/*.js',
+  ],
+  darkMode: 'media',
+  theme: {
+    extend: {
+      fontFamily: { sans: ['Inter', ...defaultTheme.fontFamily.sans] },
+      colors: {
+        primary: { 50: '#f5f3ff', 100: '#ede9fe', 500: '#8b5cf6', 600: '#7c3aed', 900: '#4c1d95' },
+      },
+    },
+  },
+  plugins: [],
+};